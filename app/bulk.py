@@ -0,0 +1,65 @@
+from typing import Any, Iterator, Sequence, TypeVar
+
+from pydantic import BaseModel, ValidationError
+
+T = TypeVar("T")
+Schema = TypeVar("Schema", bound=BaseModel)
+
+# Upper bound on records per bulk request, and rows per SQL statement. The
+# chunk size keeps IN lists and multi-row INSERTs below SQLite's parameter cap.
+BULK_MAX_ITEMS = 10_000
+BULK_CHUNK_SIZE = 500
+
+
+class BulkResults:
+    """Per-item outcome of a bulk request, in request order."""
+
+    def __init__(self, size: int):
+        self._items: list[dict | None] = [None] * size
+
+    def created(self, index: int, row_id: int) -> None:
+        self._items[index] = {"index": index, "status": "created", "id": row_id}
+
+    def conflict(self, index: int, detail: str) -> None:
+        self._items[index] = {"index": index, "status": "conflict", "detail": detail}
+
+    def invalid(self, index: int, detail: str) -> None:
+        self._items[index] = {"index": index, "status": "invalid", "detail": detail}
+
+    def summary(self) -> dict:
+        items = [item for item in self._items if item is not None]
+        statuses = [item["status"] for item in items]
+
+        return {
+            "created": statuses.count("created"),
+            "conflicts": statuses.count("conflict"),
+            "invalid": statuses.count("invalid"),
+            "items": items,
+        }
+
+
+def chunked(items: Sequence[T], size: int = BULK_CHUNK_SIZE) -> Iterator[Sequence[T]]:
+    for start in range(0, len(items), size):
+        yield items[start : start + size]
+
+
+def validate_items(
+    schema: type[Schema], items: list[Any], results: BulkResults
+) -> list[tuple[int, Schema]]:
+    """Validate every record, reporting failures instead of rejecting the batch."""
+    valid = []
+
+    for index, item in enumerate(items):
+        try:
+            valid.append((index, schema.model_validate(item)))
+        except ValidationError as exc:
+            results.invalid(
+                index,
+                "; ".join(
+                    f"{'.'.join(str(part) for part in error['loc']) or 'body'}: "
+                    f"{error['msg']}"
+                    for error in exc.errors()
+                ),
+            )
+
+    return valid
@@ -0,0 +1,154 @@
+"""Response compression negotiated from Accept-Encoding.
+
+Brotli is preferred to gzip when the client takes both at the same q.
+Complete bodies under COMPRESSION_MIN_BYTES are sent as they are. Streamed
+bodies are compressed chunk by chunk with a flush after each one, so the
+client still receives the data as it is produced. Only text-like media
+types are compressed; images, archives, partial content and responses that
+already have a Content-Encoding pass through untouched.
+"""
+
+import zlib
+
+import brotli
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app import COMPRESSION_BROTLI_QUALITY, COMPRESSION_GZIP_LEVEL, COMPRESSION_MIN_BYTES
+
+COMPRESSIBLE_TYPES = (
+    "application/json",
+    "application/x-ndjson",
+    "application/msgpack",
+    "text/",
+)
+
+# Preferred first when q values tie
+_ENCODINGS = ("br", "gzip")
+
+
+def choose_encoding(accept_encoding: str | None) -> str | None:
+    """The best coding we support that `accept_encoding` allows, or None."""
+    if not accept_encoding:
+        return None
+
+    qualities: dict[str, float] = {}
+    for part in accept_encoding.lower().split(","):
+        coding, *params = part.split(";")
+        q = 1.0
+        for param in params:
+            name, _, value = param.strip().partition("=")
+            if name == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        qualities[coding.strip()] = q
+
+    wildcard = qualities.get("*", 0.0)
+    best = max(_ENCODINGS, key=lambda coding: qualities.get(coding, wildcard))
+    return best if qualities.get(best, wildcard) > 0 else None
+
+
+class _Encoder:
+    def __init__(self, encoding: str):
+        if encoding == "br":
+            self._brotli = brotli.Compressor(quality=COMPRESSION_BROTLI_QUALITY)
+            self._gzip = None
+        else:
+            self._brotli = None
+            self._gzip = zlib.compressobj(COMPRESSION_GZIP_LEVEL, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes, final: bool) -> bytes:
+        if self._brotli is not None:
+            out = self._brotli.process(data)
+            return out + (self._brotli.finish() if final else self._brotli.flush())
+
+        out = self._gzip.compress(data)
+        return out + self._gzip.flush(zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH)
+
+
+def _compressible(start: Message, headers: Headers) -> bool:
+    if start["status"] in (204, 206, 304) or "content-encoding" in headers:
+        return False
+
+    content_type = headers.get("content-type", "")
+    return content_type.startswith(COMPRESSIBLE_TYPES)
+
+
+class CompressionMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding"))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start: Message = {}
+        encoder: _Encoder | None = None
+        decided = False
+
+        async def compress(message: Message) -> None:
+            nonlocal encoder, decided
+
+            if message["type"] == "http.response.start":
+                start.update(message)
+                return
+
+            if message["type"] != "http.response.body":
+                # e.g. http.response.pathsend for files
+                if not decided:
+                    decided = True
+                    await send(start)
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+
+            if not decided:
+                decided = True
+                headers = MutableHeaders(scope=start)
+                small = not more_body and len(body) < COMPRESSION_MIN_BYTES
+                if small or not _compressible(start, headers):
+                    await send(start)
+                    await send(message)
+                    return
+
+                encoder = _Encoder(encoding)
+                body = encoder.compress(body, final=not more_body)
+
+                headers["Content-Encoding"] = encoding
+                headers.add_vary_header("Accept-Encoding")
+                # Different bytes now: a strong validator would be wrong
+                etag = headers.get("etag")
+                if etag and not etag.startswith("W/"):
+                    headers["ETag"] = f"W/{etag}"
+                if more_body:
+                    del headers["Content-Length"]
+                else:
+                    headers["Content-Length"] = str(len(body))
+
+                await send(start)
+                await send({"type": "http.response.body", "body": body, "more_body": more_body})
+                return
+
+            if encoder is None:
+                await send(message)
+                return
+
+            await send(
+                {
+                    "type": "http.response.body",
+                    "body": encoder.compress(body, final=not more_body),
+                    "more_body": more_body,
+                }
+            )
+
+        await self.app(scope, receive, compress)
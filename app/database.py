@@ -1,9 +1,24 @@
 from typing import Annotated
 from fastapi import Depends
-from sqlalchemy import create_engine
-from sqlalchemy.orm import Session, declarative_base
+from sqlalchemy import URL, Engine, create_engine, event, make_url
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
+from sqlalchemy.orm import declarative_base
 
-from app import STRCNX
+from app import (
+    STRCNX,
+    ASYNC_STRCNX,
+    DB_BUSY_TIMEOUT_MS,
+    DB_CACHE_SIZE_KB,
+    DB_JOURNAL_MODE,
+    DB_MAX_OVERFLOW,
+    DB_MMAP_SIZE,
+    DB_POOL_SIZE,
+    DB_POOL_TIMEOUT,
+    DB_READ_POOL_SIZE,
+    DB_SYNCHRONOUS,
+    DB_TEMP_STORE,
+)
 
 Base = declarative_base()
 
@@ -11,16 +26,131 @@ Base = declarative_base()
 if STRCNX is None:
     raise ValueError("Database connection is not configured.")
 
-engine = create_engine(STRCNX)
+_url = make_url(STRCNX)
+_in_memory = _url.database in (None, "", ":memory:")
+
+if ASYNC_STRCNX:
+    _async_url = make_url(ASYNC_STRCNX)
+elif _url.get_backend_name() == "sqlite":
+    _async_url = _url.set(drivername="sqlite+aiosqlite")
+else:
+    raise ValueError("ASYNC_STRCNX is required for non-SQLite databases.")
+
+# Applied to every new connection. journal_mode persists in the file, the
+# rest are per connection.
+SQLITE_PRAGMAS = {
+    "busy_timeout": DB_BUSY_TIMEOUT_MS,
+    "cache_size": -DB_CACHE_SIZE_KB,
+    "mmap_size": DB_MMAP_SIZE,
+    "temp_store": DB_TEMP_STORE,
+}
+SQLITE_WRITE_PRAGMAS = {
+    "journal_mode": DB_JOURNAL_MODE,
+    "synchronous": DB_SYNCHRONOUS,
+}
+
+
+def _configure_sqlite(target: Engine, pragmas: dict, immediate: bool) -> None:
+    @event.listens_for(target, "connect")
+    def _on_connect(dbapi_connection, _):
+        # Let SQLAlchemy emit BEGIN itself instead of pysqlite's implicit one
+        dbapi_connection.isolation_level = None
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name} = {value}")
+        cursor.close()
+
+    @event.listens_for(target, "begin")
+    def _on_begin(conn):
+        # Writers take the lock up front, so a read never has to be upgraded
+        # mid-transaction (that upgrade fails with "database is locked"
+        # without waiting for busy_timeout).
+        conn.exec_driver_sql("BEGIN IMMEDIATE" if immediate else "BEGIN")
+
+
+def _pool_options(pool_size: int) -> dict:
+    if _in_memory:
+        return {}
+
+    return {
+        "pool_size": pool_size,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_pre_ping": True,
+    }
+
+
+def _read_only(url: URL) -> URL:
+    return url.set(
+        database=f"file:{url.database}",
+        query={**url.query, "mode": "ro", "uri": "true"},
+    )
+
+
+# Sync engine: schema setup, migrations and command-line tools
+engine = create_engine(_url, **_pool_options(DB_POOL_SIZE))
+
+# Async engines used by the request handlers. The read-only one serves GET
+# routes; under WAL its readers never block (or wait on) the writer. An
+# in-memory database can't be shared, so it reuses the writer.
+async_engine: AsyncEngine = create_async_engine(
+    _async_url, **_pool_options(DB_POOL_SIZE)
+)
+if _in_memory:
+    async_read_engine = async_engine
+else:
+    async_read_engine = create_async_engine(
+        _read_only(_async_url), **_pool_options(DB_READ_POOL_SIZE)
+    )
+
+if _url.get_backend_name() == "sqlite":
+    _write_pragmas = {**SQLITE_WRITE_PRAGMAS, **SQLITE_PRAGMAS}
+    _configure_sqlite(engine, _write_pragmas, True)
+    _configure_sqlite(async_engine.sync_engine, _write_pragmas, True)
+    if async_read_engine is not async_engine:
+        _configure_sqlite(
+            async_read_engine.sync_engine,
+            {**SQLITE_PRAGMAS, "query_only": 1},
+            False,
+        )
 
 
 def create_db_and_tables():
     Base.metadata.create_all(engine)
 
 
-def get_session():
-    with Session(engine) as session:
+async def dispose_engines():
+    await async_engine.dispose()
+    if async_read_engine is not async_engine:
+        await async_read_engine.dispose()
+
+
+def unique_violation(error: IntegrityError) -> str | None:
+    """The "table.column" whose UNIQUE constraint `error` broke, if any."""
+    message = str(error.orig)
+    prefix = "UNIQUE constraint failed: "
+    return message[len(prefix):] if message.startswith(prefix) else None
+
+
+def write_session() -> AsyncSession:
+    # Objects stay loaded after commit: responses don't re-SELECT every row,
+    # and async sessions can't lazily reload expired attributes anyway.
+    return AsyncSession(async_engine, expire_on_commit=False)
+
+
+def read_session() -> AsyncSession:
+    return AsyncSession(async_read_engine, autoflush=False)
+
+
+async def get_session():
+    async with write_session() as session:
+        yield session
+
+
+async def get_read_session():
+    async with read_session() as session:
         yield session
 
 
-SessionDep = Annotated[Session, Depends(get_session)]
+SessionDep = Annotated[AsyncSession, Depends(get_session)]
+ReadSessionDep = Annotated[AsyncSession, Depends(get_read_session)]
@@ -0,0 +1,93 @@
+import csv
+import io
+import zlib
+from datetime import date, datetime
+from typing import AsyncIterator, Literal
+
+import orjson
+from fastapi.responses import StreamingResponse
+from sqlalchemy import Select
+
+from app.database import read_session
+
+ExportFormat = Literal["ndjson", "csv"]
+
+# Rows fetched from SQLite per round trip, and bytes buffered per chunk sent
+EXPORT_BATCH_SIZE = 1000
+EXPORT_CHUNK_BYTES = 64 * 1024
+
+_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+
+async def _encode_lines(stmt: Select, fmt: ExportFormat) -> AsyncIterator[bytes]:
+    # The generator outlives the request's dependencies, so it owns its session
+    async with read_session() as db:
+        result = await db.stream(
+            stmt.execution_options(yield_per=EXPORT_BATCH_SIZE)
+        )
+        columns = list(result.keys())
+
+        if fmt == "csv":
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow(columns)
+            async for row in result:
+                writer.writerow(
+                    v.isoformat() if isinstance(v, (date, datetime)) else v
+                    for v in row
+                )
+                yield buffer.getvalue().encode()
+                buffer.seek(0)
+                buffer.truncate()
+        else:
+            # orjson writes dates as ISO 8601 and UTF-8 unescaped, like before
+            async for row in result:
+                yield orjson.dumps(
+                    dict(zip(columns, row)), option=orjson.OPT_APPEND_NEWLINE
+                )
+
+
+async def _chunked(
+    lines: AsyncIterator[bytes], compress: bool
+) -> AsyncIterator[bytes]:
+    compressor = zlib.compressobj(wbits=31) if compress else None
+    pending: list[bytes] = []
+    pending_size = 0
+
+    async for line in lines:
+        pending.append(line)
+        pending_size += len(line)
+        if pending_size < EXPORT_CHUNK_BYTES:
+            continue
+
+        chunk = b"".join(pending)
+        pending, pending_size = [], 0
+        yield compressor.compress(chunk) if compressor else chunk
+
+    chunk = b"".join(pending)
+    if compressor:
+        yield compressor.compress(chunk) + compressor.flush()
+    elif chunk:
+        yield chunk
+
+
+def export_response(
+    stmt: Select, name: str, fmt: ExportFormat, compress: bool
+) -> StreamingResponse:
+    """Stream every row of `stmt` as NDJSON or CSV, optionally gzipped.
+
+    Rows are read with a server-side cursor and sent in small chunks, so
+    memory use stays flat regardless of table size.
+    """
+    filename = f"{name}.{fmt}"
+    media_type = _MEDIA_TYPES[fmt]
+
+    if compress:
+        filename += ".gz"
+        media_type = "application/gzip"
+
+    return StreamingResponse(
+        _chunked(_encode_lines(stmt, fmt), compress),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
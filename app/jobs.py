@@ -0,0 +1,278 @@
+"""In-process background jobs backed by the `jobs` table.
+
+Handlers are registered per kind with `@handler("kind")` and receive a
+`JobContext`. `JOB_WORKERS` tasks claim queued jobs one at a time, so long
+imports never hold an HTTP worker. A failing job is retried with
+exponential backoff and jitter until `max_attempts`. Raise `PermanentJobError`
+to fail at once. Enqueueing a job whose kind and params match a queued or
+running one returns that job instead of a new one.
+"""
+
+import asyncio
+import json
+import logging
+import random
+import time
+from typing import Awaitable, Callable
+
+from fastapi import HTTPException, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import (
+    JOB_MAX_ATTEMPTS,
+    JOB_POLL_SECONDS,
+    JOB_RETENTION_DAYS,
+    JOB_RETRY_BASE_SECONDS,
+    JOB_RETRY_MAX_SECONDS,
+    JOB_WORKERS,
+)
+from app.database import write_session
+from app.models.job import JOB_ACTIVE_STATUSES, Job
+from app.schemas.job import JobRead
+
+logger = logging.getLogger(__name__)
+
+
+class PermanentJobError(Exception):
+    """Fail the job without retrying (bad input, missing upstream resource)."""
+
+
+class JobContext:
+    def __init__(self, job: Job):
+        self.id = job.id
+        self.params = job.params
+        # Kept across retries so handlers can resume instead of starting over
+        self.progress = dict(job.progress or {})
+
+    async def update(self, **fields) -> None:
+        self.progress.update(fields)
+        async with write_session() as db:
+            await db.execute(
+                update(Job).where(Job.id == self.id).values(progress=self.progress)
+            )
+            await db.commit()
+
+
+Handler = Callable[[JobContext], Awaitable[None]]
+
+_handlers: dict[str, Handler] = {}
+_workers: list[asyncio.Task] = []
+_wakeup = asyncio.Event()
+
+
+def handler(kind: str) -> Callable[[Handler], Handler]:
+    def register(fn: Handler) -> Handler:
+        _handlers[kind] = fn
+        return fn
+
+    return register
+
+
+def _dedupe_key(kind: str, params: dict) -> str:
+    return f"{kind}:{json.dumps(params, sort_keys=True, separators=(',', ':'))}"
+
+
+async def _active_job(db: AsyncSession, key: str) -> Job | None:
+    return await db.scalar(
+        select(Job).where(Job.dedupe_key == key, Job.status.in_(JOB_ACTIVE_STATUSES))
+    )
+
+
+async def enqueue(db: AsyncSession, kind: str, params: dict) -> Job:
+    """Queue a job, or return the identical job already queued or running."""
+    key = _dedupe_key(kind, params)
+
+    while True:
+        existing = await _active_job(db, key)
+        if existing:
+            return existing
+
+        job = Job(
+            kind=kind,
+            params=params,
+            dedupe_key=key,
+            max_attempts=JOB_MAX_ATTEMPTS,
+            run_after=time.time(),
+        )
+        db.add(job)
+        try:
+            await db.commit()
+            break
+        except IntegrityError:
+            # Lost a race with an identical request. Look again: that job
+            # may already have finished, and then this one goes in after all.
+            await db.rollback()
+
+    await db.refresh(job)
+    _wakeup.set()
+    return job
+
+
+def accepted(job: Job) -> JSONResponse:
+    """202 response pointing at the job's status resource."""
+    return JSONResponse(
+        status_code=status.HTTP_202_ACCEPTED,
+        content=jsonable_encoder(JobRead.model_validate(job)),
+        headers={"Location": f"/api/jobs/{job.id}"},
+    )
+
+
+async def _claim_next(job_id: int | None = None) -> Job | None:
+    due = select(Job.id).where(Job.status == "queued")
+    if job_id is None:
+        due = due.where(Job.run_after <= time.time())
+    else:
+        due = due.where(Job.id == job_id)
+    next_id = due.order_by(Job.run_after, Job.id).limit(1).scalar_subquery()
+    stmt = (
+        update(Job)
+        .where(Job.id == next_id)
+        .values(
+            status="running",
+            attempts=Job.attempts + 1,
+            started_at=func.datetime("now"),
+        )
+        .returning(Job)
+        .execution_options(synchronize_session=False)
+    )
+
+    # One UPDATE ... RETURNING under BEGIN IMMEDIATE: no two workers get a job
+    async with write_session() as db:
+        job = await db.scalar(stmt)
+        await db.commit()
+
+    return job
+
+
+async def _finish(job_id: int, **values) -> None:
+    async with write_session() as db:
+        await db.execute(update(Job).where(Job.id == job_id).values(**values))
+        await db.commit()
+
+
+def _backoff(attempts: int) -> float:
+    delay = min(JOB_RETRY_BASE_SECONDS * 2 ** (attempts - 1), JOB_RETRY_MAX_SECONDS)
+    return delay * random.uniform(0.5, 1.0)
+
+
+async def _run(job: Job) -> None:
+    fn = _handlers.get(job.kind)
+    ctx = JobContext(job)
+
+    try:
+        if fn is None:
+            raise PermanentJobError(f"No handler for job kind {job.kind!r}.")
+        await fn(ctx)
+    except asyncio.CancelledError:
+        # Shutting down: hand the job back without spending the attempt
+        await _finish(job.id, status="queued", attempts=job.attempts - 1)
+        raise
+    except PermanentJobError as exc:
+        logger.warning("Job %d (%s) failed: %s", job.id, job.kind, exc)
+        await _finish(
+            job.id, status="failed", error=str(exc), finished_at=func.datetime("now")
+        )
+    except Exception as exc:
+        error = f"{type(exc).__name__}: {getattr(exc, 'detail', exc)}"
+        if job.attempts >= job.max_attempts:
+            logger.error(
+                "Job %d (%s) gave up after %d attempts: %s",
+                job.id, job.kind, job.attempts, error,
+            )
+            await _finish(
+                job.id, status="failed", error=error, finished_at=func.datetime("now")
+            )
+        else:
+            delay = _backoff(job.attempts)
+            logger.warning(
+                "Job %d (%s) attempt %d failed, retrying in %.1fs: %s",
+                job.id, job.kind, job.attempts, delay, error,
+            )
+            await _finish(
+                job.id, status="queued", error=error, run_after=time.time() + delay
+            )
+    else:
+        await _finish(
+            job.id, status="succeeded", error=None, finished_at=func.datetime("now")
+        )
+
+
+async def _worker() -> None:
+    while True:
+        _wakeup.clear()
+        try:
+            job = await _claim_next()
+        except Exception:
+            logger.exception("Could not claim a job")
+            job = None
+
+        if job is None:
+            # Woken early by enqueue; the timeout picks up retries coming due
+            try:
+                await asyncio.wait_for(_wakeup.wait(), JOB_POLL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+            continue
+
+        try:
+            await _run(job)
+        except Exception:
+            # Only bookkeeping can get here; the job stays running until restart
+            logger.exception("Could not record the outcome of job %d", job.id)
+
+
+async def run_now(job_id: int) -> Job | None:
+    """Claim a queued job and run it in the caller's task, retry delay or not.
+
+    For tests and command-line tools; the app leaves jobs to the workers.
+    Returns the job's row afterwards, or None if it wasn't queued.
+    """
+    job = await _claim_next(job_id)
+    if job is None:
+        return None
+
+    await _run(job)
+    async with write_session() as db:
+        return await db.get(Job, job_id)
+
+
+async def start() -> None:
+    """Requeue jobs interrupted by a crash, drop old ones, start the workers."""
+    async with write_session() as db:
+        await db.execute(
+            update(Job)
+            .where(Job.status == "running")
+            .values(status="queued", run_after=time.time())
+        )
+        await db.execute(
+            delete(Job).where(
+                Job.status.in_(("succeeded", "failed")),
+                Job.finished_at < func.datetime("now", f"-{JOB_RETENTION_DAYS} days"),
+            )
+        )
+        await db.commit()
+
+    _workers.extend(asyncio.create_task(_worker()) for _ in range(JOB_WORKERS))
+
+
+async def stop() -> None:
+    for task in _workers:
+        task.cancel()
+    await asyncio.gather(*_workers, return_exceptions=True)
+    _workers.clear()
+
+
+async def get_job(db: AsyncSession, job_id: int) -> Job:
+    job = await db.get(Job, job_id)
+
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Job not found.",
+        )
+
+    return job
@@ -3,14 +3,27 @@ import logging
 import uvicorn
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, Response
+from fastapi.responses import JSONResponse, ORJSONResponse, PlainTextResponse, Response
 from contextlib import asynccontextmanager
-import requests
+import httpx
 
 from app import PORT
-from app.database import create_db_and_tables
+from app import jobs, metrics, query_stats
+from app.database import (
+    async_engine,
+    async_read_engine,
+    create_db_and_tables,
+    dispose_engines,
+    engine,
+)
+from app.compression import CompressionMiddleware
+from app.migrations import run_migrations
+from app.response_cache import ResponseCacheMiddleware
+from app.services import image_cache, tmdb_cache, tmdb_service, tmdb_sync
 from app.routers.user import user_router
 from app.routers.movie import movie_router
+from app.routers.tmdb import tmdb_router
+from app.routers.job import job_router
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -19,26 +32,61 @@ logger = logging.getLogger(__name__)
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     create_db_and_tables()
+    run_migrations()
+    await tmdb_cache.purge_expired()
+    await tmdb_service.start_client()
+    await jobs.start()
+    tmdb_sync.start()
     yield
+    await tmdb_sync.stop()
+    await jobs.stop()
+    await tmdb_service.close_client()
+    await image_cache.close_client()
+    await dispose_engines()
 
 
 def create_app() -> FastAPI:
-    server = FastAPI(title="Final programacion Movie Backend API", lifespan=lifespan)
+    server = FastAPI(
+        title="Final programacion Movie Backend API",
+        lifespan=lifespan,
+        default_response_class=ORJSONResponse,
+    )
 
+    # Added first so it sits inside CORS and cached bodies carry no CORS headers
+    server.add_middleware(ResponseCacheMiddleware)
+    # Outside the cache: entries stay uncompressed and each client gets its coding
+    server.add_middleware(CompressionMiddleware)
+    server.add_middleware(query_stats.QueryStatsMiddleware)
     server.add_middleware(
         CORSMiddleware,
         allow_origins=["*"],
         allow_methods=["*"],
         allow_headers=["*"],
     )
+    # Outermost, so cached responses and CORS preflights are timed too
+    server.add_middleware(metrics.MetricsMiddleware)
+
+    for name, target in (
+        ("sync", engine),
+        ("write", async_engine.sync_engine),
+        ("read", async_read_engine.sync_engine),
+    ):
+        metrics.name_engine(target, name)
+        query_stats.instrument_engine(target)
 
     server.include_router(user_router, prefix="/api")
     server.include_router(movie_router, prefix="/api")
+    server.include_router(tmdb_router, prefix="/api")
+    server.include_router(job_router, prefix="/api")
 
     @server.get("/favicon.ico")
     async def favicon():
         return Response(status_code=204)
 
+    @server.get("/metrics", include_in_schema=False)
+    async def get_metrics():
+        return PlainTextResponse(metrics.render(), media_type=metrics.CONTENT_TYPE)
+
     @server.exception_handler(Exception)
     async def global_exception_handler(_: Request, exc: Exception):
         return JSONResponse(
@@ -49,10 +97,8 @@ def create_app() -> FastAPI:
             },
         )
 
-    @server.exception_handler(requests.exceptions.RequestException)
-    async def requests_error_handler(
-        _: Request, exc: requests.exceptions.RequestException
-    ):
+    @server.exception_handler(httpx.HTTPError)
+    async def http_client_error_handler(_: Request, exc: httpx.HTTPError):
         return JSONResponse(
             status_code=502,
             content={
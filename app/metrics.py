@@ -0,0 +1,285 @@
+"""Process-local metrics in the Prometheus text exposition format.
+
+Counters and histograms are plain dicts keyed by label tuples, so recording a
+sample is a couple of dict lookups and a bisect. Everything is updated from
+the event loop (SQLAlchemy events included, since the async engines run
+them there), so no locking is needed.
+"""
+
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from typing import Callable
+
+import anyio.to_thread
+from sqlalchemy import Engine
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds; request latency and query/TMDB timings share one layout
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+UNMATCHED_ROUTE = "<unmatched>"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names: tuple[str, ...], values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labels: tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.label_names = labels
+        self.values: defaultdict[tuple, float] = defaultdict(float)
+
+    def inc(self, labels: tuple = (), amount: float = 1.0) -> None:
+        self.values[labels] += amount
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for labels, value in self.values.items():
+            lines.append(f"{self.name}{_labels(self.label_names, labels)} {value}")
+        return lines
+
+
+class Gauge:
+    """A settable value, or one computed at scrape time by `collect`."""
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labels: tuple[str, ...] = (),
+        collect: Callable[[], dict[tuple, float]] | None = None,
+    ):
+        self.name = name
+        self.help = help
+        self.label_names = labels
+        self.collect = collect
+        self.values: defaultdict[tuple, float] = defaultdict(float)
+
+    def inc(self, labels: tuple = (), amount: float = 1.0) -> None:
+        self.values[labels] += amount
+
+    def dec(self, labels: tuple = (), amount: float = 1.0) -> None:
+        self.values[labels] -= amount
+
+    def render(self) -> list[str]:
+        values = self.collect() if self.collect else self.values
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge"]
+        for labels, value in values.items():
+            lines.append(f"{self.name}{_labels(self.label_names, labels)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labels: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = BUCKETS,
+    ):
+        self.name = name
+        self.help = help
+        self.label_names = labels
+        self.buckets = buckets
+        # labels -> [per-bucket counts (last one is +Inf), sum]
+        self.series: dict[tuple, list] = {}
+
+    def observe(self, labels: tuple, value: float) -> None:
+        series = self.series.get(labels)
+        if series is None:
+            series = self.series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for labels, (counts, total) in self.series.items():
+            cumulative = 0
+            for bound, count in zip((*self.buckets, "+Inf"), counts):
+                cumulative += count
+                le = _labels(self.label_names, labels, f'le="{bound}"')
+                lines.append(f"{self.name}_bucket{le} {cumulative}")
+            plain = _labels(self.label_names, labels)
+            lines.append(f"{self.name}_sum{plain} {total}")
+            lines.append(f"{self.name}_count{plain} {cumulative}")
+        return lines
+
+
+def _threadpool_usage() -> dict[tuple, float]:
+    limiter = anyio.to_thread.current_default_thread_limiter()
+    return {("busy",): limiter.borrowed_tokens, ("max",): limiter.total_tokens}
+
+
+_engine_names: dict[Engine, str] = {}
+
+
+def _pool_usage() -> dict[tuple, float]:
+    # Only QueuePool reports checkouts; SingletonThreadPool (:memory:) doesn't
+    return {
+        (name,): engine.pool.checkedout()
+        for engine, name in _engine_names.items()
+        if hasattr(engine.pool, "checkedout")
+    }
+
+
+http_requests = Counter(
+    "http_requests_total",
+    "HTTP requests by route template and status code.",
+    ("method", "route", "status"),
+)
+http_duration = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template.",
+    ("method", "route"),
+)
+http_in_flight = Gauge("http_requests_in_flight", "HTTP requests being served.")
+threadpool = Gauge(
+    "threadpool_threads",
+    "Worker threads of the default AnyIO limiter (busy and max).",
+    ("state",),
+    collect=_threadpool_usage,
+)
+db_pool = Gauge(
+    "db_pool_connections_in_use",
+    "Database connections checked out of each engine's pool.",
+    ("engine",),
+    collect=_pool_usage,
+)
+db_duration = Histogram(
+    "db_query_duration_seconds",
+    "Time spent executing SQL statements, by engine and statement type.",
+    ("engine", "operation"),
+)
+db_errors = Counter(
+    "db_query_errors_total",
+    "SQL statements that raised, by engine.",
+    ("engine",),
+)
+tmdb_duration = Histogram(
+    "tmdb_request_duration_seconds",
+    "Outbound TMDB calls by endpoint and response status.",
+    ("endpoint", "status"),
+)
+tmdb_retries = Counter(
+    "tmdb_retries_total",
+    "TMDB calls retried by the governor, by reason.",
+    ("reason",),
+)
+tmdb_coalesced = Counter(
+    "tmdb_coalesced_total",
+    "TMDB fetches and imports that joined an identical one already in flight.",
+    ("kind",),
+)
+movie_searches = Counter(
+    "movie_search_total",
+    "Hybrid movie searches by where the answer came from (local, hybrid, tmdb).",
+    ("source",),
+)
+image_cache = Counter(
+    "image_cache_events_total",
+    "Poster and backdrop cache hits, misses (downloads) and evictions.",
+    ("event",),
+)
+# Filled in by the TMDB governor
+tmdb_governor = Gauge(
+    "tmdb_governor",
+    "TMDB governor state: concurrency limit, calls in flight and queued, tokens left, breaker open.",
+    ("field",),
+)
+
+REGISTRY = [
+    http_requests,
+    http_duration,
+    http_in_flight,
+    threadpool,
+    db_pool,
+    db_duration,
+    db_errors,
+    tmdb_duration,
+    tmdb_retries,
+    tmdb_coalesced,
+    movie_searches,
+    image_cache,
+    tmdb_governor,
+]
+
+
+def render() -> str:
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+def name_engine(engine: Engine, name: str) -> None:
+    """Label `engine`'s pool and query samples with `name`.
+
+    Statements are timed once, by app.query_stats, which reports them here.
+    """
+    _engine_names[engine] = name
+
+
+def observe_query(engine: Engine, statement: str, seconds: float) -> None:
+    name = _engine_names.get(engine)
+    if name is not None:
+        operation = statement.split(None, 1)[0].upper()
+        db_duration.observe((name, operation), seconds)
+
+
+def observe_query_error(engine: Engine) -> None:
+    name = _engine_names.get(engine)
+    if name is not None:
+        db_errors.inc((name,))
+
+
+def observe_tmdb(endpoint: str, status: int | str, seconds: float) -> None:
+    tmdb_duration.observe((endpoint, str(status)), seconds)
+
+
+class MetricsMiddleware:
+    """Record request counts, latency and in-flight requests per route template.
+
+    The template comes from `scope["route"]`, which the router (or the
+    response cache, for hits) sets. Anything else is labelled unmatched so
+    probes of random paths can't grow the label set.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        http_in_flight.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            http_in_flight.dec()
+            route = getattr(scope.get("route"), "path", UNMATCHED_ROUTE)
+            method = scope["method"]
+            http_requests.inc((method, route, status))
+            http_duration.observe((method, route), elapsed)
@@ -0,0 +1,132 @@
+"""Schema changes that `Base.metadata.create_all` cannot apply on its own.
+
+`create_all` only creates missing tables, so anything touching an existing
+database (virtual tables, triggers, new indexes, backfills) lives here. Each
+migration runs once; the applied count is tracked in SQLite's `user_version`.
+Migrations must stay idempotent because a fresh database gets every table from
+`create_all` first and then runs the whole list.
+"""
+
+import logging
+
+from sqlalchemy import Connection
+from sqlalchemy.schema import CreateIndex
+
+from app.database import Base, engine
+
+logger = logging.getLogger(__name__)
+
+
+def create_movie_search_index(conn: Connection) -> None:
+    # External-content FTS5 table: stores only the index, rows live in movies.
+    # Triggers keep it in sync for every write path, including bulk imports.
+    conn.exec_driver_sql(
+        """
+        CREATE VIRTUAL TABLE IF NOT EXISTS movies_fts USING fts5(
+            title, overview,
+            content='movies', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2'
+        )
+        """
+    )
+    conn.exec_driver_sql(
+        """
+        CREATE TRIGGER IF NOT EXISTS movies_fts_ai AFTER INSERT ON movies BEGIN
+            INSERT INTO movies_fts(rowid, title, overview)
+            VALUES (new.id, new.title, new.overview);
+        END
+        """
+    )
+    conn.exec_driver_sql(
+        """
+        CREATE TRIGGER IF NOT EXISTS movies_fts_ad AFTER DELETE ON movies BEGIN
+            INSERT INTO movies_fts(movies_fts, rowid, title, overview)
+            VALUES ('delete', old.id, old.title, old.overview);
+        END
+        """
+    )
+    conn.exec_driver_sql(
+        """
+        CREATE TRIGGER IF NOT EXISTS movies_fts_au
+        AFTER UPDATE OF title, overview ON movies BEGIN
+            INSERT INTO movies_fts(movies_fts, rowid, title, overview)
+            VALUES ('delete', old.id, old.title, old.overview);
+            INSERT INTO movies_fts(rowid, title, overview)
+            VALUES (new.id, new.title, new.overview);
+        END
+        """
+    )
+    # Index rows that existed before the table was created
+    conn.exec_driver_sql("INSERT INTO movies_fts(movies_fts) VALUES ('rebuild')")
+
+
+def create_missing_indexes(conn: Connection) -> None:
+    # create_all skips indexes on tables that already exist
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            conn.execute(CreateIndex(index, if_not_exists=True))
+
+
+def _genre_ids_of(movie: str) -> str:
+    # Movie.genre_ids is a JSON list such as "[12, 878]"; ignore anything else
+    return (
+        f"json_each(CASE WHEN json_valid({movie}.genre_ids) "
+        f"THEN {movie}.genre_ids ELSE '[]' END)"
+    )
+
+
+def create_movie_genre_links(conn: Connection) -> None:
+    # movie_genres is derived from Movie.genre_ids by triggers, so manual
+    # writes and every importer keep it current without extra code.
+    conn.exec_driver_sql(
+        f"""
+        CREATE TRIGGER IF NOT EXISTS movie_genres_ai AFTER INSERT ON movies BEGIN
+            INSERT OR IGNORE INTO movie_genres(movie_id, genre_id)
+            SELECT new.id, value FROM {_genre_ids_of("new")}
+            WHERE type = 'integer';
+        END
+        """
+    )
+    conn.exec_driver_sql(
+        f"""
+        CREATE TRIGGER IF NOT EXISTS movie_genres_au
+        AFTER UPDATE OF genre_ids ON movies BEGIN
+            DELETE FROM movie_genres WHERE movie_id = old.id;
+            INSERT OR IGNORE INTO movie_genres(movie_id, genre_id)
+            SELECT new.id, value FROM {_genre_ids_of("new")}
+            WHERE type = 'integer';
+        END
+        """
+    )
+    conn.exec_driver_sql(
+        """
+        CREATE TRIGGER IF NOT EXISTS movie_genres_ad AFTER DELETE ON movies BEGIN
+            DELETE FROM movie_genres WHERE movie_id = old.id;
+        END
+        """
+    )
+    # Backfill rows stored before the table existed
+    conn.exec_driver_sql(
+        f"""
+        INSERT OR IGNORE INTO movie_genres(movie_id, genre_id)
+        SELECT movies.id, value FROM movies, {_genre_ids_of("movies")}
+        WHERE type = 'integer'
+        """
+    )
+
+
+MIGRATIONS = [
+    create_movie_search_index,
+    create_missing_indexes,
+    create_movie_genre_links,
+]
+
+
+def run_migrations() -> None:
+    with engine.begin() as conn:
+        version = conn.exec_driver_sql("PRAGMA user_version").scalar()
+
+        for number, migration in enumerate(MIGRATIONS[version:], start=version + 1):
+            logger.info("Applying migration %d: %s", number, migration.__name__)
+            migration(conn)
+            conn.exec_driver_sql(f"PRAGMA user_version = {number}")
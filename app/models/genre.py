@@ -0,0 +1,25 @@
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy import ForeignKey, Index, String
+
+from app.database import Base
+
+
+class Genre(Base):
+    __tablename__ = "genres"
+
+    # TMDB genre id, so movie genre_ids can be linked before the list is imported
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=False)
+    name: Mapped[str] = mapped_column(String, nullable=False)
+
+
+class MovieGenre(Base):
+    __tablename__ = "movie_genres"
+    __table_args__ = (
+        Index("ix_movie_genres_genre_id_movie_id", "genre_id", "movie_id"),
+    )
+
+    movie_id: Mapped[int] = mapped_column(
+        ForeignKey("movies.id", ondelete="CASCADE"), primary_key=True
+    )
+    # No foreign key: links may reference genres not imported from TMDB yet
+    genre_id: Mapped[int] = mapped_column(primary_key=True)
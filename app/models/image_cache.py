@@ -0,0 +1,16 @@
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy import Float, Integer, String
+
+from app.database import Base
+
+
+class CachedImage(Base):
+    __tablename__ = "image_cache"
+
+    # TMDB size + path, e.g. "w185/kqjL17yufvn9OVLyXYpvtyrFfak.jpg"
+    key: Mapped[str] = mapped_column(String, primary_key=True)
+    # SHA-256 of the file, which is also its name on disk
+    digest: Mapped[str] = mapped_column(String(64), nullable=False, index=True)
+    size: Mapped[int] = mapped_column(Integer, nullable=False)
+    content_type: Mapped[str] = mapped_column(String, nullable=False)
+    last_used_at: Mapped[float] = mapped_column(Float, nullable=False, index=True)
@@ -0,0 +1,40 @@
+from datetime import datetime
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy import JSON, DateTime, Float, Index, Integer, String, Text, func
+
+from app.database import Base
+
+JOB_ACTIVE_STATUSES = ("queued", "running")
+
+
+class Job(Base):
+    __tablename__ = "jobs"
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    kind: Mapped[str] = mapped_column(String, nullable=False)
+    params: Mapped[dict] = mapped_column(JSON, nullable=False)
+    # kind + params; at most one queued or running job per key
+    dedupe_key: Mapped[str] = mapped_column(String, nullable=False)
+    status: Mapped[str] = mapped_column(String, nullable=False, default="queued")
+    progress: Mapped[dict] = mapped_column(JSON, nullable=False, default=dict)
+    attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    max_attempts: Mapped[int] = mapped_column(Integer, nullable=False)
+    error: Mapped[str | None] = mapped_column(Text)
+    # Epoch seconds; pushed forward by the retry backoff
+    run_after: Mapped[float] = mapped_column(Float, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        server_default=func.datetime("now"),
+        nullable=False,
+    )
+    started_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True))
+    finished_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True))
+
+
+Index("ix_jobs_status_run_after", Job.status, Job.run_after)
+Index(
+    "ux_jobs_active_dedupe_key",
+    Job.dedupe_key,
+    unique=True,
+    sqlite_where=Job.status.in_(JOB_ACTIVE_STATUSES),
+)
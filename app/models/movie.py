@@ -1,6 +1,18 @@
 from datetime import datetime, date
 from sqlalchemy.orm import Mapped, mapped_column
-from sqlalchemy import String, Text, Float, Integer, Date, DateTime, func
+from sqlalchemy import (
+    String,
+    Text,
+    Float,
+    Integer,
+    Date,
+    DateTime,
+    Index,
+    func,
+    column,
+    literal_column,
+    table,
+)
 
 from app.database import Base
 
@@ -23,3 +35,14 @@ class Movie(Base):
         server_default=func.datetime("now"),
         nullable=False,
     )
+
+
+# Sort key for "best rated" listings; unrated movies rank as 0. The literal
+# keeps the SQL identical to the index expression so SQLite can use it.
+movie_rating = func.coalesce(Movie.vote_average, literal_column("0.0"))
+
+Index("ix_movies_rating_id", movie_rating, Movie.id)
+Index("ix_movies_created_at_id", Movie.created_at, Movie.id)
+
+# FTS5 index over title/overview (created in app/migrations.py, not by create_all)
+movie_search = table("movies_fts", column("rowid", Integer), column("rank", Float))
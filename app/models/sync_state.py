@@ -0,0 +1,16 @@
+from datetime import datetime
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy import JSON, DateTime, String
+
+from app.database import Base
+
+
+class SyncState(Base):
+    __tablename__ = "sync_state"
+
+    name: Mapped[str] = mapped_column(String, primary_key=True)
+    # UTC; changes up to this instant have been collected into `pending`
+    watermark: Mapped[datetime | None] = mapped_column(DateTime)
+    # TMDB ids of stored movies that changed and still need a refresh
+    pending: Mapped[list] = mapped_column(JSON, nullable=False, default=list)
+    last_run: Mapped[dict | None] = mapped_column(JSON)
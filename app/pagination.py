@@ -0,0 +1,106 @@
+import base64
+import json
+from dataclasses import dataclass
+from typing import Any, Callable
+
+from fastapi import HTTPException, status
+from sqlalchemy import Select, and_, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql.elements import ColumnElement
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+@dataclass(frozen=True)
+class SortKey:
+    """A stable ordering for keyset pagination.
+
+    `key` is the leading sort expression (None to sort by id alone) and `id`
+    breaks ties. An index on (key, id) lets every page start with a seek.
+    `columns` lists what `key_value` reads from a row, so selects that
+    trim their columns can keep them.
+    """
+
+    name: str
+    id: ColumnElement
+    key: ColumnElement | None = None
+    key_value: Callable[[Any], Any] | None = None
+    descending: bool = False
+    columns: tuple[ColumnElement, ...] = ()
+
+    def order_by(self) -> list[ColumnElement]:
+        columns = [self.id] if self.key is None else [self.key, self.id]
+        return [c.desc() for c in columns] if self.descending else columns
+
+    def after(self, values: list) -> ColumnElement:
+        # Written as `key <= v AND (key < v OR id < i)` instead of a row-value
+        # comparison so SQLite can seek on expression indexes too.
+        last_id = values[-1]
+        if self.descending:
+            id_after = self.id < last_id
+            if self.key is None:
+                return id_after
+            return and_(self.key <= values[0], or_(self.key < values[0], id_after))
+
+        id_after = self.id > last_id
+        if self.key is None:
+            return id_after
+        return and_(self.key >= values[0], or_(self.key > values[0], id_after))
+
+    def cursor_columns(self) -> list[ColumnElement]:
+        return [self.id, *self.columns]
+
+    def values_of(self, row) -> list:
+        row_id = getattr(row, self.id.key)
+        if self.key is None:
+            return [row_id]
+        return [self.key_value(row), row_id]
+
+
+def encode_cursor(sort: SortKey, values: list) -> str:
+    raw = json.dumps([sort.name, values], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(sort: SortKey, cursor: str) -> list:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        name, values = json.loads(raw)
+    except (ValueError, TypeError):
+        name, values = None, None
+
+    expected = 1 if sort.key is None else 2
+    if name != sort.name or not isinstance(values, list) or len(values) != expected:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor.",
+        )
+
+    return values
+
+
+async def paginate(
+    db: AsyncSession,
+    stmt: Select,
+    sort: SortKey,
+    cursor: str | None,
+    limit: int,
+    skip: int = 0,
+) -> tuple[list, str | None]:
+    """Fetch one page of `stmt` and the cursor for the page after it.
+
+    Page N costs the same as page 1: the cursor turns into an index seek
+    instead of an OFFSET that walks and discards earlier rows. `stmt`
+    selects columns, and the page comes back as rows.
+    """
+    if cursor:
+        stmt = stmt.where(sort.after(decode_cursor(sort, cursor)))
+
+    stmt = stmt.order_by(*sort.order_by()).offset(skip).limit(limit + 1)
+    rows = (await db.execute(stmt)).all()
+
+    if len(rows) <= limit:
+        return rows, None
+
+    rows = rows[:limit]
+    return rows, encode_cursor(sort, sort.values_of(rows[-1]))
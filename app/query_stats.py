@@ -0,0 +1,152 @@
+"""Per-request SQL accounting: query count and DB time, slow queries, N+1.
+
+Every statement run while a request is being served is tallied on a
+context-local `RequestQueries`; the total goes out as a `Server-Timing`
+header. Statements slower than `SLOW_QUERY_MS` are logged with their
+parameters and `EXPLAIN QUERY PLAN`, and a statement repeated more than
+`N_PLUS_ONE_THRESHOLD` times in one request is reported as a likely N+1.
+"""
+
+import logging
+import time
+from collections import Counter
+from contextvars import ContextVar
+
+from sqlalchemy import Engine, event
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app import N_PLUS_ONE_THRESHOLD, SLOW_QUERY_MS, metrics
+
+logger = logging.getLogger(__name__)
+
+_EXPLAINABLE = ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH")
+
+
+class RequestQueries:
+    def __init__(self, scope: Scope):
+        self.scope = scope
+        self.count = 0
+        self.seconds = 0.0
+        self.statements: Counter[str] = Counter()
+
+    @property
+    def endpoint(self) -> str:
+        route = self.scope.get("route")
+        return f"{self.scope['method']} {getattr(route, 'path', self.scope['path'])}"
+
+
+_current: ContextVar[RequestQueries | None] = ContextVar("request_queries", default=None)
+
+
+def instrument_engine(engine: Engine) -> None:
+    """Time, tally and check every statement `engine` executes. Idempotent.
+
+    This is the only timing hook on the engines; each sample is also passed
+    on to app.metrics.
+    """
+    if event.contains(engine, "before_cursor_execute", _before_execute):
+        return
+
+    event.listen(engine, "before_cursor_execute", _before_execute)
+    event.listen(engine, "after_cursor_execute", _after_execute)
+    event.listen(engine, "handle_error", _on_error)
+
+
+def _before_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+def _after_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_started"].pop()
+    metrics.observe_query(conn.engine, statement, elapsed)
+
+    stats = _current.get()
+    if stats is not None:
+        stats.count += 1
+        stats.seconds += elapsed
+        stats.statements[statement] += 1
+
+    if elapsed * 1000 >= SLOW_QUERY_MS:
+        _log_slow_query(conn, statement, parameters, executemany, elapsed, stats)
+
+
+def _on_error(context):
+    conn = context.connection
+    if conn is not None and conn.info.get("query_started"):
+        conn.info["query_started"].pop()
+        metrics.observe_query_error(conn.engine)
+
+
+def _explain(conn, statement: str, parameters) -> str:
+    if not statement.lstrip().upper().startswith(_EXPLAINABLE):
+        return "(not applicable)"
+
+    # A raw DBAPI cursor: bypasses these events and the connection's state
+    cursor = conn.connection.cursor()
+    try:
+        cursor.execute(f"EXPLAIN QUERY PLAN {statement}", parameters)
+        return "; ".join(row[-1] for row in cursor.fetchall())
+    except Exception as exc:  # the log line must never break the request
+        return f"(unavailable: {exc})"
+    finally:
+        cursor.close()
+
+
+def _log_slow_query(conn, statement, parameters, executemany, elapsed, stats):
+    if executemany:
+        parameters = parameters[0] if parameters else ()
+
+    logger.warning(
+        "Slow query (%.1f ms) in %s: %s | params=%r | plan: %s",
+        elapsed * 1000,
+        stats.endpoint if stats else "outside a request",
+        " ".join(statement.split()),
+        parameters,
+        _explain(conn, statement, parameters),
+    )
+
+
+def server_timing(stats: RequestQueries) -> str:
+    return f'db;dur={stats.seconds * 1000:.2f};desc="{stats.count} queries"'
+
+
+class QueryStatsMiddleware:
+    """Count the SQL each request runs, report it and flag repeated statements.
+
+    Queries a streaming response runs after its headers are sent are still
+    checked for N+1 but can't be part of its Server-Timing header.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestQueries(scope)
+        token = _current.set(stats)
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message).append("Server-Timing", server_timing(stats))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current.reset(token)
+            self._check_repeats(stats)
+
+    @staticmethod
+    def _check_repeats(stats: RequestQueries) -> None:
+        for statement, count in stats.statements.items():
+            if count > N_PLUS_ONE_THRESHOLD:
+                logger.warning(
+                    "Possible N+1 in %s: statement ran %d times: %s",
+                    stats.endpoint,
+                    count,
+                    " ".join(statement.split()),
+                )
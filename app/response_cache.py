@@ -0,0 +1,178 @@
+"""In-process cache for hot GET responses, with ETag revalidation.
+
+Cached routes are answered from memory without opening a session or running
+response model validation again. Services that write a resource call
+`invalidate` after committing. The TTL only bounds staleness from writers
+outside this process, such as CLI tools or other workers.
+"""
+
+import hashlib
+import re
+import time
+from urllib.parse import parse_qsl, urlencode
+
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app import RESPONSE_CACHE_MAX_AGE, RESPONSE_CACHE_MAX_BYTES, RESPONSE_CACHE_TTL
+from app.serialization import wants_msgpack
+from app.services.tmdb_cache import LRUCache
+
+# (path pattern, resource, is_detail). Listing keys embed the resource
+# generation, so bumping it drops every cached listing at once.
+CACHED_ROUTES = [
+    (re.compile(r"/api/movies/"), "movies", False),
+    (re.compile(r"/api/movies/(\d+)"), "movies", True),
+    (re.compile(r"/api/users/(\d+)"), "users", True),
+]
+
+CACHE_CONTROL = f"max-age={RESPONSE_CACHE_MAX_AGE}, must-revalidate".encode()
+
+_SKIPPED_HEADERS = {b"content-length", b"etag", b"cache-control"}
+
+_memory = LRUCache(RESPONSE_CACHE_MAX_BYTES)
+_generations = {resource: 0 for _, resource, _ in CACHED_ROUTES}
+
+
+def _detail_key(resource: str, resource_id: int) -> str:
+    return f"/api/{resource}/{resource_id}"
+
+
+def _cache_key(scope: Scope) -> tuple[str, str, int] | None:
+    path = scope["path"]
+    for pattern, resource, is_detail in CACHED_ROUTES:
+        match = pattern.fullmatch(path)
+        if not match:
+            continue
+
+        generation = _generations[resource]
+        if is_detail:
+            # Variants such as ?fields= aren't cached: invalidate() only
+            # knows the bare detail path
+            if scope["query_string"]:
+                return None
+            # /api/movies/007 is /api/movies/7, the key invalidate() drops
+            return _detail_key(resource, int(match[1])), resource, generation
+
+        query = sorted(parse_qsl(scope["query_string"].decode(), keep_blank_values=True))
+        # Listings are negotiated on Accept, so each format gets its own entry
+        variant = ";msgpack" if wants_msgpack(Headers(scope=scope).get("accept")) else ""
+        return f"{path}?{urlencode(query)}#{generation}{variant}", resource, generation
+
+    return None
+
+
+def invalidate(resource: str, *ids: int) -> None:
+    """Drop cached listings of `resource` and the detail pages of `ids`."""
+    _generations[resource] += 1
+    for resource_id in ids:
+        _memory.discard(_detail_key(resource, resource_id))
+
+
+def clear() -> None:
+    _memory.clear()
+
+
+def make_etag(body: bytes) -> bytes:
+    # A content hash is a strong validator: equal bytes, equal tag
+    return b'"' + hashlib.blake2b(body, digest_size=16).hexdigest().encode() + b'"'
+
+
+def etag_matches(if_none_match: str | None, etag: bytes) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+
+    # If-None-Match uses weak comparison, so W/"x" matches "x"
+    tag = etag.decode()
+    return any(
+        candidate.strip().removeprefix("W/") == tag
+        for candidate in if_none_match.split(",")
+    )
+
+
+async def _send_cached(send: Send, entry: tuple, if_none_match: str | None) -> None:
+    etag, headers, body, _ = entry
+    validators = [(b"etag", etag), (b"cache-control", CACHE_CONTROL)]
+
+    if etag_matches(if_none_match, etag):
+        await send({"type": "http.response.start", "status": 304, "headers": validators})
+        await send({"type": "http.response.body", "body": b""})
+        return
+
+    await send(
+        {
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [
+                *headers,
+                *validators,
+                (b"content-length", str(len(body)).encode()),
+            ],
+        }
+    )
+    await send({"type": "http.response.body", "body": body})
+
+
+class ResponseCacheMiddleware:
+    """Serve `CACHED_ROUTES` from memory and answer If-None-Match with 304.
+
+    Only successful responses are stored. A response rendered while its
+    resource was being written is sent but not stored, so it can't outlive
+    the invalidation.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] != "GET":
+            await self.app(scope, receive, send)
+            return
+
+        cache_key = _cache_key(scope)
+        if cache_key is None:
+            await self.app(scope, receive, send)
+            return
+
+        key, resource, generation = cache_key
+        if_none_match = Headers(scope=scope).get("if-none-match")
+
+        entry = _memory.get(key)
+        if entry is not None:
+            # Lets outer middleware (metrics) label the hit like a routed request
+            scope["route"] = entry[3]
+            await _send_cached(send, entry, if_none_match)
+            return
+
+        start: Message = {}
+        chunks: list[bytes] = []
+
+        async def capture(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                start.update(message)
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+
+        await self.app(scope, receive, capture)
+        body = b"".join(chunks)
+
+        if start["status"] != 200:
+            await send(start)
+            await send({"type": "http.response.body", "body": body})
+            return
+
+        headers = [
+            (name, value)
+            for name, value in start["headers"]
+            if name.lower() not in _SKIPPED_HEADERS
+        ]
+        # (etag, headers, body, matched route)
+        entry = (make_etag(body), headers, body, scope.get("route"))
+
+        if _generations[resource] == generation:
+            size = len(body) + sum(len(n) + len(v) for n, v in headers)
+            _memory.set(key, entry, time.time() + RESPONSE_CACHE_TTL, size)
+
+        await _send_cached(send, entry, if_none_match)
@@ -0,0 +1,23 @@
+from typing import Annotated
+from fastapi import APIRouter, status, Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import jobs
+from app.database import get_read_session
+from app.schemas.job import JobRead
+
+
+ReadSessionDep = Annotated[AsyncSession, Depends(get_read_session)]
+
+job_router = APIRouter(prefix="/jobs", tags=["Jobs"])
+
+
+@job_router.get(
+    "/{job_id}",
+    response_model=JobRead,
+    status_code=status.HTTP_200_OK,
+    summary="Get job status",
+    description="Report the status, attempts and progress of a background job.",
+)
+async def get_job(job_id: int, db: ReadSessionDep):
+    return await jobs.get_job(db, job_id)
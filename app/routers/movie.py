@@ -1,13 +1,31 @@
-from typing import Annotated
-from fastapi import APIRouter, status, Depends
-from sqlalchemy.orm import Session
+from typing import Annotated, Any, Literal
+from fastapi import APIRouter, BackgroundTasks, Body, Query, Request, status, Depends
+from fastapi.responses import FileResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.schemas.movie import MovieCreate, MovieRead, MovieUpdate
-from app.services import movie_service, tmdb
-from app.database import get_session
+from app.schemas.bulk import BulkResult
+from app.schemas.genre import GenreRead
+from app.schemas.job import JobRead
+from app.schemas.movie import MovieCreate, MovieRead, MovieSearchResults, MovieUpdate
+from app.schemas.tmdb import DumpImportResult
+from app.services import image_cache, movie_service, tmdb, tmdb_dump
+from app import jobs
+from app.bulk import BULK_MAX_ITEMS
+from app.database import get_read_session, get_session
+from app.export import ExportFormat, export_response
+from app.pagination import NEXT_CURSOR_HEADER
+from app.serialization import (
+    MOVIE_LIST,
+    MSGPACK_MEDIA_TYPE,
+    parse_fields,
+    row_response,
+    rows_response,
+    sparse_list,
+)
 
 
-SessionDep = Annotated[Session, Depends(get_session)]
+SessionDep = Annotated[AsyncSession, Depends(get_session)]
+ReadSessionDep = Annotated[AsyncSession, Depends(get_read_session)]
 
 movie_router = APIRouter(prefix="/movies", tags=["Movies"])
 
@@ -19,8 +37,22 @@ movie_router = APIRouter(prefix="/movies", tags=["Movies"])
     summary="Create a new movie",
     description="Create a new movie entry with the provided information.",
 )
-def create_movie(movie: MovieCreate, db: SessionDep):
-    return movie_service.create_movie(db, movie)
+async def create_movie(movie: MovieCreate, db: SessionDep):
+    return await movie_service.create_movie(db, movie)
+
+
+@movie_router.post(
+    "/bulk",
+    response_model=BulkResult,
+    status_code=status.HTTP_200_OK,
+    summary="Bulk create movies",
+    description="Create up to 10,000 movies in a single transaction. Each record is reported as created, conflict (TMDB id already taken) or invalid.",
+)
+async def bulk_create_movies(
+    items: Annotated[list[Any], Body(max_length=BULK_MAX_ITEMS)],
+    db: SessionDep,
+):
+    return await movie_service.bulk_create_movies(db, items)
 
 
 @movie_router.get(
@@ -28,16 +60,55 @@ def create_movie(movie: MovieCreate, db: SessionDep):
     response_model=list[MovieRead],
     status_code=status.HTTP_200_OK,
     summary="List movies",
-    description="Retrieve a list of movies with optional filters such as title, minimum rating, and pagination.",
+    description="Retrieve a list of movies with optional filters such as title, minimum rating, and pagination. Use 'q' for a ranked full-text search over title and overview. Pass the X-Next-Cursor response header back as 'cursor' to fetch the next page. Repeat 'genre' to filter by TMDB genre ids, matching any or all of them. Pass 'fields' (comma-separated, e.g. 'id,title,poster_path') to read and return only those fields. Send 'Accept: application/msgpack' for MessagePack.",
+    responses={status.HTTP_200_OK: {"content": {MSGPACK_MEDIA_TYPE: {}}}},
 )
-def list_movies(
-    db: SessionDep,
+async def list_movies(
+    db: ReadSessionDep,
+    request: Request,
     title: str | None = None,
     min_rating: float | None = None,
     skip: int = 0,
-    limit: int = 10,
+    limit: Annotated[int, Query(ge=1, le=1000)] = 10,
+    q: str | None = None,
+    sort: Literal["id", "rating", "newest"] = "id",
+    cursor: str | None = None,
+    genre: Annotated[list[int] | None, Query()] = None,
+    genre_match: Literal["any", "all"] = "any",
+    fields: str | None = None,
+):
+    selected = parse_fields(fields, MovieRead)
+    rows, next_cursor = await movie_service.list_movies(
+        db, title, min_rating, skip, limit, q, sort, cursor, genre, genre_match, selected
+    )
+    headers = {NEXT_CURSOR_HEADER: next_cursor} if next_cursor else None
+    adapter = MOVIE_LIST if selected is None else sparse_list(MovieRead, selected)
+
+    return rows_response(rows, adapter, headers, selected, request.headers.get("accept"))
+
+
+@movie_router.get(
+    "/export",
+    status_code=status.HTTP_200_OK,
+    summary="Export movies",
+    description="Stream the whole movie catalogue as NDJSON or CSV, optionally gzip-compressed.",
+)
+async def export_movies(
+    fmt: Annotated[ExportFormat, Query(alias="format")] = "ndjson",
+    gzip: bool = False,
 ):
-    return movie_service.list_movies(db, title, min_rating, skip, limit)
+    return export_response(movie_service.export_movies(), "movies", fmt, gzip)
+
+
+@movie_router.get(
+    "/genres",
+    response_model=list[GenreRead],
+    status_code=status.HTTP_200_OK,
+    summary="List genres",
+    description="Retrieve every known genre with the number of stored movies in it.",
+)
+async def list_genres(db: ReadSessionDep):
+    return await movie_service.list_genres(db)
 
 
 @movie_router.get(
@@ -45,10 +116,45 @@ def list_movies(
     response_model=MovieRead,
     status_code=status.HTTP_200_OK,
     summary="Get movie by ID",
-    description="Retrieve a movie by its unique ID.",
+    description="Retrieve a movie by its unique ID. Pass 'fields' (comma-separated, e.g. 'id,title,poster_path') to read and return only those fields.",
 )
-def get_movie_by_id(movie_id: int, db: SessionDep):
-    return movie_service.get_movie_by_id(db, movie_id)
+async def get_movie_by_id(movie_id: int, db: ReadSessionDep, fields: str | None = None):
+    selected = parse_fields(fields, MovieRead)
+    if selected is None:
+        return await movie_service.get_movie_by_id(db, movie_id)
+
+    row = await movie_service.get_movie_fields(db, movie_id, selected)
+    return row_response(row, MovieRead, selected)
+
+
+@movie_router.get(
+    "/{movie_id}/poster",
+    response_class=FileResponse,
+    status_code=status.HTTP_200_OK,
+    summary="Get movie poster",
+    description="Serve the movie's poster from the local image cache, downloading it from TMDB on first use. 'size' is one of IMAGE_POSTER_SIZES (the largest by default). Supports ETag/If-None-Match and Range requests.",
+)
+async def get_movie_poster(
+    movie_id: int, request: Request, db: ReadSessionDep, size: str | None = None
+):
+    return await image_cache.movie_image(
+        db, movie_id, "poster", size, request.headers.get("if-none-match")
+    )
+
+
+@movie_router.get(
+    "/{movie_id}/backdrop",
+    response_class=FileResponse,
+    status_code=status.HTTP_200_OK,
+    summary="Get movie backdrop",
+    description="Serve the movie's backdrop from the local image cache, like the poster. 'size' is one of IMAGE_BACKDROP_SIZES.",
+)
+async def get_movie_backdrop(
+    movie_id: int, request: Request, db: ReadSessionDep, size: str | None = None
+):
+    return await image_cache.movie_image(
+        db, movie_id, "backdrop", size, request.headers.get("if-none-match")
+    )
 
 
 @movie_router.put(
@@ -58,8 +164,8 @@ def get_movie_by_id(movie_id: int, db: SessionDep):
     summary="Update movie",
     description="Update an existing movie with new field values.",
 )
-def update_movie(movie_id: int, movie: MovieUpdate, db: SessionDep):
-    return movie_service.update_movie(db, movie_id, movie)
+async def update_movie(movie_id: int, movie: MovieUpdate, db: SessionDep):
+    return await movie_service.update_movie(db, movie_id, movie)
 
 
 @movie_router.delete(
@@ -68,8 +174,8 @@ def update_movie(movie_id: int, movie: MovieUpdate, db: SessionDep):
     summary="Delete movie",
     description="Delete a movie from the system.",
 )
-def delete_movie(movie_id: int, db: SessionDep):
-    return movie_service.delete_movie(db, movie_id)
+async def delete_movie(movie_id: int, db: SessionDep):
+    return await movie_service.delete_movie(db, movie_id)
 
 
 
@@ -80,10 +186,68 @@ def delete_movie(movie_id: int, db: SessionDep):
     response_model=list[MovieRead],
     status_code=status.HTTP_201_CREATED,
     summary="Import popular movies from TMDB",
-    description="Import a list of popular movies from TMDB. Supports optional pagination using the 'page' query parameter.",
+    description="Import a list of popular movies from TMDB. Supports a single 'page' or a range such as 'pages=1-50', fetched concurrently and stored in one transaction. With 'async=true' the import runs as a background job: the response is 202 with the job, whose progress is at GET /api/jobs/{id}.",
+    responses={status.HTTP_202_ACCEPTED: {"model": JobRead}},
+)
+async def import_popular_movies(
+    db: SessionDep,
+    page: int = 1,
+    pages: str | None = None,
+    run_async: Annotated[bool, Query(alias="async")] = False,
+):
+    if run_async:
+        return jobs.accepted(await tmdb.queue_popular_import(db, page, pages))
+
+    return await tmdb.import_popular_movies(db, page, pages)
+
+
+@movie_router.post(
+    "/import/genres",
+    response_model=list[GenreRead],
+    status_code=status.HTTP_201_CREATED,
+    summary="Import genres from TMDB",
+    description="Fetch TMDB's movie genre list and store or rename the local genres.",
 )
-def import_popular_movies(db: SessionDep, page: int = 1):
-    return tmdb.import_popular_movies(db, page)
+async def import_genres(db: SessionDep):
+    return await tmdb.import_genres(db)
+
+
+@movie_router.post(
+    "/import/dump",
+    response_model=DumpImportResult,
+    status_code=status.HTTP_200_OK,
+    summary="Import a TMDB daily id export",
+    description="Stream one of TMDB's daily movie id exports (gzipped JSONL) into the catalogue as stub rows, either sent as the request body or named with 'path' inside the dump directory. Filter with 'min_popularity' and 'include_adult'; with 'hydrate=true' the new rows are queued for full-detail fetches. Movies already stored are left alone. With 'async=true' (needs 'path') the import runs as a background job.",
+    responses={status.HTTP_202_ACCEPTED: {"model": JobRead}},
+    openapi_extra={
+        "requestBody": {
+            "required": False,
+            "content": {
+                "application/gzip": {"schema": {"type": "string", "format": "binary"}},
+                "application/x-ndjson": {"schema": {"type": "string", "format": "binary"}},
+            },
+        }
+    },
+)
+async def import_tmdb_dump(
+    request: Request,
+    db: SessionDep,
+    path: str | None = None,
+    min_popularity: float = 0.0,
+    include_adult: bool = False,
+    hydrate: bool = False,
+    run_async: Annotated[bool, Query(alias="async")] = False,
+):
+    if run_async:
+        return jobs.accepted(
+            await tmdb_dump.queue_dump_import(
+                db, path, min_popularity, include_adult, hydrate
+            )
+        )
+
+    return await tmdb_dump.import_dump(
+        request.stream(), path, min_popularity, include_adult, hydrate
+    )
 
 
 @movie_router.post(
@@ -91,17 +255,34 @@ def import_popular_movies(db: SessionDep, page: int = 1):
     response_model=MovieRead,
     status_code=status.HTTP_201_CREATED,
     summary="Import movie by TMDB ID",
-    description="Fetch a movie from The Movie Database (TMDB) using its ID and store it in the system.",
+    description="Fetch a movie from The Movie Database (TMDB) using its ID and store it in the system. With 'async=true' the import runs as a background job and the response is 202 with the job.",
+    responses={status.HTTP_202_ACCEPTED: {"model": JobRead}},
 )
-def import_movie_by_tmdb_id(tmdb_id: int, db: SessionDep):
-    return tmdb.import_movie_by_tmdb_id(db, tmdb_id)
+async def import_movie_by_tmdb_id(
+    tmdb_id: int,
+    db: SessionDep,
+    run_async: Annotated[bool, Query(alias="async")] = False,
+):
+    if run_async:
+        return jobs.accepted(await tmdb.queue_movie_import(db, tmdb_id))
+
+    return await tmdb.import_movie_by_tmdb_id(tmdb_id)
 
 
 @movie_router.get(
     "/search/{query}",
     status_code=status.HTTP_200_OK,
-    summary="Search movies in TMDB",
-    description="Search for movies in TMDB without storing them locally.",
+    summary="Search movies",
+    description="Search the local catalogue first and TMDB only when fewer than SEARCH_LOCAL_THRESHOLD movies match. TMDB hits are merged in after the local ones, deduplicated by TMDB id, and the ones not stored yet are imported in the background. 'source' tells where the answer came from. With 'mode=tmdb' the raw TMDB search response is returned instead.",
+    responses={status.HTTP_200_OK: {"model": MovieSearchResults}},
 )
-def search_movies_tmdb(query: str):
-    return tmdb.search_movies_tmdb(query)
+async def search_movies(
+    query: str,
+    db: ReadSessionDep,
+    background_tasks: BackgroundTasks,
+    mode: Literal["hybrid", "tmdb"] = "hybrid",
+):
+    if mode == "tmdb":
+        return await tmdb.search_movies_tmdb(query)
+
+    return await tmdb.hybrid_search(db, query, background_tasks)
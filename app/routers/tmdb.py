@@ -0,0 +1,70 @@
+from typing import Annotated
+from fastapi import APIRouter, status, Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import jobs
+from app.database import get_read_session, get_session
+from app.schemas.job import JobRead
+from app.schemas.tmdb import SyncStatus, TmdbCacheStats, TmdbGovernorState
+from app.services import tmdb_cache, tmdb_governor, tmdb_sync
+
+
+SessionDep = Annotated[AsyncSession, Depends(get_session)]
+ReadSessionDep = Annotated[AsyncSession, Depends(get_read_session)]
+
+
+tmdb_router = APIRouter(prefix="/tmdb", tags=["TMDB"])
+
+
+@tmdb_router.get(
+    "/cache",
+    response_model=TmdbCacheStats,
+    status_code=status.HTTP_200_OK,
+    summary="TMDB cache statistics",
+    description="Report hit/miss counters and memory usage of the TMDB response cache.",
+)
+async def get_cache_stats():
+    return tmdb_cache.get_stats()
+
+
+@tmdb_router.delete(
+    "/cache",
+    status_code=status.HTTP_204_NO_CONTENT,
+    summary="Clear TMDB cache",
+    description="Drop every entry from the TMDB response cache, including the on-disk tier when it is enabled.",
+)
+async def clear_cache():
+    await tmdb_cache.clear()
+
+
+@tmdb_router.get(
+    "/governor",
+    response_model=TmdbGovernorState,
+    status_code=status.HTTP_200_OK,
+    summary="TMDB call governor state",
+    description="Report the outbound rate limiter, adaptive concurrency limit, retry counters and circuit breaker state for TMDB calls.",
+)
+async def get_governor_state():
+    return tmdb_governor.governor.get_state()
+
+
+@tmdb_router.get(
+    "/sync",
+    response_model=SyncStatus,
+    status_code=status.HTTP_200_OK,
+    summary="TMDB change sync status",
+    description="Report the change-feed watermark, how many stored movies still wait for a refresh and the outcome of the last run.",
+)
+async def get_sync_status(db: ReadSessionDep):
+    return await tmdb_sync.get_status(db)
+
+
+@tmdb_router.post(
+    "/sync",
+    status_code=status.HTTP_202_ACCEPTED,
+    summary="Run TMDB change sync",
+    description="Queue a sync run now instead of waiting for the schedule. Returns the job; a run already queued or in progress is returned instead of a new one.",
+    responses={status.HTTP_202_ACCEPTED: {"model": JobRead}},
+)
+async def run_sync(db: SessionDep):
+    return jobs.accepted(await tmdb_sync.queue_sync(db))
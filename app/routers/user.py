@@ -1,13 +1,19 @@
-from typing import Annotated
-from fastapi import APIRouter, status, Depends
-from sqlalchemy.orm import Session
+from typing import Annotated, Any, Literal
+from fastapi import APIRouter, Body, Query, Request, status, Depends
+from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.schemas.bulk import BulkResult
 from app.schemas.user import UserCreate, UserRead, UserUpdate
-from app.database import get_session
+from app.bulk import BULK_MAX_ITEMS
+from app.database import get_read_session, get_session
+from app.export import ExportFormat, export_response
+from app.pagination import NEXT_CURSOR_HEADER
+from app.serialization import MSGPACK_MEDIA_TYPE, USER_LIST, rows_response
 from app.services import user_service
 
 
-SessionDep = Annotated[Session, Depends(get_session)]
+SessionDep = Annotated[AsyncSession, Depends(get_session)]
+ReadSessionDep = Annotated[AsyncSession, Depends(get_read_session)]
 
 user_router = APIRouter(prefix="/users", tags=["Users"])
 
@@ -19,8 +25,22 @@ user_router = APIRouter(prefix="/users", tags=["Users"])
     summary="Register a new user",
     description="Create a new user account with the provided information.",
 )
-def register_user(user: UserCreate, db: SessionDep):
-    return user_service.create_user(db, user)
+async def register_user(user: UserCreate, db: SessionDep):
+    return await user_service.create_user(db, user)
+
+
+@user_router.post(
+    "/bulk",
+    response_model=BulkResult,
+    status_code=status.HTTP_200_OK,
+    summary="Bulk create users",
+    description="Create up to 10,000 users in a single transaction. Each record is reported as created, conflict (username or email already taken) or invalid.",
+)
+async def bulk_create_users(
+    items: Annotated[list[Any], Body(max_length=BULK_MAX_ITEMS)],
+    db: SessionDep,
+):
+    return await user_service.bulk_create_users(db, items)
 
 
 @user_router.get(
@@ -28,10 +48,33 @@ def register_user(user: UserCreate, db: SessionDep):
     response_model=list[UserRead],
     status_code=status.HTTP_200_OK,
     summary="List all users",
-    description="Retrieve a list of all users in the system.",
+    description="Retrieve users page by page. Pass the X-Next-Cursor response header back as 'cursor' to fetch the next page. Send 'Accept: application/msgpack' for MessagePack.",
+    responses={status.HTTP_200_OK: {"content": {MSGPACK_MEDIA_TYPE: {}}}},
+)
+async def list_all_users(
+    db: ReadSessionDep,
+    request: Request,
+    limit: Annotated[int, Query(ge=1, le=1000)] = 100,
+    sort: Literal["id", "newest"] = "id",
+    cursor: str | None = None,
+):
+    rows, next_cursor = await user_service.get_all_users(db, sort, cursor, limit)
+    headers = {NEXT_CURSOR_HEADER: next_cursor} if next_cursor else None
+
+    return rows_response(rows, USER_LIST, headers, accept=request.headers.get("accept"))
+
+
+@user_router.get(
+    "/export",
+    status_code=status.HTTP_200_OK,
+    summary="Export users",
+    description="Stream every user as NDJSON or CSV, optionally gzip-compressed.",
 )
-def list_all_users(db: SessionDep):
-    return user_service.get_all_users(db)
+async def export_users(
+    fmt: Annotated[ExportFormat, Query(alias="format")] = "ndjson",
+    gzip: bool = False,
+):
+    return export_response(user_service.export_users(), "users", fmt, gzip)
 
 
 @user_router.get(
@@ -41,8 +84,8 @@ def list_all_users(db: SessionDep):
     summary="Get user by ID",
     description="Retrieve a single user by their unique user ID.",
 )
-def get_user_by_id(user_id: int, db: SessionDep):
-    return user_service.get_user_by_id(db, user_id)
+async def get_user_by_id(user_id: int, db: ReadSessionDep):
+    return await user_service.get_user_by_id(db, user_id)
 
 
 @user_router.put(
@@ -52,8 +95,8 @@ def get_user_by_id(user_id: int, db: SessionDep):
     summary="Update user",
     description="Update an existing user with new field values.",
 )
-def update_user(user_id: int, data: UserUpdate, db: SessionDep):
-    return user_service.update_user(db, user_id, data)
+async def update_user(user_id: int, data: UserUpdate, db: SessionDep):
+    return await user_service.update_user(db, user_id, data)
 
 
 @user_router.delete(
@@ -62,5 +105,5 @@ def update_user(user_id: int, data: UserUpdate, db: SessionDep):
     summary="Delete user",
     description="Soft-delete a user by setting the 'is_active' flag to False.",
 )
-def delete_user(user_id: int, db: SessionDep):
-    return user_service.delete_user(db, user_id)
+async def delete_user(user_id: int, db: SessionDep):
+    return await user_service.delete_user(db, user_id)
@@ -0,0 +1,39 @@
+from typing import Literal, Optional
+
+from pydantic import BaseModel
+
+
+class BulkItemResult(BaseModel):
+    index: int
+    status: Literal["created", "conflict", "invalid"]
+    id: Optional[int] = None
+    detail: Optional[str] = None
+
+
+class BulkResult(BaseModel):
+    created: int
+    conflicts: int
+    invalid: int
+    items: list[BulkItemResult]
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "created": 1,
+                "conflicts": 1,
+                "invalid": 1,
+                "items": [
+                    {"index": 0, "status": "created", "id": 42},
+                    {
+                        "index": 1,
+                        "status": "conflict",
+                        "detail": "Username already exists.",
+                    },
+                    {
+                        "index": 2,
+                        "status": "invalid",
+                        "detail": "email: value is not a valid email address",
+                    },
+                ],
+            }
+        }
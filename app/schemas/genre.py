@@ -0,0 +1,17 @@
+from pydantic import BaseModel
+
+
+class GenreRead(BaseModel):
+    id: int
+    name: str
+    movie_count: int = 0
+
+    class Config:
+        from_attributes = True
+        json_schema_extra = {
+            "example": {
+                "id": 878,
+                "name": "Science Fiction",
+                "movie_count": 42,
+            }
+        }
@@ -0,0 +1,41 @@
+from typing import Any, Literal, Optional
+
+from datetime import datetime
+from pydantic import BaseModel
+
+
+class JobRead(BaseModel):
+    id: int
+    kind: str
+    status: Literal["queued", "running", "succeeded", "failed"]
+    params: dict[str, Any]
+    progress: dict[str, Any]
+    attempts: int
+    max_attempts: int
+    error: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+        json_schema_extra = {
+            "example": {
+                "id": 7,
+                "kind": "import_popular",
+                "status": "running",
+                "params": {"first": 1, "last": 50},
+                "progress": {
+                    "pages_total": 50,
+                    "pages_done": 16,
+                    "inserted": 301,
+                    "skipped": 19,
+                },
+                "attempts": 1,
+                "max_attempts": 5,
+                "error": None,
+                "created_at": "2025-01-01T12:00:00",
+                "started_at": "2025-01-01T12:00:01",
+                "finished_at": None,
+            }
+        }
@@ -1,4 +1,4 @@
-from typing import Optional
+from typing import Literal, Optional
 
 from datetime import date, datetime
 from pydantic import BaseModel
@@ -77,3 +77,54 @@ class MovieRead(MovieBase):
                 "created_at": "2025-01-01T12:00:00Z",
             }
         }
+
+
+class MovieSearchHit(MovieBase):
+    # None for TMDB hits that aren't stored yet
+    id: Optional[int] = None
+    created_at: Optional[datetime] = None
+    source: Literal["local", "tmdb"]
+
+
+class MovieSearchResults(BaseModel):
+    query: str
+    source: Literal["local", "hybrid", "tmdb"]
+    results: list[MovieSearchHit]
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "query": "fight",
+                "source": "hybrid",
+                "results": [
+                    {
+                        "id": 1,
+                        "tmdb_id": 550,
+                        "title": "Fight Club",
+                        "overview": "A ticking-time-bomb insomniac meets a soap salesman.",
+                        "release_date": "1999-10-15",
+                        "genre_ids": "[18, 53]",
+                        "vote_average": 8.4,
+                        "vote_count": 26000,
+                        "poster_path": "/bptfVGEQuv6vDTIMVCHjJ9Dz8PX.jpg",
+                        "backdrop_path": "/fCayJrkfRaCRCTh8GqN30f8oyQF.jpg",
+                        "created_at": "2025-01-01T12:00:00Z",
+                        "source": "local",
+                    },
+                    {
+                        "id": None,
+                        "tmdb_id": 345911,
+                        "title": "Fight Valley",
+                        "overview": "Set in the world of underground women's fighting.",
+                        "release_date": "2016-07-22",
+                        "genre_ids": "[28, 18]",
+                        "vote_average": 4.6,
+                        "vote_count": 120,
+                        "poster_path": "/nBz5Uk1g9kfKj5VbVzUXYw3g4Rg.jpg",
+                        "backdrop_path": "",
+                        "created_at": None,
+                        "source": "tmdb",
+                    },
+                ],
+            }
+        }
@@ -0,0 +1,118 @@
+from typing import Any, Optional
+
+from datetime import datetime
+from pydantic import BaseModel
+
+
+class TmdbCacheStats(BaseModel):
+    memory_hits: int
+    disk_hits: int
+    misses: int
+    hit_ratio: float
+    entries: int
+    bytes: int
+    max_bytes: int
+    evictions: int
+    disk_enabled: bool
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "memory_hits": 1520,
+                "disk_hits": 12,
+                "misses": 230,
+                "hit_ratio": 0.87,
+                "entries": 241,
+                "bytes": 1843200,
+                "max_bytes": 33554432,
+                "evictions": 0,
+                "disk_enabled": True,
+            }
+        }
+
+
+class SyncStatus(BaseModel):
+    watermark: Optional[datetime] = None
+    pending: int
+    last_run: Optional[dict[str, Any]] = None
+    interval_seconds: float
+    budget: int
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "watermark": "2025-01-01T12:00:00",
+                "pending": 0,
+                "last_run": {
+                    "finished_at": "2025-01-01T12:00:04",
+                    "window": ["2025-01-01T11:00:00", "2025-01-01T12:00:00"],
+                    "changed": 4210,
+                    "refreshed": 37,
+                    "failed": 0,
+                    "pending": 0,
+                    "seconds": 3.9,
+                },
+                "interval_seconds": 3600,
+                "budget": 1000,
+            }
+        }
+
+
+class TmdbGovernorState(BaseModel):
+    calls: int
+    retries: int
+    throttled: int
+    rejected: int
+    rate_limit: float
+    tokens: float
+    concurrency_limit: int
+    in_flight: int
+    queued: int
+    breaker_state: str
+    consecutive_failures: int
+    breaker_opened: int
+    breaker_retry_after: float
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "calls": 5120,
+                "retries": 14,
+                "throttled": 3,
+                "rejected": 0,
+                "rate_limit": 40.0,
+                "tokens": 37.5,
+                "concurrency_limit": 20,
+                "in_flight": 2,
+                "queued": 0,
+                "breaker_state": "closed",
+                "consecutive_failures": 0,
+                "breaker_opened": 1,
+                "breaker_retry_after": 0.0,
+            }
+        }
+
+
+class DumpImportResult(BaseModel):
+    lines: int
+    matched: int
+    inserted: int
+    existing: int
+    invalid: int
+    hydration_jobs: int
+    seconds: float
+    rows_per_second: int
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "lines": 1012345,
+                "matched": 312004,
+                "inserted": 311870,
+                "existing": 134,
+                "invalid": 0,
+                "hydration_jobs": 0,
+                "seconds": 6.8,
+                "rows_per_second": 148874,
+            }
+        }
@@ -0,0 +1,191 @@
+"""Fast JSON output for read routes.
+
+FastAPI's `ORJSONResponse` is the app's default response class (set in
+main.py). List routes skip the ORM and FastAPI's response model pass: they
+select the schema's columns as plain rows and `rows_response` encodes them.
+
+With FAST_SERIALIZATION on, rows go straight to orjson. They were validated
+by the schemas on the way in and SQLite hands back the same types, so
+validating them again on the way out is pure CPU. With it off, rows are
+still checked against the schema through a precompiled `TypeAdapter`,
+which costs far less than validating ORM objects by attribute.
+`benchmarks/serialization.py` measures every path.
+
+`fields=` asks for a sparse fieldset: the service selects only those
+columns and they are encoded against a copy of the schema trimmed to them.
+
+Lists go out as MessagePack instead when the client's Accept header
+prefers it. Dates are written as the same ISO 8601 strings as in JSON.
+"""
+
+from datetime import date, datetime
+from functools import lru_cache
+from typing import Any, Sequence
+
+import msgpack
+import orjson
+from fastapi import HTTPException, status
+from pydantic import BaseModel, TypeAdapter, create_model
+from sqlalchemy import Row
+from starlette.responses import Response
+
+from app import FAST_SERIALIZATION
+from app.models.movie import Movie
+from app.models.user import User
+from app.schemas.movie import MovieRead
+from app.schemas.user import UserRead
+
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+# The unregistered name is still what many clients send
+_MSGPACK_TYPES = (MSGPACK_MEDIA_TYPE, "application/x-msgpack")
+
+MOVIE_LIST = TypeAdapter(list[MovieRead])
+USER_LIST = TypeAdapter(list[UserRead])
+
+# Table columns in schema field order, for select(*columns)
+MOVIE_COLUMNS = [getattr(Movie, name) for name in MovieRead.model_fields]
+USER_COLUMNS = [getattr(User, name) for name in UserRead.model_fields]
+
+
+def parse_fields(fields: str | None, model: type[BaseModel]) -> tuple[str, ...] | None:
+    """The requested fields of `model`, in schema order; None for all of them."""
+    names = {name.strip() for name in (fields or "").split(",")} - {""}
+    if not names:
+        return None
+
+    unknown = names - model.model_fields.keys()
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=(
+                f"Unknown fields: {', '.join(sorted(unknown))}. "
+                f"Available: {', '.join(model.model_fields)}."
+            ),
+        )
+
+    return tuple(name for name in model.model_fields if name in names)
+
+
+@lru_cache(maxsize=128)
+def sparse_model(model: type[BaseModel], fields: tuple[str, ...]) -> type[BaseModel]:
+    """`model` trimmed to `fields`, built once per combination."""
+    definitions = {name: model.model_fields[name] for name in fields}
+    return create_model(
+        f"{model.__name__}Fields",
+        **{name: (info.annotation, info) for name, info in definitions.items()},
+    )
+
+
+@lru_cache(maxsize=128)
+def sparse_list(model: type[BaseModel], fields: tuple[str, ...]) -> TypeAdapter:
+    return TypeAdapter(list[sparse_model(model, fields)])
+
+
+def _quality(accept: str, media_type: str) -> tuple[float, int]:
+    """q given to `media_type` by its most specific range in `accept`, and
+    that specificity (2 exact, 1 type/*, 0 */*, -1 no match)."""
+    best = (0.0, -1)
+    main_type = media_type.split("/")[0]
+
+    for part in accept.lower().split(","):
+        media_range, *params = part.split(";")
+        media_range = media_range.strip()
+        if media_range == media_type:
+            specificity = 2
+        elif media_range == f"{main_type}/*":
+            specificity = 1
+        elif media_range == "*/*":
+            specificity = 0
+        else:
+            continue
+
+        q = 1.0
+        for param in params:
+            name, _, value = param.strip().partition("=")
+            if name == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+
+        if specificity > best[1]:
+            best = (q, specificity)
+
+    return best
+
+
+def wants_msgpack(accept: str | None) -> bool:
+    """True when `accept` prefers MessagePack to JSON; ties go to JSON."""
+    if not accept or "msgpack" not in accept:
+        return False
+
+    packed = max(_quality(accept, media_type) for media_type in _MSGPACK_TYPES)
+    return packed[0] > 0 and packed > _quality(accept, "application/json")
+
+
+def _items(rows: Sequence[Row], fields: tuple[str, ...] | None) -> list[dict]:
+    # With `fields`, zip stops at the last requested column and drops any
+    # the query only needed for itself (e.g. the cursor's sort columns)
+    keys = fields or rows[0]._fields
+    return [dict(zip(keys, row)) for row in rows]
+
+
+def encode_rows(
+    rows: Sequence[Row], adapter: TypeAdapter, fields: tuple[str, ...] | None = None
+) -> bytes:
+    if not rows:
+        return b"[]"
+
+    items = _items(rows, fields)
+
+    if FAST_SERIALIZATION:
+        return orjson.dumps(items)
+
+    return adapter.dump_json(adapter.validate_python(items))
+
+
+def _msgpack_default(value: Any) -> str:
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    raise TypeError(f"Cannot pack {type(value).__name__}")
+
+
+def encode_rows_msgpack(
+    rows: Sequence[Row], adapter: TypeAdapter, fields: tuple[str, ...] | None = None
+) -> bytes:
+    items = _items(rows, fields) if rows else []
+
+    if not FAST_SERIALIZATION:
+        items = adapter.dump_python(adapter.validate_python(items), mode="json")
+
+    return msgpack.packb(items, default=_msgpack_default)
+
+
+def rows_response(
+    rows: Sequence[Row],
+    adapter: TypeAdapter,
+    headers: dict | None = None,
+    fields: tuple[str, ...] | None = None,
+    accept: str | None = None,
+) -> Response:
+    """JSON, or MessagePack when `accept` (the Accept header) prefers it."""
+    headers = {**(headers or {}), "Vary": "Accept"}
+
+    if wants_msgpack(accept):
+        body = encode_rows_msgpack(rows, adapter, fields)
+        return Response(body, media_type=MSGPACK_MEDIA_TYPE, headers=headers)
+
+    return Response(
+        encode_rows(rows, adapter, fields), media_type="application/json", headers=headers
+    )
+
+
+def row_response(row: Row, model: type[BaseModel], fields: tuple[str, ...]) -> Response:
+    item = dict(zip(fields, row))
+
+    if FAST_SERIALIZATION:
+        body = orjson.dumps(item)
+    else:
+        body = sparse_model(model, fields).model_validate(item).model_dump_json().encode()
+
+    return Response(body, media_type="application/json")
@@ -0,0 +1,331 @@
+"""Local copies of TMDB posters and backdrops.
+
+Files are stored by content: `IMAGE_CACHE_DIR/ab/abcdef...`, named after
+their SHA-256, and the `image_cache` table maps each TMDB size + path to its
+file. Past IMAGE_CACHE_MAX_BYTES the least recently served images are
+evicted, down to 90% of the cap so eviction runs in batches.
+
+TMDB's CDN already renders every image in a fixed set of widths, so the
+thumbnails are pre-generated by downloading the sizes in IMAGE_POSTER_SIZES
+and IMAGE_BACKDROP_SIZES (smallest first; the last one is the default)
+instead of resizing here. Imports queue `prefetch_images` jobs for new
+movies; anything not prefetched yet is downloaded on its first request.
+"""
+
+import asyncio
+import hashlib
+import os
+import re
+import tempfile
+import time
+from pathlib import Path
+from typing import Iterable
+
+import anyio.to_thread
+import httpx
+from fastapi import HTTPException, status
+from sqlalchemy import bindparam, delete, func, select, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.responses import FileResponse, Response
+
+from app import jobs, metrics, response_cache
+from app.database import read_session, write_session
+from app.models.image_cache import CachedImage
+from app.models.movie import Movie
+
+IMAGE_BASE_URL = os.getenv("IMAGE_BASE_URL", "https://image.tmdb.org/t/p")
+IMAGE_CACHE_DIR = os.getenv("IMAGE_CACHE_DIR", "./images")
+IMAGE_CACHE_MAX_BYTES = int(os.getenv("IMAGE_CACHE_MAX_BYTES", str(1024 * 1024 * 1024)))
+IMAGE_TIMEOUT = float(os.getenv("IMAGE_TIMEOUT", "10"))
+IMAGE_MAX_AGE = int(os.getenv("IMAGE_MAX_AGE", "86400"))
+IMAGE_PREFETCH = os.getenv("IMAGE_PREFETCH", "true").lower() == "true"
+IMAGE_PREFETCH_CONCURRENCY = int(os.getenv("IMAGE_PREFETCH_CONCURRENCY", "4"))
+IMAGE_PREFETCH_BATCH_SIZE = int(os.getenv("IMAGE_PREFETCH_BATCH_SIZE", "100"))
+
+IMAGE_SIZES = {
+    kind: [size for size in os.getenv(name, default).split(",") if size]
+    for kind, name, default in (
+        ("poster", "IMAGE_POSTER_SIZES", "w92,w185,w500"),
+        ("backdrop", "IMAGE_BACKDROP_SIZES", "w780"),
+    )
+}
+
+# TMDB image paths look like "/kqjL17yufvn9OVLyXYpvtyrFfak.jpg"
+_TMDB_PATH = re.compile(r"/[\w-]+\.\w+")
+
+_client: httpx.AsyncClient | None = None
+_downloads: dict[str, asyncio.Task] = {}
+# Served keys and when, written to last_used_at before each eviction
+_touched: dict[str, float] = {}
+# Bytes of files on disk; counted on first use, then kept up to date
+_stored_bytes: int | None = None
+
+
+def set_client(client: httpx.AsyncClient | None) -> None:
+    """Download images through `client` (e.g. one bound to a stand-in CDN).
+
+    The caller keeps ownership of it; None goes back to the default client.
+    """
+    global _client
+    _client = client
+
+
+def _get_client() -> httpx.AsyncClient:
+    global _client
+
+    if _client is None:
+        _client = httpx.AsyncClient(base_url=IMAGE_BASE_URL, timeout=IMAGE_TIMEOUT)
+
+    return _client
+
+
+async def close_client() -> None:
+    global _client
+
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+def _blob_path(digest: str) -> Path:
+    return Path(IMAGE_CACHE_DIR) / digest[:2] / digest
+
+
+def _write_blob(path: Path, body: bytes) -> bool:
+    """Store a file under its digest. False if it was already there."""
+    if path.exists():
+        return False
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # Write then rename, so a reader never sees half a file
+    with tempfile.NamedTemporaryFile(dir=path.parent, delete=False) as f:
+        f.write(body)
+    os.replace(f.name, path)
+    return True
+
+
+def _remove_blobs(digests: list[str]) -> None:
+    for digest in digests:
+        _blob_path(digest).unlink(missing_ok=True)
+
+
+async def _flush_touches(db: AsyncSession) -> None:
+    if not _touched:
+        return
+
+    rows = [{"k": key, "t": used_at} for key, used_at in _touched.items()]
+    _touched.clear()
+    await db.execute(
+        update(CachedImage.__table__)
+        .where(CachedImage.key == bindparam("k"))
+        .values(last_used_at=bindparam("t")),
+        rows,
+    )
+
+
+async def _count_stored_bytes(db: AsyncSession) -> int:
+    per_blob = (
+        select(func.max(CachedImage.size).label("size"))
+        .group_by(CachedImage.digest)
+        .subquery()
+    )
+    return await db.scalar(select(func.coalesce(func.sum(per_blob.c.size), 0)))
+
+
+async def _evict(db: AsyncSession) -> None:
+    """Drop least recently used images until the files fit the cap again."""
+    global _stored_bytes
+
+    await _flush_touches(db)
+    target = IMAGE_CACHE_MAX_BYTES * 0.9
+
+    victims: dict[str, int] = {}
+    keys: list[str] = []
+    freed = 0
+    result = await db.stream(
+        select(CachedImage.key, CachedImage.digest, CachedImage.size).order_by(
+            CachedImage.last_used_at
+        )
+    )
+    async for key, digest, size in result:
+        if _stored_bytes - freed <= target:
+            break
+        keys.append(key)
+        if digest not in victims:
+            victims[digest] = size
+            freed += size
+    await result.close()
+
+    await db.execute(delete(CachedImage).where(CachedImage.key.in_(keys)))
+    # Another size or path may still point at the same file
+    kept = set(
+        await db.scalars(
+            select(CachedImage.digest).where(CachedImage.digest.in_(victims)).distinct()
+        )
+    )
+    await db.commit()
+
+    orphans = [digest for digest in victims if digest not in kept]
+    await anyio.to_thread.run_sync(_remove_blobs, orphans)
+    _stored_bytes -= sum(victims[digest] for digest in orphans)
+    metrics.image_cache.inc(("evicted",), len(keys))
+
+
+async def _download(size: str, path: str) -> CachedImage:
+    global _stored_bytes
+
+    response = await _get_client().get(f"/{size}{path}")
+    if response.status_code == status.HTTP_404_NOT_FOUND:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Image not found in TMDB.",
+        )
+    if not response.is_success:
+        raise HTTPException(
+            status_code=status.HTTP_502_BAD_GATEWAY,
+            detail=f"TMDB image server returned {response.status_code}.",
+        )
+
+    body = response.content
+    digest = hashlib.sha256(body).hexdigest()
+    created = await anyio.to_thread.run_sync(_write_blob, _blob_path(digest), body)
+
+    values = {
+        "key": f"{size}{path}",
+        "digest": digest,
+        "size": len(body),
+        "content_type": response.headers.get("content-type", "image/jpeg"),
+        "last_used_at": time.time(),
+    }
+    stmt = sqlite_insert(CachedImage).values(values)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[CachedImage.key],
+        set_={name: stmt.excluded[name] for name in values if name != "key"},
+    ).returning(CachedImage)
+
+    async with write_session() as db:
+        image = await db.scalar(stmt)
+        await db.commit()
+
+        if _stored_bytes is None:
+            _stored_bytes = await _count_stored_bytes(db)
+        elif created:
+            _stored_bytes += len(body)
+
+        if _stored_bytes > IMAGE_CACHE_MAX_BYTES:
+            await _evict(db)
+
+    metrics.image_cache.inc(("miss",))
+    return image
+
+
+async def fetch_image(size: str, path: str) -> CachedImage:
+    """Return the cached image, downloading it first if needed.
+
+    Concurrent misses for the same image share one download.
+    """
+    key = f"{size}{path}"
+    async with read_session() as db:
+        image = await db.get(CachedImage, key)
+
+    if image is not None and _blob_path(image.digest).exists():
+        _touched[key] = time.time()
+        metrics.image_cache.inc(("hit",))
+        return image
+
+    task = _downloads.get(key)
+    if task is None:
+        task = asyncio.create_task(_download(size, path))
+        _downloads[key] = task
+        task.add_done_callback(lambda _: _downloads.pop(key, None))
+
+    return await asyncio.shield(task)
+
+
+async def movie_image(
+    db: AsyncSession,
+    movie_id: int,
+    kind: str,
+    size: str | None = None,
+    if_none_match: str | None = None,
+) -> Response:
+    sizes = IMAGE_SIZES[kind]
+    size = size or (sizes[-1] if sizes else None)
+    if size not in sizes:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown {kind} size. Use one of: {', '.join(sizes)}.",
+        )
+
+    column = Movie.poster_path if kind == "poster" else Movie.backdrop_path
+    row = (await db.execute(select(column).where(Movie.id == movie_id))).first()
+    if row is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Movie not found.",
+        )
+
+    path = row[0]
+    if not path or not _TMDB_PATH.fullmatch(path):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Movie has no {kind}.",
+        )
+
+    image = await fetch_image(size, path)
+    etag = f'"{image.digest}"'
+    headers = {"ETag": etag, "Cache-Control": f"public, max-age={IMAGE_MAX_AGE}"}
+
+    if response_cache.etag_matches(if_none_match, etag.encode()):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    # FileResponse answers Range requests and uses pathsend where the server has it
+    return FileResponse(
+        _blob_path(image.digest), media_type=image.content_type, headers=headers
+    )
+
+
+async def queue_prefetch(db: AsyncSession, movies: Iterable) -> None:
+    """Queue downloads for the images of `movies` (anything with
+    `poster_path` and `backdrop_path`)."""
+    if not IMAGE_PREFETCH:
+        return
+
+    images = [
+        [kind, path]
+        for movie in movies
+        for kind in IMAGE_SIZES
+        if IMAGE_SIZES[kind]
+        and (path := getattr(movie, f"{kind}_path"))
+        and _TMDB_PATH.fullmatch(path)
+    ]
+    for i in range(0, len(images), IMAGE_PREFETCH_BATCH_SIZE):
+        batch = images[i : i + IMAGE_PREFETCH_BATCH_SIZE]
+        await jobs.enqueue(db, "prefetch_images", {"images": batch})
+
+
+@jobs.handler("prefetch_images")
+async def _prefetch_job(job: jobs.JobContext) -> None:
+    # Images fetched by an earlier attempt are cache hits on a retry
+    limiter = asyncio.Semaphore(IMAGE_PREFETCH_CONCURRENCY)
+
+    async def prefetch(size: str, path: str) -> None:
+        async with limiter:
+            try:
+                await fetch_image(size, path)
+            except HTTPException as exc:
+                if exc.status_code != status.HTTP_404_NOT_FOUND:
+                    raise
+
+    wanted = [
+        (size, path) for kind, path in job.params["images"] for size in IMAGE_SIZES[kind]
+    ]
+    results = await asyncio.gather(
+        *(prefetch(size, path) for size, path in wanted), return_exceptions=True
+    )
+
+    failed = sum(isinstance(result, Exception) for result in results)
+    await job.update(images=len(wanted), failed=failed)
+    if failed:
+        raise RuntimeError(f"{failed} images could not be downloaded.")
@@ -1,48 +1,204 @@
+import re
+
 from fastapi import HTTPException, status
-from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy import (
+    Row,
+    Select,
+    String,
+    delete,
+    func,
+    insert,
+    literal_column,
+    select,
+    type_coerce,
+    update,
+)
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.models.movie import Movie
+from app import response_cache
+from app.bulk import BulkResults, chunked, validate_items
+from app.database import unique_violation
+from app.models.genre import Genre, MovieGenre
+from app.models.movie import Movie, movie_rating, movie_search
+from app.pagination import SortKey, paginate
 from app.schemas.movie import MovieCreate, MovieUpdate
+from app.serialization import MOVIE_COLUMNS
 
+MOVIE_SORTS = {
+    "id": SortKey("id", Movie.id),
+    "rating": SortKey(
+        "rating",
+        Movie.id,
+        movie_rating,
+        lambda movie: movie.vote_average or 0.0,
+        descending=True,
+        columns=(Movie.vote_average,),
+    ),
+    # Compared as the stored text so cursors match SQLite's datetime strings
+    "newest": SortKey(
+        "newest",
+        Movie.id,
+        type_coerce(Movie.created_at, String),
+        lambda movie: str(movie.created_at),
+        descending=True,
+        columns=(Movie.created_at,),
+    ),
+}
 
-def create_movie(db: Session, data: MovieCreate) -> Movie:
-    # Prevent duplicate TMDB ID if provided
-    if data.tmdb_id is not None:
-        exists = db.query(Movie).filter(Movie.tmdb_id == data.tmdb_id).first()
-        if exists:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Movie with this TMDB ID already exists.",
-            )
 
-    movie = Movie(**data.dict())
-    db.add(movie)
-    db.commit()
-    db.refresh(movie)
+async def _write_movie(db: AsyncSession, stmt) -> Movie | None:
+    """Like user_service._write_user: the tmdb_id index rejects duplicates."""
+    try:
+        movie = await db.scalar(stmt.returning(Movie))
+        await db.commit()
+    except IntegrityError as exc:
+        await db.rollback()
+        if unique_violation(exc) != "movies.tmdb_id":
+            raise
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Movie with this TMDB ID already exists.",
+        )
+
     return movie
 
 
-def list_movies(
-    db: Session,
+async def create_movie(db: AsyncSession, data: MovieCreate) -> Movie:
+    movie = await _write_movie(db, insert(Movie).values(**data.dict()))
+    response_cache.invalidate("movies")
+    return movie
+
+
+async def bulk_create_movies(db: AsyncSession, items: list) -> dict:
+    results = BulkResults(len(items))
+    valid = validate_items(MovieCreate, items, results)
+
+    # One IN query per chunk instead of a SELECT per record
+    tmdb_ids = [movie.tmdb_id for _, movie in valid if movie.tmdb_id is not None]
+    taken = set()
+    for chunk in chunked(tmdb_ids):
+        taken.update(
+            await db.scalars(select(Movie.tmdb_id).where(Movie.tmdb_id.in_(chunk)))
+        )
+
+    rows = []
+    for index, movie in valid:
+        if movie.tmdb_id is not None:
+            if movie.tmdb_id in taken:
+                results.conflict(index, "Movie with this TMDB ID already exists.")
+                continue
+            taken.add(movie.tmdb_id)
+        rows.append((index, movie.dict()))
+
+    stmt = insert(Movie).returning(Movie.id, sort_by_parameter_order=True)
+    try:
+        for chunk in chunked(rows):
+            ids = (await db.scalars(stmt, [row for _, row in chunk])).all()
+            for (index, _), movie_id in zip(chunk, ids):
+                results.created(index, movie_id)
+        await db.commit()
+        response_cache.invalidate("movies")
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="A concurrent write created conflicting movies. Retry the request.",
+        )
+
+    return results.summary()
+
+
+def _fts_query(text: str) -> str | None:
+    # Quote every word so user input can't inject FTS5 syntax; match prefixes
+    tokens = re.findall(r"\w+", text)
+    if not tokens:
+        return None
+
+    return " ".join(f'"{token}"*' for token in tokens)
+
+
+def _ranked_matches(stmt: Select, fts_query: str) -> Select:
+    return (
+        stmt.join(movie_search, movie_search.c.rowid == Movie.id)
+        .where(literal_column("movies_fts").op("MATCH")(fts_query))
+        .order_by(movie_search.c.rank, Movie.id)
+    )
+
+
+async def list_movies(
+    db: AsyncSession,
     title: str | None,
     min_rating: float | None,
     skip: int,
     limit: int,
-) -> list[Movie]:
-    query = db.query(Movie)
+    q: str | None = None,
+    sort: str = "id",
+    cursor: str | None = None,
+    genres: list[int] | None = None,
+    genre_match: str = "any",
+    fields: tuple[str, ...] | None = None,
+) -> tuple[list[Row], str | None]:
+    # Plain rows, not entities: the router encodes them as they are
+    columns = _columns(fields)
+    if fields is not None:
+        # The next cursor is read from the sort columns: they go after the
+        # requested ones, and encoding stops at the last requested field
+        columns += [
+            column
+            for column in MOVIE_SORTS[sort].cursor_columns()
+            if column.key not in fields
+        ]
+    stmt = select(*columns)
+
+    if genres:
+        # Served from the (genre_id, movie_id) index on movie_genres
+        matching = select(MovieGenre.movie_id).where(MovieGenre.genre_id.in_(genres))
+        if genre_match == "all":
+            matching = matching.group_by(MovieGenre.movie_id).having(
+                func.count() == len(set(genres))
+            )
+        stmt = stmt.where(Movie.id.in_(matching))
 
     if title:
-        query = query.filter(func.lower(Movie.title).contains(title.lower()))
+        stmt = stmt.where(func.lower(Movie.title).contains(title.lower()))
 
     if min_rating is not None:
-        query = query.filter(Movie.vote_average >= min_rating)
+        stmt = stmt.where(Movie.vote_average >= min_rating)
 
-    return query.offset(skip).limit(limit).all()
+    fts_query = _fts_query(q) if q else None
+    if fts_query:
+        # Relevance order has no stable key to resume from
+        if cursor:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Cursor pagination is not available for full-text searches.",
+            )
+
+        stmt = _ranked_matches(stmt, fts_query).offset(skip).limit(limit)
+        return (await db.execute(stmt)).all(), None
+
+    return await paginate(db, stmt, MOVIE_SORTS[sort], cursor, limit, skip)
+
+
+def _columns(fields: tuple[str, ...] | None) -> list:
+    if fields is None:
+        return list(MOVIE_COLUMNS)
+    return [getattr(Movie, name) for name in fields]
+
+
+async def search_movies(db: AsyncSession, query: str, limit: int) -> list[Row]:
+    """Best local full-text matches; none when `query` has no searchable word."""
+    fts_query = _fts_query(query)
+    if not fts_query:
+        return []
 
+    stmt = _ranked_matches(select(*MOVIE_COLUMNS), fts_query).limit(limit)
+    return (await db.execute(stmt)).all()
 
-def get_movie_by_id(db: Session, movie_id: int) -> Movie:
-    movie = db.query(Movie).filter(Movie.id == movie_id).first()
+
+async def get_movie_by_id(db: AsyncSession, movie_id: int) -> Movie:
+    movie = await db.get(Movie, movie_id)
 
     if not movie:
         raise HTTPException(
@@ -53,47 +209,66 @@ def get_movie_by_id(db: Session, movie_id: int) -> Movie:
     return movie
 
 
-def update_movie(db: Session, movie_id: int, data: MovieUpdate) -> Movie:
-    movie = db.query(Movie).filter(Movie.id == movie_id).first()
+async def get_movie_fields(
+    db: AsyncSession, movie_id: int, fields: tuple[str, ...]
+) -> Row:
+    """Only the requested columns of one movie, as a row."""
+    stmt = select(*_columns(fields)).where(Movie.id == movie_id)
+    row = (await db.execute(stmt)).first()
 
-    if not movie:
+    if row is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Movie not found.",
         )
 
-    update_data = data.dict(exclude_unset=True)
+    return row
 
-    # Prevent duplicate TMDB ID
-    if "tmdb_id" in update_data and update_data["tmdb_id"] is not None:
-        exists = (
-            db.query(Movie)
-            .filter(Movie.tmdb_id == update_data["tmdb_id"], Movie.id != movie_id)
-            .first()
-        )
-        if exists:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Movie with this TMDB ID already exists.",
-            )
 
-    for key, value in update_data.items():
-        setattr(movie, key, value)
+async def update_movie(db: AsyncSession, movie_id: int, data: MovieUpdate) -> Movie:
+    update_data = data.dict(exclude_unset=True)
+    if not update_data:
+        return await get_movie_by_id(db, movie_id)
+
+    stmt = update(Movie).where(Movie.id == movie_id).values(**update_data)
+    movie = await _write_movie(db, stmt)
 
-    db.commit()
-    db.refresh(movie)
+    if not movie:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Movie not found.",
+        )
 
+    response_cache.invalidate("movies", movie_id)
     return movie
 
 
-def delete_movie(db: Session, movie_id: int) -> None:
-    movie = db.query(Movie).filter(Movie.id == movie_id).first()
+async def delete_movie(db: AsyncSession, movie_id: int) -> None:
+    deleted = await db.scalar(
+        delete(Movie).where(Movie.id == movie_id).returning(Movie.id)
+    )
+    await db.commit()
 
-    if not movie:
+    if deleted is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Movie not found.",
         )
 
-    db.delete(movie)
-    db.commit()
+    response_cache.invalidate("movies", movie_id)
+
+
+async def list_genres(db: AsyncSession) -> list[dict]:
+    movie_count = func.count(MovieGenre.movie_id)
+    rows = await db.execute(
+        select(Genre.id, Genre.name, movie_count.label("movie_count"))
+        .outerjoin(MovieGenre, MovieGenre.genre_id == Genre.id)
+        .group_by(Genre.id)
+        .order_by(Genre.name)
+    )
+
+    return [row._asdict() for row in rows]
+
+
+def export_movies() -> Select:
+    return select(*Movie.__table__.columns).order_by(Movie.id)
@@ -1,14 +1,102 @@
+import asyncio
+import logging
 import os
-import requests
+import time
+from typing import Awaitable, Callable, TypeVar
 
-from fastapi import HTTPException, status
-from sqlalchemy.orm import Session
+import httpx
+from fastapi import BackgroundTasks, HTTPException, status
+from sqlalchemy import select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
 
+from app import jobs, metrics, response_cache
+from app.database import read_session, write_session
+from app.models.genre import Genre
+from app.models.job import Job
 from app.models.movie import Movie
 from app.schemas.movie import MovieCreate
+from app.serialization import MOVIE_COLUMNS
+from app.services import image_cache, tmdb_cache, tmdb_governor
+from app.services.movie import list_genres, search_movies
 
 TMDB_BASE_URL = os.getenv("TMDB_BASE_URL", "https://api.themoviedb.org/3")
 TMDB_ACCESS_TOKEN = os.getenv("TMDB_ACCESS_TOKEN")
+TMDB_TIMEOUT = float(os.getenv("TMDB_TIMEOUT", "10"))
+TMDB_HTTP2 = os.getenv("TMDB_HTTP2", "true").lower() == "true"
+TMDB_MAX_CONNECTIONS = int(os.getenv("TMDB_MAX_CONNECTIONS", "20"))
+TMDB_MAX_KEEPALIVE = int(os.getenv("TMDB_MAX_KEEPALIVE", "10"))
+TMDB_IMPORT_CONCURRENCY = int(os.getenv("TMDB_IMPORT_CONCURRENCY", "8"))
+# Hybrid search: local hits needed to skip TMDB, and results returned
+SEARCH_LOCAL_THRESHOLD = int(os.getenv("SEARCH_LOCAL_THRESHOLD", "5"))
+SEARCH_RESULTS_LIMIT = int(os.getenv("SEARCH_RESULTS_LIMIT", "20"))
+
+# TMDB never serves list pages past 500
+TMDB_MAX_PAGE = 500
+# Rows per INSERT statement; keeps bound parameters well below SQLite's limit
+_IMPORT_BATCH_SIZE = 500
+
+_client: httpx.AsyncClient | None = None
+# Shared work by key, see _single_flight
+_in_flight: dict[tuple, asyncio.Task] = {}
+
+# Searches whose TMDB hits were already queued for ingestion by this process
+_queued_searches: set[str] = set()
+_QUEUED_SEARCHES_MAX = 10_000
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+def _build_client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        base_url=TMDB_BASE_URL,
+        http2=TMDB_HTTP2,
+        timeout=TMDB_TIMEOUT,
+        limits=httpx.Limits(
+            max_connections=TMDB_MAX_CONNECTIONS,
+            max_keepalive_connections=TMDB_MAX_KEEPALIVE,
+        ),
+    )
+
+
+async def start_client() -> httpx.AsyncClient:
+    """Open the shared TMDB client. Called once from the app lifespan."""
+    global _client
+
+    if _client is None:
+        _client = _build_client()
+
+    return _client
+
+
+async def close_client() -> None:
+    global _client
+
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+def set_client(client: httpx.AsyncClient | None) -> None:
+    """Send TMDB calls through `client` (e.g. one bound to a stand-in).
+
+    The caller keeps ownership of it; None goes back to the default client.
+    """
+    global _client
+    _client = client
+
+
+def get_client() -> httpx.AsyncClient:
+    # Fall back to a lazily built client when the lifespan did not run
+    # (e.g. a TestClient used without a context manager).
+    global _client
+
+    if _client is None:
+        _client = _build_client()
+
+    return _client
 
 
 def _api_headers():
@@ -23,98 +111,454 @@ def _api_headers():
         "Authorization": f"Bearer {TMDB_ACCESS_TOKEN}",
     }
 
-def _fetch_tmdb_movie(tmdb_id: int) -> dict:
-    url = f"{TMDB_BASE_URL}/movie/{tmdb_id}"
-    response = requests.get(url, headers=_api_headers(), timeout=10)
 
+async def _send(path: str, params: dict | None, headers: dict) -> httpx.Response:
+    endpoint = tmdb_cache.normalize_endpoint(path)
+    started = time.perf_counter()
+    try:
+        response = await get_client().get(path, params=params, headers=headers)
+    except httpx.HTTPError as exc:
+        metrics.observe_tmdb(endpoint, type(exc).__name__, time.perf_counter() - started)
+        raise
+
+    metrics.observe_tmdb(endpoint, response.status_code, time.perf_counter() - started)
+    return response
+
+
+async def tmdb_get(path: str, params: dict | None = None) -> httpx.Response:
+    """GET through the governor: rate limited, retried, and refused with 503
+    while the circuit breaker is open."""
+    headers = _api_headers()
+    return await tmdb_governor.governor.call(lambda: _send(path, params, headers))
+
+
+def upstream_error(response: httpx.Response) -> HTTPException:
+    """Map a failed TMDB response to our error instead of a misleading 404/400."""
+    if response.status_code == status.HTTP_429_TOO_MANY_REQUESTS:
+        return tmdb_governor.unavailable(tmdb_governor.retry_after(response) or 1)
+
+    return HTTPException(
+        status_code=status.HTTP_502_BAD_GATEWAY,
+        detail=f"TMDB returned {response.status_code}.",
+    )
+
+
+def _forget(key: tuple, task: asyncio.Task) -> None:
+    _in_flight.pop(key, None)
+    if not task.cancelled():
+        # Mark the error as retrieved even if every caller went away
+        task.exception()
+
+
+async def _single_flight(key: tuple, fn: Callable[[], Awaitable[T]]) -> T:
+    """Run `fn` once for all concurrent callers with the same key.
+
+    The work runs as its own task, so a caller that disconnects doesn't
+    cancel it for the others. Results and errors are shared; shared results
+    must not be mutated.
+    """
+    task = _in_flight.get(key)
+    if task is None:
+        task = asyncio.ensure_future(fn())
+        _in_flight[key] = task
+        task.add_done_callback(lambda done: _forget(key, done))
+    else:
+        metrics.tmdb_coalesced.inc((key[0],))
+
+    return await asyncio.shield(task)
+
+
+async def _tmdb_get_json(path: str, params: dict | None = None) -> dict | None:
+    """GET a TMDB endpoint through the response cache.
+
+    Concurrent misses for the same key share one request. Returns None when
+    TMDB answers 404; other failures raise.
+    """
+    key = tmdb_cache.make_key(path, params)
+
+    cached = await tmdb_cache.lookup(key)
+    if cached is not None:
+        return cached
+
+    return await _single_flight(("get", key), lambda: _fetch_json(key, path, params))
+
+
+async def _fetch_json(key: str, path: str, params: dict | None) -> dict | None:
+    response = await tmdb_get(path, params)
+    if response.status_code == status.HTTP_404_NOT_FOUND:
+        return None
     if response.status_code != 200:
+        raise upstream_error(response)
+
+    data = response.json()
+    await tmdb_cache.store(key, data, tmdb_cache.ttl_for(path))
+
+    return data
+
+
+async def fetch_tmdb_movie(tmdb_id: int) -> dict:
+    data = await _tmdb_get_json(f"/movie/{tmdb_id}")
+
+    if data is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="TMDB movie not found.",
         )
 
-    return response.json()
+    return data
 
 
-def import_movie_by_tmdb_id(db: Session, tmdb_id: int) -> Movie:
-    # Prevent duplicates
-    exists = db.query(Movie).filter(Movie.tmdb_id == tmdb_id).first()
-    if exists:
-        return exists
-
-    tmdb_data = _fetch_tmdb_movie(tmdb_id)
+def to_movie_create(tmdb_data: dict) -> MovieCreate:
+    # Detail payloads carry "genres" objects, list payloads carry "genre_ids"
+    genre_ids = tmdb_data.get("genre_ids")
+    if genre_ids is None:
+        genre_ids = [g["id"] for g in tmdb_data.get("genres", [])]
 
-    movie_data = MovieCreate(
+    return MovieCreate(
         tmdb_id=tmdb_data.get("id"),
         title=tmdb_data.get("title") or "Untitled",
         overview=tmdb_data.get("overview") or "",
-        release_date=tmdb_data.get("release_date"),
-        genre_ids=str([g["id"] for g in tmdb_data.get("genres", [])]),
+        release_date=tmdb_data.get("release_date") or None,
+        genre_ids=str(genre_ids),
         vote_average=tmdb_data.get("vote_average") or 0.0,
         vote_count=tmdb_data.get("vote_count") or 0,
         poster_path=tmdb_data.get("poster_path") or "",
         backdrop_path=tmdb_data.get("backdrop_path") or "",
     )
 
-    movie = Movie(**movie_data.dict())
-    db.add(movie)
-    db.commit()
-    db.refresh(movie)
 
+async def _get_by_tmdb_id(tmdb_id: int) -> Movie | None:
+    # Read-only session: no write transaction stays open across the TMDB call
+    async with read_session() as db:
+        return await db.scalar(select(Movie).where(Movie.tmdb_id == tmdb_id))
+
+
+async def _upsert_movie(tmdb_data: dict) -> Movie:
+    values = to_movie_create(tmdb_data).dict()
+    stmt = sqlite_insert(Movie).values(values)
+    # Lost a race with another import of the same title: take its row
+    # (refreshed with this payload) instead of failing on the unique key
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[Movie.tmdb_id],
+        set_={name: stmt.excluded[name] for name in values if name != "tmdb_id"},
+    ).returning(Movie)
+
+    async with write_session() as db:
+        movie = await db.scalar(stmt)
+        await db.commit()
+        await image_cache.queue_prefetch(db, [movie])
+
+    response_cache.invalidate("movies", movie.id)
     return movie
 
 
-def import_popular_movies(db: Session, page: int = 1) -> list[Movie]:
-    url = f"{TMDB_BASE_URL}/movie/popular?page={page}"
+async def _import_movie(tmdb_id: int) -> Movie:
+    # Prevent duplicates
+    exists = await _get_by_tmdb_id(tmdb_id)
+    if exists:
+        return exists
 
-    response = requests.get(url, headers=_api_headers(), timeout=10)
+    tmdb_data = await fetch_tmdb_movie(tmdb_id)
+    return await _upsert_movie(tmdb_data)
 
-    if response.status_code != 200:
+
+async def import_movie_by_tmdb_id(tmdb_id: int) -> Movie:
+    """Import one TMDB movie; concurrent imports of the same id share one run."""
+    return await _single_flight(("import", tmdb_id), lambda: _import_movie(tmdb_id))
+
+
+def parse_page_range(pages: str) -> range:
+    """Parse "N" or "N-M" into an inclusive range of TMDB list pages."""
+    start, _, end = pages.partition("-")
+
+    try:
+        first = int(start)
+        last = int(end) if end else first
+    except ValueError:
+        first, last = 0, 0
+
+    if not 1 <= first <= last <= TMDB_MAX_PAGE:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid page range. Use N or N-M between 1 and {TMDB_MAX_PAGE}.",
+        )
+
+    return range(first, last + 1)
+
+
+async def _fetch_popular_page(page: int, limiter: asyncio.Semaphore) -> list[dict]:
+    async with limiter:
+        data = await _tmdb_get_json("/movie/popular", params={"page": page})
+
+    if data is None:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Failed to fetch popular movies from TMDB.",
         )
 
-    movies_json = response.json().get("results", [])
-    imported_movies = []
+    return data.get("results", [])
+
+
+async def _bulk_store_movies(
+    db: AsyncSession, movies_json: list[dict]
+) -> tuple[list[Movie], int]:
+    """Insert every unknown TMDB movie in a single transaction.
+
+    Existing rows are resolved with one IN query per batch; new rows go in
+    with INSERT ... ON CONFLICT DO NOTHING RETURNING, so a concurrent import
+    of the same titles cannot make the batch fail. Returns the stored movies
+    and how many of them were inserted.
+    """
+    by_tmdb_id: dict[int, Movie] = {}
+    inserted: list[Movie] = []
+
+    for i in range(0, len(movies_json), _IMPORT_BATCH_SIZE):
+        batch = movies_json[i : i + _IMPORT_BATCH_SIZE]
+        tmdb_ids = [m["id"] for m in batch]
+
+        existing = await db.scalars(select(Movie).where(Movie.tmdb_id.in_(tmdb_ids)))
+        by_tmdb_id.update({movie.tmdb_id: movie for movie in existing})
 
-    for m in movies_json:
-        existing = db.query(Movie).filter(Movie.tmdb_id == m["id"]).first()
-        if existing:
-            imported_movies.append(existing)
+        rows = [
+            to_movie_create(m).dict() for m in batch if m["id"] not in by_tmdb_id
+        ]
+        if not rows:
             continue
 
-        movie_data = MovieCreate(
-            tmdb_id=m.get("id"),
-            title=m.get("title") or "Untitled",
-            overview=m.get("overview") or "",
-            release_date=m.get("release_date"),
-            genre_ids=str(m.get("genre_ids", [])),
-            vote_average=m.get("vote_average") or 0.0,
-            vote_count=m.get("vote_count") or 0,
-            poster_path=m.get("poster_path") or "",
-            backdrop_path=m.get("backdrop_path") or "",
+        stmt = (
+            sqlite_insert(Movie)
+            .values(rows)
+            .on_conflict_do_nothing(index_elements=[Movie.tmdb_id])
+            .returning(Movie)
         )
+        new = (await db.scalars(stmt)).all()
+        inserted.extend(new)
+        by_tmdb_id.update({movie.tmdb_id: movie for movie in new})
 
-        movie = Movie(**movie_data.dict())
-        db.add(movie)
-        db.commit()
-        db.refresh(movie)
+    await db.commit()
+    response_cache.invalidate("movies")
+    await image_cache.queue_prefetch(db, inserted)
 
-        imported_movies.append(movie)
+    movies = [by_tmdb_id[m["id"]] for m in movies_json if m["id"] in by_tmdb_id]
+    return movies, len(inserted)
 
-    return imported_movies
 
+async def import_popular_movies(
+    db: AsyncSession, page: int = 1, pages: str | None = None
+) -> list[Movie]:
+    page_range = parse_page_range(pages) if pages else parse_page_range(str(page))
+    limiter = asyncio.Semaphore(TMDB_IMPORT_CONCURRENCY)
 
-def search_movies_tmdb(query: str) -> dict:
-    url = f"{TMDB_BASE_URL}/search/movie?query={query}"
+    results = await asyncio.gather(
+        *(_fetch_popular_page(p, limiter) for p in page_range)
+    )
 
-    response = requests.get(url, headers=_api_headers(), timeout=10)
+    # TMDB's popularity order shifts between pages, so titles can repeat
+    unique_movies = {m["id"]: m for page_results in results for m in page_results}
 
-    if response.status_code != 200:
+    movies, _ = await _bulk_store_movies(db, list(unique_movies.values()))
+    return movies
+
+
+async def queue_movie_import(db: AsyncSession, tmdb_id: int) -> Job:
+    return await jobs.enqueue(db, "import_movie", {"tmdb_id": tmdb_id})
+
+
+async def queue_popular_import(
+    db: AsyncSession, page: int = 1, pages: str | None = None
+) -> Job:
+    page_range = parse_page_range(pages) if pages else parse_page_range(str(page))
+    return await jobs.enqueue(
+        db, "import_popular", {"first": page_range.start, "last": page_range.stop - 1}
+    )
+
+
+@jobs.handler("import_movie")
+async def _import_movie_job(job: jobs.JobContext) -> None:
+    tmdb_id = job.params["tmdb_id"]
+
+    movie = await _get_by_tmdb_id(tmdb_id)
+    if movie:
+        await job.update(movie_id=movie.id, inserted=0, skipped=1)
+        return
+
+    try:
+        movie = await import_movie_by_tmdb_id(tmdb_id)
+    except HTTPException as exc:
+        if exc.status_code == status.HTTP_404_NOT_FOUND:
+            raise jobs.PermanentJobError(exc.detail)
+        raise
+
+    await job.update(movie_id=movie.id, inserted=1, skipped=0)
+
+
+@jobs.handler("import_popular")
+async def _import_popular_job(job: jobs.JobContext) -> None:
+    """Import a page range in groups of TMDB_IMPORT_CONCURRENCY pages.
+
+    Each group is stored in its own transaction and recorded as progress, so
+    a retry resumes after the last stored group.
+    """
+    first, last = job.params["first"], job.params["last"]
+    initial = {"pages_total": last - first + 1, "pages_done": 0, "inserted": 0, "skipped": 0}
+    await job.update(**{**initial, **job.progress})
+
+    limiter = asyncio.Semaphore(TMDB_IMPORT_CONCURRENCY)
+    seen: set[int] = set()
+
+    start = first + job.progress["pages_done"]
+    for group_start in range(start, last + 1, TMDB_IMPORT_CONCURRENCY):
+        group = range(group_start, min(group_start + TMDB_IMPORT_CONCURRENCY, last + 1))
+        results = await asyncio.gather(*(_fetch_popular_page(p, limiter) for p in group))
+
+        unique_movies = {
+            m["id"]: m
+            for page_results in results
+            for m in page_results
+            if m["id"] not in seen
+        }
+        seen.update(unique_movies)
+
+        async with write_session() as db:
+            _, inserted = await _bulk_store_movies(db, list(unique_movies.values()))
+
+        await job.update(
+            pages_done=job.progress["pages_done"] + len(group),
+            inserted=job.progress["inserted"] + inserted,
+            skipped=job.progress["skipped"] + len(unique_movies) - inserted,
+        )
+
+
+async def _store_genres(db: AsyncSession, genres_json: list[dict]) -> list[dict]:
+    if genres_json:
+        stmt = sqlite_insert(Genre).values(
+            [{"id": g["id"], "name": g["name"]} for g in genres_json]
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[Genre.id], set_={"name": stmt.excluded.name}
+        )
+        await db.execute(stmt)
+        await db.commit()
+
+    return await list_genres(db)
+
+
+async def import_genres(db: AsyncSession) -> list[dict]:
+    data = await _tmdb_get_json("/genre/movie/list")
+
+    if data is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Failed to fetch genres from TMDB.",
+        )
+
+    return await _store_genres(db, data.get("genres", []))
+
+
+async def search_movies_tmdb(query: str) -> dict:
+    data = await _tmdb_get_json("/search/movie", params={"query": query})
+
+    if data is None:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Failed to search TMDB.",
         )
 
-    return response.json()
+    return data
+
+
+def _local_hit(row) -> dict:
+    return {**row._asdict(), "source": "local"}
+
+
+def _schedule_search_ingest(query: str, background_tasks: BackgroundTasks) -> None:
+    # Once per query and process, and after the response: a search never
+    # waits for the write lock
+    normalized = " ".join(query.lower().split())
+    if normalized in _queued_searches:
+        return
+
+    if len(_queued_searches) >= _QUEUED_SEARCHES_MAX:
+        _queued_searches.clear()
+    _queued_searches.add(normalized)
+    background_tasks.add_task(_queue_search_ingest, normalized)
+
+
+async def _queue_search_ingest(query: str) -> None:
+    try:
+        async with write_session() as db:
+            await jobs.enqueue(db, "ingest_search", {"query": query})
+    except Exception:
+        # The next search for it tries again
+        _queued_searches.discard(query)
+        logger.exception("Could not queue the ingestion of search %r", query)
+
+
+async def hybrid_search(
+    db: AsyncSession, query: str, background_tasks: BackgroundTasks
+) -> dict:
+    """Search the local index first and TMDB only when it finds too little.
+
+    Below SEARCH_LOCAL_THRESHOLD local hits, TMDB's results are merged in
+    after the local ones, deduplicated by TMDB id (a TMDB hit we already
+    store is shown as our row). Hits we don't store yet are queued for
+    ingestion once the response is sent, so the next search for them is
+    answered locally. `source` is "local" when every hit is a stored row.
+    """
+    local = await search_movies(db, query, SEARCH_RESULTS_LIMIT)
+    hits = [_local_hit(row) for row in local]
+
+    if len(local) >= SEARCH_LOCAL_THRESHOLD:
+        metrics.movie_searches.inc(("local",))
+        return {"query": query, "source": "local", "results": hits}
+
+    try:
+        data = await search_movies_tmdb(query)
+    except HTTPException as exc:
+        # TMDB down or throttled: what we have beats an error
+        if exc.status_code < 500 or not local:
+            raise
+        metrics.movie_searches.inc(("local",))
+        return {"query": query, "source": "local", "results": hits}
+
+    seen = {row.tmdb_id for row in local}
+    remote = [
+        m for m in data.get("results", []) if m.get("id") is not None and m["id"] not in seen
+    ]
+    stored = {
+        row.tmdb_id: row
+        for row in await db.execute(
+            select(*MOVIE_COLUMNS).where(Movie.tmdb_id.in_([m["id"] for m in remote]))
+        )
+    }
+
+    missing = 0
+    for m in remote[: SEARCH_RESULTS_LIMIT - len(hits)]:
+        if m["id"] in stored:
+            hits.append(_local_hit(stored[m["id"]]))
+        else:
+            hits.append(
+                {**to_movie_create(m).dict(), "id": None, "created_at": None, "source": "tmdb"}
+            )
+            missing += 1
+
+    if missing:
+        _schedule_search_ingest(query, background_tasks)
+
+    if missing == len(hits):
+        source = "tmdb"
+    else:
+        source = "hybrid" if missing else "local"
+    metrics.movie_searches.inc((source,))
+    return {"query": query, "source": source, "results": hits}
+
+
+@jobs.handler("ingest_search")
+async def _ingest_search_job(job: jobs.JobContext) -> None:
+    # Served from the TMDB cache the search just filled
+    data = await search_movies_tmdb(job.params["query"])
+
+    async with write_session() as db:
+        _, inserted = await _bulk_store_movies(db, data.get("results", []))
+
+    await job.update(inserted=inserted)
@@ -0,0 +1,200 @@
+import json
+import os
+import re
+import time
+from collections import OrderedDict
+from urllib.parse import urlencode
+
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from app.database import read_session, write_session
+from app.models.tmdb_cache import TmdbCacheEntry
+
+TMDB_CACHE_MAX_BYTES = int(os.getenv("TMDB_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+TMDB_CACHE_DISK = os.getenv("TMDB_CACHE_DISK", "false").lower() == "true"
+TMDB_CACHE_DEFAULT_TTL = int(os.getenv("TMDB_CACHE_DEFAULT_TTL", "300"))
+
+# Seconds a response stays fresh, per normalized endpoint
+TMDB_CACHE_TTLS = {
+    "/movie/{id}": int(os.getenv("TMDB_CACHE_TTL_MOVIE", "3600")),
+    "/movie/popular": int(os.getenv("TMDB_CACHE_TTL_POPULAR", "600")),
+    "/search/movie": int(os.getenv("TMDB_CACHE_TTL_SEARCH", "600")),
+}
+
+_ID_SEGMENT = re.compile(r"/\d+(?=/|$)")
+
+
+class LRUCache:
+    """In-memory TTL cache that evicts least recently used entries past max_bytes.
+
+    Only touched from the event loop, so it needs no locking.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.evictions = 0
+        self._entries: OrderedDict[str, tuple[float, int, object]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        expires_at, _, value = entry
+        if expires_at <= time.time():
+            self._remove(key)
+            return None
+
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: str, value, expires_at: float, size: int) -> None:
+        if size > self.max_bytes:
+            return
+
+        if key in self._entries:
+            self._remove(key)
+
+        self._entries[key] = (expires_at, size, value)
+        self.current_bytes += size
+
+        while self.current_bytes > self.max_bytes:
+            _, (_, evicted_size, _) = self._entries.popitem(last=False)
+            self.current_bytes -= evicted_size
+            self.evictions += 1
+
+    def discard(self, key: str) -> None:
+        if key in self._entries:
+            self._remove(key)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.current_bytes = 0
+
+    def _remove(self, key: str) -> None:
+        _, size, _ = self._entries.pop(key)
+        self.current_bytes -= size
+
+
+_memory = LRUCache(TMDB_CACHE_MAX_BYTES)
+_counters = {"memory_hits": 0, "disk_hits": 0, "misses": 0}
+
+
+def normalize_endpoint(path: str) -> str:
+    return _ID_SEGMENT.sub("/{id}", path)
+
+
+def make_key(path: str, params: dict | None = None) -> str:
+    normalized = sorted(
+        (name, " ".join(str(value).lower().split()))
+        for name, value in (params or {}).items()
+        if value is not None
+    )
+    return f"{path}?{urlencode(normalized)}"
+
+
+def ttl_for(path: str) -> int:
+    return TMDB_CACHE_TTLS.get(normalize_endpoint(path), TMDB_CACHE_DEFAULT_TTL)
+
+
+async def _disk_get(key: str) -> tuple[float, str] | None:
+    stmt = select(TmdbCacheEntry.expires_at, TmdbCacheEntry.payload).where(
+        TmdbCacheEntry.key == key,
+        TmdbCacheEntry.expires_at > time.time(),
+    )
+
+    async with read_session() as db:
+        row = (await db.execute(stmt)).first()
+
+    return tuple(row) if row else None
+
+
+async def _disk_set(key: str, payload: str, expires_at: float) -> None:
+    stmt = sqlite_insert(TmdbCacheEntry).values(
+        key=key, payload=payload, expires_at=expires_at
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[TmdbCacheEntry.key],
+        set_={"payload": payload, "expires_at": expires_at},
+    )
+
+    async with write_session() as db:
+        await db.execute(stmt)
+        await db.commit()
+
+
+async def lookup(key: str) -> dict | None:
+    """Return a fresh cached payload, or None.
+
+    Cached payloads are shared between callers and must not be mutated.
+    """
+    value = _memory.get(key)
+    if value is not None:
+        _counters["memory_hits"] += 1
+        return value
+
+    if TMDB_CACHE_DISK:
+        row = await _disk_get(key)
+        if row is not None:
+            expires_at, payload = row
+            value = json.loads(payload)
+            _memory.set(key, value, expires_at, len(payload))
+            _counters["disk_hits"] += 1
+            return value
+
+    _counters["misses"] += 1
+    return None
+
+
+async def store(key: str, value: dict, ttl: int) -> None:
+    payload = json.dumps(value, separators=(",", ":"))
+    expires_at = time.time() + ttl
+
+    _memory.set(key, value, expires_at, len(payload))
+
+    if TMDB_CACHE_DISK:
+        await _disk_set(key, payload, expires_at)
+
+
+async def purge_expired() -> int:
+    """Drop expired rows from the on-disk tier. Returns how many were removed."""
+    if not TMDB_CACHE_DISK:
+        return 0
+
+    async with write_session() as db:
+        result = await db.execute(
+            delete(TmdbCacheEntry).where(TmdbCacheEntry.expires_at <= time.time())
+        )
+        await db.commit()
+
+    return result.rowcount
+
+
+async def clear() -> None:
+    """Drop every entry, on disk too: the next lookup would reload it."""
+    _memory.clear()
+
+    if TMDB_CACHE_DISK:
+        async with write_session() as db:
+            await db.execute(delete(TmdbCacheEntry))
+            await db.commit()
+
+
+def get_stats() -> dict:
+    hits = _counters["memory_hits"] + _counters["disk_hits"]
+    lookups = hits + _counters["misses"]
+
+    return {
+        **_counters,
+        "hit_ratio": hits / lookups if lookups else 0.0,
+        "entries": len(_memory),
+        "bytes": _memory.current_bytes,
+        "max_bytes": _memory.max_bytes,
+        "evictions": _memory.evictions,
+        "disk_enabled": TMDB_CACHE_DISK,
+    }
@@ -0,0 +1,358 @@
+"""Build the catalogue from TMDB's daily movie id export.
+
+TMDB publishes `movie_ids_MM_DD_YYYY.json.gz` every day: one JSON object per
+line with `id`, `original_title`, `popularity`, `adult` and `video`. Instead
+of paging through the API, the dump is streamed chunk by chunk (gunzip and
+line parsing run in a worker thread), filtered, and stored as stub rows:
+INSERT ... ON CONFLICT DO NOTHING, TMDB_DUMP_BATCH_SIZE rows per statement
+and TMDB_DUMP_ROWS_PER_TRANSACTION per commit. Stubs only carry the TMDB id
+and title; with `hydrate` the new ones are queued as `hydrate_movies` jobs
+that fill in the details through `fetch_tmdb_movie`.
+
+    python -m app.services.tmdb_dump movie_ids_10_17_2026.json.gz --min-popularity 1
+"""
+
+import argparse
+import asyncio
+import os
+import time
+import zlib
+from pathlib import Path
+from typing import AsyncIterator, Awaitable, Callable
+
+import anyio.to_thread
+import orjson
+from fastapi import HTTPException, status
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import jobs, response_cache
+from app.database import write_session
+from app.models.job import Job
+from app.models.movie import Movie
+from app.services.tmdb import fetch_tmdb_movie
+from app.services.tmdb_sync import refresh_batch
+
+TMDB_DUMP_DIR = os.getenv("TMDB_DUMP_DIR", "./dumps")
+TMDB_DUMP_BATCH_SIZE = int(os.getenv("TMDB_DUMP_BATCH_SIZE", "5000"))
+TMDB_DUMP_ROWS_PER_TRANSACTION = int(
+    os.getenv("TMDB_DUMP_ROWS_PER_TRANSACTION", "50000")
+)
+TMDB_HYDRATE_BATCH_SIZE = int(os.getenv("TMDB_HYDRATE_BATCH_SIZE", "200"))
+
+# Bytes read from a local file per step
+_READ_SIZE = 256 * 1024
+_GZIP_MAGIC = b"\x1f\x8b"
+
+
+class DumpParser:
+    """Incremental gunzip + line splitter + filter. Not thread-safe; feed it
+    from one thread at a time."""
+
+    def __init__(self, min_popularity: float = 0.0, include_adult: bool = False):
+        self.min_popularity = min_popularity
+        self.include_adult = include_adult
+        self.lines = 0
+        self.invalid = 0
+        self._inflate = None
+        self._started = False
+        self._tail = b""
+
+    def feed(self, data: bytes) -> list[dict]:
+        if not self._started:
+            # Plain JSONL works too, which helps with hand-made test files
+            self._started = True
+            if data[:2] == _GZIP_MAGIC:
+                self._inflate = zlib.decompressobj(wbits=31)
+
+        if self._inflate is not None:
+            data = self._inflate_all(data)
+
+        lines = (self._tail + data).split(b"\n")
+        self._tail = lines.pop()
+        return self._parse(lines)
+
+    def finish(self) -> list[dict]:
+        tail = b""
+        if self._inflate is not None:
+            tail = self._inflate.flush()
+            if not self._inflate.eof:
+                raise _bad_dump("The gzip data ends before the end of the stream.")
+        lines = (self._tail + tail).split(b"\n")
+        self._tail = b""
+        return self._parse(lines)
+
+    def _inflate_all(self, data: bytes) -> bytes:
+        try:
+            out = self._inflate.decompress(data)
+            # Concatenated gzip members: start over on what follows each one
+            while self._inflate.eof and self._inflate.unused_data:
+                rest = self._inflate.unused_data
+                self._inflate = zlib.decompressobj(wbits=31)
+                out += self._inflate.decompress(rest)
+        except zlib.error as exc:
+            raise _bad_dump(f"The gzip data is corrupt ({exc}).")
+        return out
+
+    def _parse(self, lines: list[bytes]) -> list[dict]:
+        rows = []
+        for line in lines:
+            if not line.strip():
+                continue
+            self.lines += 1
+
+            try:
+                item = orjson.loads(line)
+                tmdb_id = int(item["id"])
+            except (orjson.JSONDecodeError, KeyError, TypeError, ValueError):
+                self.invalid += 1
+                continue
+
+            if item.get("adult") and not self.include_adult:
+                continue
+            if (item.get("popularity") or 0) < self.min_popularity:
+                continue
+
+            rows.append(
+                {"tmdb_id": tmdb_id, "title": item.get("original_title") or "Untitled"}
+            )
+
+        return rows
+
+
+def _bad_dump(detail: str) -> HTTPException:
+    return HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=detail)
+
+
+async def read_file(path: Path) -> AsyncIterator[bytes]:
+    with open(path, "rb") as f:
+        while chunk := await anyio.to_thread.run_sync(f.read, _READ_SIZE):
+            yield chunk
+
+
+def resolve_dump_path(path: str) -> Path:
+    """Only files inside TMDB_DUMP_DIR can be read through the API."""
+    root = Path(TMDB_DUMP_DIR).resolve()
+    resolved = (root / path).resolve()
+
+    if not resolved.is_relative_to(root) or not resolved.is_file():
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"No dump file '{path}' in the dump directory.",
+        )
+
+    return resolved
+
+
+async def _store_stubs(rows: list[dict]) -> list[int]:
+    """Insert one transaction's worth of stubs. Returns the new TMDB ids."""
+    stmt = (
+        sqlite_insert(Movie)
+        .on_conflict_do_nothing(index_elements=[Movie.tmdb_id])
+        .returning(Movie.tmdb_id)
+    )
+
+    inserted: list[int] = []
+    async with write_session() as db:
+        for i in range(0, len(rows), TMDB_DUMP_BATCH_SIZE):
+            batch = rows[i : i + TMDB_DUMP_BATCH_SIZE]
+            inserted.extend(await db.scalars(stmt, batch))
+        await db.commit()
+
+    response_cache.invalidate("movies")
+    return inserted
+
+
+async def _queue_hydration(tmdb_ids: list[int]) -> int:
+    queued = 0
+    async with write_session() as db:
+        for i in range(0, len(tmdb_ids), TMDB_HYDRATE_BATCH_SIZE):
+            batch = tmdb_ids[i : i + TMDB_HYDRATE_BATCH_SIZE]
+            await jobs.enqueue(db, "hydrate_movies", {"tmdb_ids": batch})
+            queued += 1
+
+    return queued
+
+
+async def ingest_dump(
+    chunks: AsyncIterator[bytes],
+    min_popularity: float = 0.0,
+    include_adult: bool = False,
+    hydrate: bool = False,
+    on_progress: Callable[[dict], Awaitable[None]] | None = None,
+) -> dict:
+    """Stream a dump into `movies` and report what happened.
+
+    At most TMDB_DUMP_ROWS_PER_TRANSACTION parsed rows are held in memory,
+    and the write lock is only taken while they are inserted.
+    """
+    parser = DumpParser(min_popularity, include_adult)
+    started = time.perf_counter()
+    report = {"matched": 0, "inserted": 0, "hydration_jobs": 0}
+    pending: list[dict] = []
+
+    def summary() -> dict:
+        seconds = time.perf_counter() - started
+        return {
+            "lines": parser.lines,
+            **report,
+            "existing": report["matched"] - len(pending) - report["inserted"],
+            "invalid": parser.invalid,
+            "seconds": round(seconds, 3),
+            "rows_per_second": round(parser.lines / seconds) if seconds else 0,
+        }
+
+    async def flush() -> None:
+        inserted = await _store_stubs(pending)
+        report["inserted"] += len(inserted)
+        if hydrate and inserted:
+            report["hydration_jobs"] += await _queue_hydration(inserted)
+        pending.clear()
+        if on_progress:
+            await on_progress(summary())
+
+    async for chunk in chunks:
+        rows = await anyio.to_thread.run_sync(parser.feed, chunk)
+        report["matched"] += len(rows)
+        pending.extend(rows)
+        if len(pending) >= TMDB_DUMP_ROWS_PER_TRANSACTION:
+            await flush()
+
+    rows = parser.finish()
+    report["matched"] += len(rows)
+    pending.extend(rows)
+    if pending:
+        await flush()
+
+    return summary()
+
+
+async def import_dump(
+    body: AsyncIterator[bytes],
+    path: str | None = None,
+    min_popularity: float = 0.0,
+    include_adult: bool = False,
+    hydrate: bool = False,
+) -> dict:
+    """Import the dump named by `path`, or the uploaded `body` without one."""
+    chunks = read_file(resolve_dump_path(path)) if path is not None else body
+    return await ingest_dump(chunks, min_popularity, include_adult, hydrate)
+
+
+async def queue_dump_import(
+    db: AsyncSession,
+    path: str | None,
+    min_popularity: float = 0.0,
+    include_adult: bool = False,
+    hydrate: bool = False,
+) -> Job:
+    # The job outlives the request, so it can't read the upload
+    if path is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Background dump imports need a 'path' in the dump directory.",
+        )
+
+    resolve_dump_path(path)
+    return await jobs.enqueue(
+        db,
+        "import_dump",
+        {
+            "path": path,
+            "min_popularity": min_popularity,
+            "include_adult": include_adult,
+            "hydrate": hydrate,
+        },
+    )
+
+
+@jobs.handler("import_dump")
+async def _import_dump_job(job: jobs.JobContext) -> None:
+    # Stubs are inserted with DO NOTHING, so a retry just starts over
+    # A missing or corrupt file won't get better on a retry
+    params = dict(job.params)
+    try:
+        path = resolve_dump_path(params.pop("path"))
+        await ingest_dump(read_file(path), **params, on_progress=_report_to(job))
+    except HTTPException as exc:
+        raise jobs.PermanentJobError(exc.detail)
+
+
+def _report_to(job: jobs.JobContext) -> Callable[[dict], Awaitable[None]]:
+    async def report(summary: dict) -> None:
+        await job.update(**summary)
+
+    return report
+
+
+async def _fetch_detail(tmdb_id: int, limiter: asyncio.Semaphore) -> dict | None:
+    async with limiter:
+        try:
+            return await fetch_tmdb_movie(tmdb_id)
+        except HTTPException as exc:
+            if exc.status_code == status.HTTP_404_NOT_FOUND:
+                return None
+            raise
+
+
+@jobs.handler("hydrate_movies")
+async def _hydrate_job(job: jobs.JobContext) -> None:
+    """Fill in stub rows; a retry only fetches the ids that failed before."""
+    remaining = job.progress.get("remaining", job.params["tmdb_ids"])
+    hydrated, retry = await refresh_batch(remaining, _fetch_detail)
+
+    await job.update(
+        hydrated=job.progress.get("hydrated", 0) + hydrated, remaining=retry
+    )
+    if retry:
+        raise RuntimeError(f"{len(retry)} movies could not be fetched from TMDB.")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("path", help="movie_ids_*.json.gz (or plain JSONL)")
+    parser.add_argument("--min-popularity", type=float, default=0.0)
+    parser.add_argument("--include-adult", action="store_true")
+    parser.add_argument(
+        "--hydrate",
+        action="store_true",
+        help="queue detail fetches for the new rows; a running API works through them",
+    )
+    args = parser.parse_args()
+
+    from app.database import create_db_and_tables, dispose_engines
+    from app.migrations import run_migrations
+
+    create_db_and_tables()
+    run_migrations()
+
+    async def progress(report: dict) -> None:
+        print(
+            f"{report['lines']:>10,} lines  {report['inserted']:>10,} inserted  "
+            f"{report['rows_per_second']:>8,} rows/s",
+            flush=True,
+        )
+
+    async def run() -> dict:
+        try:
+            return await ingest_dump(
+                read_file(Path(args.path)),
+                args.min_popularity,
+                args.include_adult,
+                args.hydrate,
+                progress,
+            )
+        finally:
+            await dispose_engines()
+
+    report = asyncio.run(run())
+    print(
+        f"Done: {report['lines']:,} lines, {report['matched']:,} matched, "
+        f"{report['inserted']:,} inserted, {report['existing']:,} already stored, "
+        f"{report['invalid']:,} invalid, {report['hydration_jobs']:,} hydration jobs "
+        f"in {report['seconds']}s ({report['rows_per_second']:,} rows/s)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,336 @@
+"""Governor for outbound TMDB calls: rate limit, retries, concurrency, breaker.
+
+Every TMDB request goes through `governor.call`:
+
+- a token bucket keeps us under TMDB's request quota, and a 429 pauses it
+  for the `Retry-After` the server asked for;
+- failed attempts (429, 5xx, transport errors) are retried with jittered
+  exponential backoff, within TMDB_DEADLINE_SECONDS per call;
+- an AIMD limit caps the calls in flight: it shrinks when TMDB slows down or
+  pushes back and grows again while responses stay fast;
+- after TMDB_BREAKER_THRESHOLD consecutive failures the circuit opens and
+  calls fail fast with 503 until a probe succeeds after the cooldown.
+
+Only touched from the event loop, so it needs no locking. Nothing here holds
+an asyncio primitive across calls, which keeps it usable from any loop.
+"""
+
+import asyncio
+import math
+import os
+import random
+import time
+from collections import deque
+from email.utils import parsedate_to_datetime
+from typing import Awaitable, Callable
+
+import httpx
+from fastapi import HTTPException, status
+
+from app import metrics
+
+# TMDB allows roughly 50 requests per second per IP
+TMDB_RATE_LIMIT = float(os.getenv("TMDB_RATE_LIMIT", "40"))
+TMDB_RATE_BURST = int(os.getenv("TMDB_RATE_BURST", "40"))
+TMDB_MAX_RETRIES = int(os.getenv("TMDB_MAX_RETRIES", "3"))
+TMDB_RETRY_BASE_SECONDS = float(os.getenv("TMDB_RETRY_BASE_SECONDS", "0.5"))
+TMDB_RETRY_MAX_SECONDS = float(os.getenv("TMDB_RETRY_MAX_SECONDS", "8"))
+TMDB_DEADLINE_SECONDS = float(os.getenv("TMDB_DEADLINE_SECONDS", "15"))
+TMDB_CONCURRENCY_MIN = int(os.getenv("TMDB_CONCURRENCY_MIN", "2"))
+TMDB_CONCURRENCY_MAX = int(
+    os.getenv("TMDB_CONCURRENCY_MAX", os.getenv("TMDB_MAX_CONNECTIONS", "20"))
+)
+TMDB_LATENCY_TARGET = float(os.getenv("TMDB_LATENCY_TARGET", "1.0"))
+TMDB_BREAKER_THRESHOLD = int(os.getenv("TMDB_BREAKER_THRESHOLD", "5"))
+TMDB_BREAKER_COOLDOWN = float(os.getenv("TMDB_BREAKER_COOLDOWN", "30"))
+
+
+def retry_after(response: httpx.Response) -> float | None:
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP-date)."""
+    value = response.headers.get("retry-after")
+    if not value:
+        return None
+
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def unavailable(seconds: float) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="TMDB is temporarily unavailable.",
+        headers={"Retry-After": str(max(1, math.ceil(seconds)))},
+    )
+
+
+class TokenBucket:
+    """Token bucket kept as a theoretical arrival time (GCRA).
+
+    Each caller reserves the next slot and sleeps until it comes up, so
+    waiters are served in order without a lock.
+    """
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tat = 0.0
+        self._paused_until = 0.0
+
+    @property
+    def tokens(self) -> float:
+        if self.rate <= 0:
+            return float(self.burst)
+        backlog = max(0.0, self._tat - time.monotonic()) * self.rate
+        return max(0.0, self.burst - backlog)
+
+    def pause(self, seconds: float) -> None:
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    async def acquire(self) -> None:
+        now = time.monotonic()
+        ready_at = self._paused_until
+        if self.rate > 0:
+            interval = 1 / self.rate
+            base = max(self._tat, now)
+            self._tat = base + interval
+            ready_at = max(ready_at, base - (self.burst - 1) * interval)
+
+        if ready_at > now:
+            await asyncio.sleep(ready_at - now)
+
+
+class AdaptiveLimiter:
+    """Concurrency limit with additive increase, multiplicative decrease.
+
+    Calls that come back slower than TMDB_LATENCY_TARGET, or overloaded,
+    halve the limit (at most once per target window); fast calls grow it by
+    1/limit, i.e. about one slot per limit's worth of calls.
+    """
+
+    def __init__(self, minimum: int, maximum: int, latency_target: float):
+        self.minimum = max(1, minimum)
+        self.maximum = max(self.minimum, maximum)
+        self.latency_target = latency_target
+        self.limit = float(self.maximum)
+        self.in_flight = 0
+        self._last_decrease = 0.0
+        self._waiters: deque[asyncio.Future] = deque()
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    async def acquire(self) -> None:
+        while self.in_flight >= int(self.limit):
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                # Pass on a wakeup this waiter may already have been given
+                self._wake()
+                raise
+            finally:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+
+        self.in_flight += 1
+
+    def release(self, latency: float, overloaded: bool) -> None:
+        self.in_flight -= 1
+
+        now = time.monotonic()
+        if overloaded or latency > self.latency_target:
+            if now - self._last_decrease >= self.latency_target:
+                self.limit = max(float(self.minimum), self.limit / 2)
+                self._last_decrease = now
+        else:
+            self.limit = min(float(self.maximum), self.limit + 1 / self.limit)
+
+        self._wake()
+
+    def _wake(self) -> None:
+        free = int(self.limit) - self.in_flight
+        while free > 0 and self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                free -= 1
+
+
+class CircuitBreaker:
+    """closed -> open after `threshold` consecutive failures; open -> half-open
+    after `cooldown`, where a single probe decides whether it closes again."""
+
+    def __init__(self, threshold: int, cooldown: float):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.state = "closed"
+        self.failures = 0
+        self.opened = 0
+        self._opened_at = 0.0
+        self._probing = False
+
+    def retry_after(self) -> float:
+        return max(0.0, self._opened_at + self.cooldown - time.monotonic())
+
+    def check(self) -> float | None:
+        """None when a call may go out, else seconds until it's worth retrying."""
+        if self.state == "open":
+            if self.retry_after() > 0:
+                return self.retry_after()
+            self.state = "half_open"
+
+        if self.state == "half_open":
+            if self._probing:
+                return 1.0
+            self._probing = True
+
+        return None
+
+    def success(self) -> None:
+        self.state = "closed"
+        self.failures = 0
+        self._probing = False
+
+    def failure(self) -> None:
+        self.failures += 1
+        self._probing = False
+        if self.state == "half_open" or self.failures >= self.threshold:
+            if self.state != "open":
+                self.opened += 1
+            self.state = "open"
+            self._opened_at = time.monotonic()
+
+    def abandon(self) -> None:
+        # The probe was cancelled before it told us anything
+        self._probing = False
+
+
+class Governor:
+    def __init__(self):
+        self.bucket = TokenBucket(TMDB_RATE_LIMIT, TMDB_RATE_BURST)
+        self.limiter = AdaptiveLimiter(
+            TMDB_CONCURRENCY_MIN, TMDB_CONCURRENCY_MAX, TMDB_LATENCY_TARGET
+        )
+        self.breaker = CircuitBreaker(TMDB_BREAKER_THRESHOLD, TMDB_BREAKER_COOLDOWN)
+        self.counters = {"calls": 0, "retries": 0, "throttled": 0, "rejected": 0}
+
+    async def call(
+        self, send: Callable[[], Awaitable[httpx.Response]], retry: bool = True
+    ) -> httpx.Response:
+        """Run `send` under the governor and return the last response.
+
+        Only pass `retry=True` for idempotent requests. A response that is
+        still a 429 or 5xx once retries run out is returned for the caller
+        to map; transport errors are re-raised. Raises 503 while the
+        circuit is open.
+        """
+        deadline = time.monotonic() + TMDB_DEADLINE_SECONDS
+        attempt = 0
+        self.counters["calls"] += 1
+
+        while True:
+            wait = self.breaker.check()
+            if wait is not None:
+                self.counters["rejected"] += 1
+                raise unavailable(wait)
+
+            response, error = None, None
+            try:
+                await self.bucket.acquire()
+                await self.limiter.acquire()
+                started = time.monotonic()
+                try:
+                    response = await send()
+                except httpx.TransportError as exc:
+                    error = exc
+                finally:
+                    self.limiter.release(
+                        time.monotonic() - started, _overloaded(response)
+                    )
+            except BaseException:
+                self.breaker.abandon()
+                raise
+
+            if response is not None and response.status_code == 429:
+                # Rate limited, not unhealthy: slow everyone down instead
+                self.breaker.success()
+                self.counters["throttled"] += 1
+                delay = retry_after(response)
+                if delay is None:
+                    delay = _backoff(attempt)
+                self.bucket.pause(delay)
+                reason = "rate_limited"
+            elif response is not None and response.status_code < 500:
+                self.breaker.success()
+                return response
+            else:
+                self.breaker.failure()
+                delay = _backoff(attempt)
+                reason = "server_error" if response is not None else "transport_error"
+
+            attempt += 1
+            give_up = (
+                not retry
+                or attempt > TMDB_MAX_RETRIES
+                or self.breaker.state == "open"
+                or time.monotonic() + delay > deadline
+            )
+            if give_up:
+                if error is not None:
+                    raise error
+                return response
+
+            self.counters["retries"] += 1
+            metrics.tmdb_retries.inc((reason,))
+            await asyncio.sleep(delay)
+
+    def get_state(self) -> dict:
+        return {
+            **self.counters,
+            "rate_limit": self.bucket.rate,
+            "tokens": round(self.bucket.tokens, 2),
+            "concurrency_limit": int(self.limiter.limit),
+            "in_flight": self.limiter.in_flight,
+            "queued": self.limiter.queued,
+            "breaker_state": self.breaker.state,
+            "consecutive_failures": self.breaker.failures,
+            "breaker_opened": self.breaker.opened,
+            "breaker_retry_after": (
+                round(self.breaker.retry_after(), 2) if self.breaker.state == "open" else 0.0
+            ),
+        }
+
+
+def _overloaded(response: httpx.Response | None) -> bool:
+    return response is None or response.status_code == 429 or response.status_code >= 500
+
+
+def _backoff(attempt: int) -> float:
+    delay = min(TMDB_RETRY_BASE_SECONDS * 2**attempt, TMDB_RETRY_MAX_SECONDS)
+    # Full jitter, so callers that failed together don't retry together
+    return random.uniform(0, delay)
+
+
+governor = Governor()
+
+
+def _gauge_values() -> dict[tuple, float]:
+    return {
+        ("concurrency_limit",): int(governor.limiter.limit),
+        ("in_flight",): governor.limiter.in_flight,
+        ("queued",): governor.limiter.queued,
+        ("tokens",): governor.bucket.tokens,
+        ("breaker_open",): float(governor.breaker.state != "closed"),
+    }
+
+
+metrics.tmdb_governor.collect = _gauge_values
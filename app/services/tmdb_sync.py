@@ -0,0 +1,281 @@
+"""Incremental refresh of stored movies from TMDB's /movie/changes feed.
+
+Each run collects the TMDB ids changed since the stored watermark, keeps the
+ones we have locally as `pending`, and refreshes at most SYNC_BUDGET of them:
+detail pages fetched in parallel, written back with one bulk UPDATE per
+batch. Cost follows churn, not catalogue size; what doesn't fit the budget
+waits for the next run. Runs are `tmdb_sync` jobs, so they get the queue's
+retries and never overlap; a scheduler started from the lifespan enqueues
+one every SYNC_INTERVAL_SECONDS.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable
+
+from fastapi import status
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import jobs, response_cache
+from app.database import read_session, write_session
+from app.models.job import Job
+from app.models.movie import Movie
+from app.models.sync_state import SyncState
+from app.services import image_cache, tmdb_cache
+from app.services.tmdb import (
+    TMDB_ACCESS_TOKEN,
+    TMDB_IMPORT_CONCURRENCY,
+    tmdb_get,
+    to_movie_create,
+    upstream_error,
+)
+
+logger = logging.getLogger(__name__)
+
+SYNC_INTERVAL_SECONDS = float(os.getenv("SYNC_INTERVAL_SECONDS", "3600"))
+SYNC_BUDGET = int(os.getenv("SYNC_BUDGET", "1000"))
+SYNC_BATCH_SIZE = int(os.getenv("SYNC_BATCH_SIZE", "100"))
+SYNC_INITIAL_LOOKBACK_DAYS = int(os.getenv("SYNC_INITIAL_LOOKBACK_DAYS", "1"))
+
+# TMDB serves at most 14 days of changes per query
+TMDB_CHANGES_MAX_DAYS = 14
+_STATE_NAME = "tmdb_movie_changes"
+# Keeps the IN list well below SQLite's bound parameter limit
+_LOOKUP_CHUNK_SIZE = 500
+
+_scheduler: asyncio.Task | None = None
+
+
+def _utcnow() -> datetime:
+    # Stored naive, like every other DateTime column in SQLite
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+async def _load_state(db: AsyncSession) -> SyncState:
+    state = await db.get(SyncState, _STATE_NAME)
+    if state is None:
+        state = SyncState(name=_STATE_NAME, pending=[])
+        db.add(state)
+    return state
+
+
+async def get_status(db: AsyncSession) -> dict:
+    state = await db.get(SyncState, _STATE_NAME)
+    return {
+        "watermark": state.watermark if state else None,
+        "pending": len(state.pending) if state else 0,
+        "last_run": state.last_run if state else None,
+        "interval_seconds": SYNC_INTERVAL_SECONDS,
+        "budget": SYNC_BUDGET,
+    }
+
+
+async def _changes_page(params: dict, page: int, limiter: asyncio.Semaphore) -> dict:
+    async with limiter:
+        response = await tmdb_get("/movie/changes", params={**params, "page": page})
+
+    if response.status_code != 200:
+        raise upstream_error(response)
+
+    return response.json()
+
+
+async def _changed_ids(since: datetime, until: datetime) -> set[int]:
+    params = {"start_date": since.date().isoformat(), "end_date": until.date().isoformat()}
+    limiter = asyncio.Semaphore(TMDB_IMPORT_CONCURRENCY)
+
+    first = await _changes_page(params, 1, limiter)
+    rest = await asyncio.gather(
+        *(
+            _changes_page(params, page, limiter)
+            for page in range(2, first.get("total_pages", 1) + 1)
+        )
+    )
+
+    return {
+        item["id"]
+        for data in (first, *rest)
+        for item in data.get("results", [])
+        if item.get("id") is not None
+    }
+
+
+async def _stored_ids(tmdb_ids: set[int]) -> set[int]:
+    found: set[int] = set()
+    ordered = sorted(tmdb_ids)
+
+    async with read_session() as db:
+        for i in range(0, len(ordered), _LOOKUP_CHUNK_SIZE):
+            chunk = ordered[i : i + _LOOKUP_CHUNK_SIZE]
+            found.update(
+                await db.scalars(select(Movie.tmdb_id).where(Movie.tmdb_id.in_(chunk)))
+            )
+
+    return found
+
+
+async def _fetch_fresh(tmdb_id: int, limiter: asyncio.Semaphore) -> dict | None:
+    """Fetch past the response cache, then refresh the cached copy.
+
+    Returns None when TMDB no longer has the movie; raises on other failures
+    so the id stays pending.
+    """
+    path = f"/movie/{tmdb_id}"
+    async with limiter:
+        response = await tmdb_get(path)
+
+    if response.status_code == status.HTTP_404_NOT_FOUND:
+        return None
+    if response.status_code != 200:
+        raise upstream_error(response)
+
+    data = response.json()
+    await tmdb_cache.store(tmdb_cache.make_key(path), data, tmdb_cache.ttl_for(path))
+    return data
+
+
+Fetch = Callable[[int, asyncio.Semaphore], Awaitable[dict | None]]
+
+
+async def refresh_batch(
+    tmdb_ids: list[int], fetch: Fetch = _fetch_fresh
+) -> tuple[int, list[int]]:
+    """Refresh one batch of stored movies from their TMDB details.
+
+    `fetch` returns a movie's details, or None when TMDB no longer has it.
+    Returns how many rows changed and the ids to retry.
+    """
+    limiter = asyncio.Semaphore(TMDB_IMPORT_CONCURRENCY)
+    results = await asyncio.gather(
+        *(fetch(tmdb_id, limiter) for tmdb_id in tmdb_ids),
+        return_exceptions=True,
+    )
+
+    retry = [t for t, r in zip(tmdb_ids, results) if isinstance(r, Exception)]
+    fetched = {t: r for t, r in zip(tmdb_ids, results) if isinstance(r, dict)}
+    if not fetched:
+        return 0, retry
+
+    async with write_session() as db:
+        ids = dict(
+            (
+                await db.execute(
+                    select(Movie.tmdb_id, Movie.id).where(Movie.tmdb_id.in_(fetched))
+                )
+            ).all()
+        )
+        rows, movies = [], []
+        for tmdb_id, data in fetched.items():
+            if tmdb_id in ids:
+                movie = to_movie_create(data)
+                movies.append(movie)
+                rows.append({"id": ids[tmdb_id], **movie.dict(exclude={"tmdb_id"})})
+
+        # ORM bulk UPDATE by primary key: one executemany for the batch
+        if rows:
+            await db.execute(update(Movie), rows)
+        await db.commit()
+        # New posters for hydrated stubs; images already cached are skipped
+        await image_cache.queue_prefetch(db, movies)
+
+    response_cache.invalidate("movies", *(row["id"] for row in rows))
+    return len(rows), retry
+
+
+@jobs.handler("tmdb_sync")
+async def _sync_job(job: jobs.JobContext) -> None:
+    started = time.perf_counter()
+    until = _utcnow()
+
+    async with write_session() as db:
+        state = await _load_state(db)
+        since = state.watermark or until - timedelta(days=SYNC_INITIAL_LOOKBACK_DAYS)
+        since = max(since, until - timedelta(days=TMDB_CHANGES_MAX_DAYS))
+        pending = set(state.pending)
+        await db.commit()
+
+    changed = await _changed_ids(since, until)
+    pending |= await _stored_ids(changed)
+
+    # Collected changes are safe in `pending` now, so the watermark can move
+    async with write_session() as db:
+        state = await _load_state(db)
+        state.watermark = until
+        state.pending = sorted(pending)
+        await db.commit()
+
+    todo = sorted(pending)[:SYNC_BUDGET]
+    refreshed, failed = 0, []
+    await job.update(changed=len(changed), pending=len(pending), refreshed=0, failed=0)
+
+    for i in range(0, len(todo), SYNC_BATCH_SIZE):
+        batch = todo[i : i + SYNC_BATCH_SIZE]
+        count, retry = await refresh_batch(batch)
+        refreshed += count
+        failed.extend(retry)
+        pending.difference_update(set(batch) - set(retry))
+
+        async with write_session() as db:
+            state = await _load_state(db)
+            state.pending = sorted(pending)
+            await db.commit()
+
+        await job.update(pending=len(pending), refreshed=refreshed, failed=len(failed))
+
+    summary = {
+        "finished_at": _utcnow().isoformat(),
+        "window": [since.isoformat(), until.isoformat()],
+        "changed": len(changed),
+        "refreshed": refreshed,
+        "failed": len(failed),
+        "pending": len(pending),
+        "seconds": round(time.perf_counter() - started, 3),
+    }
+    async with write_session() as db:
+        state = await _load_state(db)
+        state.last_run = summary
+        await db.commit()
+
+    logger.info("TMDB sync: %s", summary)
+
+
+async def queue_sync(db: AsyncSession) -> Job:
+    return await jobs.enqueue(db, "tmdb_sync", {})
+
+
+async def _schedule() -> None:
+    while True:
+        await asyncio.sleep(SYNC_INTERVAL_SECONDS)
+        try:
+            async with write_session() as db:
+                await queue_sync(db)
+        except Exception:
+            logger.exception("Could not queue the TMDB sync")
+
+
+def start() -> None:
+    """Queue a sync every SYNC_INTERVAL_SECONDS (0 disables the schedule).
+
+    Without a TMDB token every run would fail and spend its retries, so
+    nothing is scheduled.
+    """
+    global _scheduler
+    if SYNC_INTERVAL_SECONDS <= 0:
+        return
+    if not TMDB_ACCESS_TOKEN:
+        logger.warning("TMDB_ACCESS_TOKEN is not set; the TMDB sync is not scheduled")
+        return
+
+    _scheduler = asyncio.create_task(_schedule())
+
+
+async def stop() -> None:
+    global _scheduler
+    if _scheduler is not None:
+        _scheduler.cancel()
+        await asyncio.gather(_scheduler, return_exceptions=True)
+        _scheduler = None
@@ -1,39 +1,116 @@
 from fastapi import HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy import Row, Select, String, insert, or_, select, type_coerce, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 
+from app import response_cache
+from app.bulk import BulkResults, chunked, validate_items
+from app.database import unique_violation
 from app.models.user import User
+from app.pagination import SortKey, paginate
 from app.schemas.user import UserCreate, UserUpdate
+from app.serialization import USER_COLUMNS
+
+USER_SORTS = {
+    "id": SortKey("id", User.id),
+    # Compared as the stored text so cursors match SQLite's datetime strings
+    "newest": SortKey(
+        "newest",
+        User.id,
+        type_coerce(User.created_at, String),
+        lambda user: str(user.created_at),
+        descending=True,
+        columns=(User.created_at,),
+    ),
+}
+
+
+# Unique indexes and the 400 their violation maps to
+_UNIQUE_ERRORS = {
+    "users.username": "Username already exists.",
+    "users.email": "Email already exists.",
+}
+
+
+async def _write_user(db: AsyncSession, stmt) -> User | None:
+    """Run one INSERT/UPDATE ... RETURNING and commit it.
+
+    Duplicates are caught by the unique indexes rather than checked first,
+    which also closes the race between the check and the write.
+    """
+    try:
+        user = await db.scalar(stmt.returning(User))
+        await db.commit()
+    except IntegrityError as exc:
+        await db.rollback()
+        detail = _UNIQUE_ERRORS.get(unique_violation(exc))
+        if detail is None:
+            raise
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=detail)
 
+    return user
 
-def create_user(db: Session, user_data: UserCreate) -> User:
-    # Check for duplicate username
-    if db.query(User).filter(User.username == user_data.username).first():
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Username already exists.",
-        )
 
-    # Check for duplicate email
-    if db.query(User).filter(User.email == user_data.email).first():
+async def create_user(db: AsyncSession, user_data: UserCreate) -> User:
+    return await _write_user(db, insert(User).values(**user_data.dict()))
+
+
+async def bulk_create_users(db: AsyncSession, items: list) -> dict:
+    results = BulkResults(len(items))
+    valid = validate_items(UserCreate, items, results)
+
+    # One query per chunk resolves both unique columns
+    taken_usernames, taken_emails = set(), set()
+    for chunk in chunked(valid):
+        existing = await db.execute(
+            select(User.username, User.email).where(
+                or_(
+                    User.username.in_([user.username for _, user in chunk]),
+                    User.email.in_([user.email for _, user in chunk]),
+                )
+            )
+        )
+        for username, email in existing:
+            taken_usernames.add(username)
+            taken_emails.add(email)
+
+    rows = []
+    for index, user in valid:
+        if user.username in taken_usernames:
+            results.conflict(index, "Username already exists.")
+            continue
+        if user.email in taken_emails:
+            results.conflict(index, "Email already exists.")
+            continue
+        taken_usernames.add(user.username)
+        taken_emails.add(user.email)
+        rows.append((index, user.dict()))
+
+    stmt = insert(User).returning(User.id, sort_by_parameter_order=True)
+    try:
+        for chunk in chunked(rows):
+            ids = (await db.scalars(stmt, [row for _, row in chunk])).all()
+            for (index, _), user_id in zip(chunk, ids):
+                results.created(index, user_id)
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
         raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Email already exists.",
+            status_code=status.HTTP_409_CONFLICT,
+            detail="A concurrent write created conflicting users. Retry the request.",
         )
 
-    new_user = User(**user_data.dict())
-    db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
-
-    return new_user
+    return results.summary()
 
 
-def get_all_users(db: Session) -> list[User]:
-    return db.query(User).all()
+async def get_all_users(
+    db: AsyncSession, sort: str = "id", cursor: str | None = None, limit: int = 100
+) -> tuple[list[Row], str | None]:
+    return await paginate(db, select(*USER_COLUMNS), USER_SORTS[sort], cursor, limit)
 
 
-def get_user_by_id(db: Session, user_id: int) -> User:
-    user = db.query(User).filter(User.id == user_id).first()
+async def get_user_by_id(db: AsyncSession, user_id: int) -> User:
+    user = await db.get(User, user_id)
 
     if not user:
         raise HTTPException(
@@ -44,8 +121,13 @@ def get_user_by_id(db: Session, user_id: int) -> User:
     return user
 
 
-def update_user(db: Session, user_id: int, data: UserUpdate) -> User:
-    user = db.query(User).filter(User.id == user_id).first()
+async def update_user(db: AsyncSession, user_id: int, data: UserUpdate) -> User:
+    update_data = data.dict(exclude_unset=True)
+    if not update_data:
+        return await get_user_by_id(db, user_id)
+
+    stmt = update(User).where(User.id == user_id).values(**update_data)
+    user = await _write_user(db, stmt)
 
     if not user:
         raise HTTPException(
@@ -53,45 +135,13 @@ def update_user(db: Session, user_id: int, data: UserUpdate) -> User:
             detail="User not found.",
         )
 
-    update_data = data.dict(exclude_unset=True)
-
-    # Special case: username must still be unique
-    if "username" in update_data:
-        exists = (
-            db.query(User)
-            .filter(User.username == update_data["username"], User.id != user_id)
-            .first()
-        )
-        if exists:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Username already exists.",
-            )
-
-    # Special case: email must still be unique
-    if "email" in update_data:
-        exists = (
-            db.query(User)
-            .filter(User.email == update_data["email"], User.id != user_id)
-            .first()
-        )
-        if exists:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Email already exists.",
-            )
-
-    for key, value in update_data.items():
-        setattr(user, key, value)
-
-    db.commit()
-    db.refresh(user)
-
+    response_cache.invalidate("users", user_id)
     return user
 
 
-def delete_user(db: Session, user_id: int) -> None:
-    user = db.query(User).filter(User.id == user_id).first()
+async def delete_user(db: AsyncSession, user_id: int) -> None:
+    stmt = update(User).where(User.id == user_id).values(is_active=False)
+    user = await _write_user(db, stmt)
 
     if not user:
         raise HTTPException(
@@ -99,5 +149,8 @@ def delete_user(db: Session, user_id: int) -> None:
             detail="User not found.",
         )
 
-    user.is_active = False
-    db.commit()
+    response_cache.invalidate("users", user_id)
+
+
+def export_users() -> Select:
+    return select(*User.__table__.columns).order_by(User.id)
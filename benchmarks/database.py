@@ -0,0 +1,17 @@
+"""Point the app at a benchmark's SQLite file.
+
+The engine is built from STRCNX when app.database is first imported, so call
+use_database() before importing anything from `app`.
+"""
+
+import os
+
+
+def use_database(path: str, fresh: bool = False) -> None:
+    """Set STRCNX to `path`; with `fresh`, delete the file and its WAL first."""
+    if fresh:
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+
+    os.environ["STRCNX"] = f"sqlite:///{os.path.abspath(path)}"
@@ -0,0 +1,76 @@
+"""Bytes on the wire and CPU per list page, for each encoding and coding.
+
+    python -m benchmarks.seed --rows 10k --db /tmp/bench-10k.sqlite
+    python -m benchmarks.encodings --db /tmp/bench-10k.sqlite
+
+Pages of --pages rows (100 and 1000 by default) are read once, then encoded
+as JSON or MessagePack (FAST_SERIALIZATION=true) and compressed the way
+CompressionMiddleware does it. CPU is process time per page, best of
+--repeat runs; "saved" compares the bytes with uncompressed JSON.
+"""
+
+import argparse
+import asyncio
+import time
+
+from benchmarks.database import use_database
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", required=True, help="a database built by benchmarks.seed")
+    parser.add_argument("--pages", default="100,1000", help="rows per page, comma-separated")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    use_database(args.db)
+
+    from sqlalchemy import select
+
+    from app import serialization
+    from app.compression import _Encoder
+    from app.database import dispose_engines, read_session
+
+    serialization.FAST_SERIALIZATION = True
+    adapter = serialization.MOVIE_LIST
+    encoders = {
+        "json": serialization.encode_rows,
+        "msgpack": serialization.encode_rows_msgpack,
+    }
+
+    async def fetch(rows: int) -> list:
+        async with read_session() as db:
+            stmt = select(*serialization.MOVIE_COLUMNS).limit(rows)
+            page = (await db.execute(stmt)).all()
+        return page
+
+    def measure(page: list, encode, coding: str | None) -> tuple[int, float]:
+        best = float("inf")
+        for _ in range(args.repeat):
+            started = time.process_time()
+            body = encode(page, adapter)
+            if coding:
+                body = _Encoder(coding).compress(body, final=True)
+            best = min(best, time.process_time() - started)
+        return len(body), best * 1000
+
+    async def load() -> dict[int, list]:
+        pages = {int(rows): await fetch(int(rows)) for rows in args.pages.split(",")}
+        await dispose_engines()
+        return pages
+
+    pages = asyncio.run(load())
+
+    print(f"{'rows':>5} {'encoding':<16} {'bytes':>10} {'saved':>7} {'ms CPU':>8}")
+    for rows, page in pages.items():
+        baseline = None
+        for name, encode in encoders.items():
+            for coding in (None, "gzip", "br"):
+                size, ms = measure(page, encode, coding)
+                baseline = baseline or size
+                label = name if coding is None else f"{name}+{coding}"
+                print(f"{rows:>5} {label:<16} {size:>10,} {1 - size / baseline:>7.0%} {ms:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+"""Local stand-in for the TMDB API, for benchmarks and offline runs.
+
+Serves deterministic payloads for the endpoints the app calls (movie
+details, popular, search, genres and the /movie/changes feed) and for the
+image CDN, with configurable latency and error rate:
+
+    python -m benchmarks.fake_tmdb --port 8001 --latency-ms 80 --error-rate 0.02
+    TMDB_BASE_URL=http://127.0.0.1:8001/3 IMAGE_BASE_URL=http://127.0.0.1:8001/t/p python -m app.main
+"""
+
+import argparse
+import asyncio
+import random
+from datetime import date, timedelta
+
+import uvicorn
+from fastapi import APIRouter, FastAPI
+from fastapi.responses import JSONResponse, Response
+
+GENRES = [
+    {"id": 28, "name": "Action"},
+    {"id": 12, "name": "Adventure"},
+    {"id": 16, "name": "Animation"},
+    {"id": 35, "name": "Comedy"},
+    {"id": 80, "name": "Crime"},
+    {"id": 99, "name": "Documentary"},
+    {"id": 18, "name": "Drama"},
+    {"id": 10751, "name": "Family"},
+    {"id": 14, "name": "Fantasy"},
+    {"id": 36, "name": "History"},
+    {"id": 27, "name": "Horror"},
+    {"id": 10402, "name": "Music"},
+    {"id": 9648, "name": "Mystery"},
+    {"id": 10749, "name": "Romance"},
+    {"id": 878, "name": "Science Fiction"},
+    {"id": 10770, "name": "TV Movie"},
+    {"id": 53, "name": "Thriller"},
+    {"id": 10752, "name": "War"},
+    {"id": 37, "name": "Western"},
+]
+
+WORDS = (
+    "night star river shadow king city last dark love war storm ghost road "
+    "summer secret blood iron silent golden lost wild glass winter empire"
+).split()
+
+PAGE_SIZE = 20
+TOTAL_PAGES = 500
+
+
+class Settings:
+    latency_ms = 0.0
+    jitter_ms = 0.0
+    error_rate = 0.0
+    error_status = 503
+    # /movie/changes: ids changed per day, drawn from 1..changes_max_id
+    changes_per_day = 1000
+    changes_max_id = 1_000_000
+
+
+settings = Settings()
+router = APIRouter(prefix="/3")
+image_router = APIRouter(prefix="/t/p")
+
+
+def fake_movie(tmdb_id: int, detail: bool = False) -> dict:
+    """Same id, same payload, so runs are reproducible."""
+    rng = random.Random(tmdb_id)
+    genres = rng.sample(GENRES, rng.randint(1, 3))
+    title = " ".join(rng.choice(WORDS) for _ in range(rng.randint(1, 4))).title()
+
+    movie = {
+        "id": tmdb_id,
+        "title": title,
+        "overview": " ".join(rng.choice(WORDS) for _ in range(30)),
+        "release_date": f"{rng.randint(1950, 2025)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+        "vote_average": round(rng.uniform(1, 10), 1),
+        "vote_count": rng.randint(0, 30000),
+        "popularity": round(rng.uniform(0, 500), 3),
+        "poster_path": f"/poster{tmdb_id}.jpg",
+        "backdrop_path": f"/backdrop{tmdb_id}.jpg",
+    }
+    if detail:
+        movie["genres"] = genres
+    else:
+        movie["genre_ids"] = [g["id"] for g in genres]
+
+    return movie
+
+
+def page_of(page: int, first_id: int) -> dict:
+    start = first_id + (page - 1) * PAGE_SIZE
+    return {
+        "page": page,
+        "results": [fake_movie(i) for i in range(start, start + PAGE_SIZE)],
+        "total_pages": TOTAL_PAGES,
+        "total_results": TOTAL_PAGES * PAGE_SIZE,
+    }
+
+
+async def simulate() -> JSONResponse | None:
+    delay = settings.latency_ms + random.uniform(0, settings.jitter_ms)
+    if delay:
+        await asyncio.sleep(delay / 1000)
+
+    if random.random() < settings.error_rate:
+        return JSONResponse(
+            status_code=settings.error_status,
+            content={"status_message": "Simulated failure."},
+        )
+
+    return None
+
+
+@router.get("/genre/movie/list")
+async def genre_list():
+    return await simulate() or {"genres": GENRES}
+
+
+@router.get("/movie/changes")
+async def changes(
+    start_date: date | None = None, end_date: date | None = None, page: int = 1
+):
+    end_date = end_date or date.today()
+    start_date = start_date or end_date - timedelta(days=1)
+
+    # Same day, same ids: the feed is reproducible like the detail pages
+    ids: set[int] = set()
+    day = start_date
+    while day <= end_date:
+        rng = random.Random(day.toordinal())
+        ids.update(
+            rng.randint(1, settings.changes_max_id) for _ in range(settings.changes_per_day)
+        )
+        day += timedelta(days=1)
+
+    ordered = sorted(ids)
+    per_page = 100
+    total_pages = max(1, -(-len(ordered) // per_page))
+    chunk = ordered[(page - 1) * per_page : page * per_page]
+    return await simulate() or {
+        "results": [{"id": i, "adult": False} for i in chunk],
+        "page": page,
+        "total_pages": total_pages,
+        "total_results": len(ordered),
+    }
+
+
+@router.get("/movie/popular")
+async def popular(page: int = 1):
+    return await simulate() or page_of(page, first_id=1)
+
+
+@router.get("/movie/{tmdb_id}")
+async def movie_detail(tmdb_id: int):
+    return await simulate() or fake_movie(tmdb_id, detail=True)
+
+
+@router.get("/search/movie")
+async def search(query: str, page: int = 1):
+    # Stable per query, and disjoint from the popular id range
+    first_id = 1_000_000 + random.Random(query.lower()).randint(0, 100_000) * PAGE_SIZE
+    return await simulate() or page_of(page, first_id)
+
+
+@image_router.get("/{size}/{name}")
+async def image(size: str, name: str):
+    # Bigger sizes, bigger files; the bytes only need to be stable
+    width = int(size[1:]) if size[1:].isdigit() else 1000
+    body = b"\xff\xd8\xff\xe0" + random.Random(f"{size}/{name}").randbytes(width * 40)
+    return await simulate() or Response(body, media_type="image/jpeg")
+
+
+app = FastAPI(title="Fake TMDB")
+app.include_router(router)
+app.include_router(image_router)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--error-status", type=int, default=503)
+    parser.add_argument("--changes-per-day", type=int, default=1000)
+    parser.add_argument("--changes-max-id", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    settings.latency_ms = args.latency_ms
+    settings.jitter_ms = args.jitter_ms
+    settings.error_rate = args.error_rate
+    settings.error_status = args.error_status
+    settings.changes_per_day = args.changes_per_day
+    settings.changes_max_id = args.changes_max_id
+
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
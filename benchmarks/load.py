@@ -0,0 +1,252 @@
+"""Closed-loop load driver: throughput and p50/p95/p99 latency per route.
+
+    python -m benchmarks.load --base-url http://127.0.0.1:8000 --duration 10
+    python -m benchmarks.load --save benchmarks/baselines/10k.json
+    python -m benchmarks.load --compare benchmarks/baselines/10k.json
+
+Each scenario runs on its own for `--duration` seconds with `--concurrency`
+workers. With `--compare`, a route whose p95 grew or whose throughput fell
+by more than `--tolerance` is reported and the exit status is 1.
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import platform
+import random
+import statistics
+import sys
+import time
+from dataclasses import dataclass
+from typing import Callable
+
+import httpx
+
+from benchmarks.fake_tmdb import WORDS
+
+_counter = itertools.count()
+
+
+@dataclass
+class Scenario:
+    """One route under load. `request` builds (method, url, json body)."""
+
+    name: str
+    request: Callable[["Dataset"], tuple[str, str, dict | None]]
+    tmdb: bool = False
+
+
+@dataclass
+class Dataset:
+    max_movie_id: int
+    max_user_id: int
+
+    def movie_id(self) -> int:
+        return random.randint(1, self.max_movie_id)
+
+    def user_id(self) -> int:
+        return random.randint(1, self.max_user_id)
+
+
+def _unique() -> str:
+    return f"{time.time_ns()}{next(_counter)}"
+
+
+def _create_user(_: Dataset):
+    suffix = _unique()
+    return "POST", "/api/users/", {"username": f"load{suffix}", "email": f"load{suffix}@example.com"}
+
+
+def _create_movie(_: Dataset):
+    return "POST", "/api/movies/", {"title": f"Load {_unique()}", "vote_average": 5.0}
+
+
+# One entry per route in app/routers; deletes are left out so runs can repeat
+SCENARIOS = [
+    Scenario("GET /api/users/", lambda d: ("GET", "/api/users/?limit=100", None)),
+    Scenario("GET /api/users/{id}", lambda d: ("GET", f"/api/users/{d.user_id()}", None)),
+    Scenario("POST /api/users/", _create_user),
+    Scenario(
+        "PUT /api/users/{id}",
+        lambda d: ("PUT", f"/api/users/{d.user_id()}", {"full_name": f"Load {_unique()}"}),
+    ),
+    Scenario("GET /api/movies/", lambda d: ("GET", "/api/movies/?limit=20", None)),
+    Scenario("GET /api/movies/?sort=rating", lambda d: ("GET", "/api/movies/?limit=20&sort=rating", None)),
+    Scenario(
+        "GET /api/movies/?title=",
+        lambda d: ("GET", f"/api/movies/?limit=20&title={random.choice(WORDS)}", None),
+    ),
+    Scenario(
+        "GET /api/movies/?q=",
+        lambda d: ("GET", f"/api/movies/?limit=20&q={random.choice(WORDS)}", None),
+    ),
+    Scenario(
+        "GET /api/movies/?genre=",
+        lambda d: ("GET", "/api/movies/?limit=20&genre=878&genre=12&genre_match=all", None),
+    ),
+    Scenario("GET /api/movies/genres", lambda d: ("GET", "/api/movies/genres", None)),
+    Scenario("GET /api/movies/{id}", lambda d: ("GET", f"/api/movies/{d.movie_id()}", None)),
+    Scenario("POST /api/movies/", _create_movie),
+    Scenario(
+        "PUT /api/movies/{id}",
+        lambda d: ("PUT", f"/api/movies/{d.movie_id()}", {"vote_count": random.randint(0, 9999)}),
+    ),
+    Scenario("GET /api/tmdb/cache", lambda d: ("GET", "/api/tmdb/cache", None)),
+    Scenario(
+        "POST /api/movies/import/{tmdb_id}",
+        lambda d: ("POST", f"/api/movies/import/{random.randint(1, 2 * d.max_movie_id)}", None),
+        tmdb=True,
+    ),
+    Scenario(
+        "POST /api/movies/import/popular",
+        lambda d: ("POST", f"/api/movies/import/popular?page={random.randint(1, 500)}", None),
+        tmdb=True,
+    ),
+    Scenario(
+        "GET /api/movies/search/{query}",
+        lambda d: ("GET", f"/api/movies/search/{random.choice(WORDS)}", None),
+        tmdb=True,
+    ),
+]
+
+
+async def discover(client: httpx.AsyncClient) -> Dataset:
+    # Newest-first ties on created_at break by id desc, so row 0 is the max id
+    async def max_id(path: str) -> int:
+        response = await client.get(path, params={"limit": 1, "sort": "newest"})
+        response.raise_for_status()
+        rows = response.json()
+        return rows[0]["id"] if rows else 1
+
+    return Dataset(await max_id("/api/movies/"), await max_id("/api/users/"))
+
+
+def summarize(latencies: list[float], errors: int, elapsed: float) -> dict:
+    cuts = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else latencies * 99
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(cuts[49] * 1000, 2),
+        "p95_ms": round(cuts[94] * 1000, 2),
+        "p99_ms": round(cuts[98] * 1000, 2),
+    }
+
+
+async def run_scenario(
+    client: httpx.AsyncClient,
+    scenario: Scenario,
+    dataset: Dataset,
+    duration: float,
+    concurrency: int,
+) -> dict:
+    latencies: list[float] = []
+    errors = 0
+    deadline = time.perf_counter() + duration
+
+    async def worker() -> None:
+        nonlocal errors
+        while time.perf_counter() < deadline:
+            method, url, body = scenario.request(dataset)
+            started = time.perf_counter()
+            try:
+                response = await client.request(method, url, json=body)
+                if response.status_code >= 400:
+                    errors += 1
+            except httpx.HTTPError:
+                errors += 1
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+    return summarize(latencies, errors, time.perf_counter() - started)
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    regressions = []
+    for name, current in results.items():
+        base = baseline["routes"].get(name)
+        if base is None or not base["requests"]:
+            continue
+        if current["p95_ms"] > base["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {base['p95_ms']}ms -> {current['p95_ms']}ms")
+        if current["rps"] < base["rps"] * (1 - tolerance):
+            regressions.append(f"{name}: throughput {base['rps']} -> {current['rps']} req/s")
+    return regressions
+
+
+def print_table(results: dict) -> None:
+    print(f"{'route':<36} {'reqs':>7} {'err':>5} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for name, r in results.items():
+        print(
+            f"{name:<36} {r['requests']:>7} {r['errors']:>5} {r['rps']:>8} "
+            f"{r['p50_ms']:>8} {r['p95_ms']:>8} {r['p99_ms']:>8}"
+        )
+
+
+async def run(args: argparse.Namespace) -> dict:
+    limits = httpx.Limits(max_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=30) as client:
+        dataset = await discover(client)
+        print(f"Dataset: {dataset.max_movie_id} movies, {dataset.max_user_id} users")
+
+        results = {}
+        for scenario in SCENARIOS:
+            if args.route and not any(r in scenario.name for r in args.route):
+                continue
+            if scenario.tmdb and args.skip_tmdb:
+                continue
+            results[scenario.name] = await run_scenario(
+                client, scenario, dataset, args.duration, args.concurrency
+            )
+            print(f"  {scenario.name}: {results[scenario.name]['rps']} req/s")
+
+    return {
+        "meta": {
+            "base_url": args.base_url,
+            "duration": args.duration,
+            "concurrency": args.concurrency,
+            "movies": dataset.max_movie_id,
+            "users": dataset.max_user_id,
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+        },
+        "routes": results,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per route")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--route", action="append", help="only routes containing this text")
+    parser.add_argument("--skip-tmdb", action="store_true", help="skip routes that call TMDB")
+    parser.add_argument("--save", help="write the results to this JSON file")
+    parser.add_argument("--compare", help="baseline JSON file to check against")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    print()
+    print_table(report["routes"])
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(report, f, indent=2)
+            f.write("\n")
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(report["routes"], json.load(f), args.tolerance)
+        if regressions:
+            print("\nRegressions:")
+            print("\n".join(f"  {line}" for line in regressions))
+            sys.exit(1)
+        print("\nNo regressions against", args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""Build a benchmark database with N movies, N/10 users and the TMDB genres.
+
+    python -m benchmarks.seed --rows 100k --db /tmp/bench-100k.sqlite
+    STRCNX=sqlite:////tmp/bench-100k.sqlite python -m app.main
+
+Movies are the fake TMDB payloads for ids 1..N, so importing one of those ids
+against benchmarks.fake_tmdb finds the existing row.
+"""
+
+import argparse
+import os
+import time
+
+from benchmarks.database import use_database
+from benchmarks.fake_tmdb import GENRES, fake_movie
+
+SIZES = {"10k": 10_000, "100k": 100_000, "1m": 1_000_000}
+CHUNK_SIZE = 10_000
+
+
+def parse_rows(value: str) -> int:
+    if value.lower() in SIZES:
+        return SIZES[value.lower()]
+    return int(value)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=parse_rows, default="10k", help="10k, 100k, 1m or a number")
+    parser.add_argument("--users", type=int, help="defaults to rows / 10")
+    parser.add_argument("--db", required=True, help="path of the SQLite file to create")
+    parser.add_argument("--force", action="store_true", help="replace an existing file")
+    args = parser.parse_args()
+
+    if os.path.exists(args.db) and not args.force:
+        parser.error(f"{args.db} already exists; pass --force to replace it")
+
+    use_database(args.db, fresh=True)
+
+    from sqlalchemy import insert
+
+    from app.database import create_db_and_tables, engine
+    from app.migrations import run_migrations
+    from app.models.genre import Genre
+    from app.models.movie import Movie
+    from app.models.user import User
+    from app.services.tmdb import to_movie_create
+
+    create_db_and_tables()
+    run_migrations()
+
+    users = args.users if args.users is not None else args.rows // 10
+    started = time.perf_counter()
+
+    with engine.begin() as conn:
+        conn.execute(insert(Genre), GENRES)
+
+        for first in range(1, args.rows + 1, CHUNK_SIZE):
+            last = min(first + CHUNK_SIZE, args.rows + 1)
+            conn.execute(
+                insert(Movie),
+                [to_movie_create(fake_movie(i)).dict() for i in range(first, last)],
+            )
+            print(f"movies: {last - 1}/{args.rows}", end="\r", flush=True)
+        print()
+
+        for first in range(1, users + 1, CHUNK_SIZE):
+            last = min(first + CHUNK_SIZE, users + 1)
+            conn.execute(
+                insert(User),
+                [
+                    {
+                        "username": f"user{i}",
+                        "email": f"user{i}@example.com",
+                        "full_name": f"Benchmark User {i}",
+                    }
+                    for i in range(first, last)
+                ],
+            )
+
+        # Planner statistics, as a long-lived database would have
+        conn.exec_driver_sql("ANALYZE")
+
+    elapsed = time.perf_counter() - started
+    print(f"Seeded {args.rows} movies and {users} users in {elapsed:.1f}s -> {args.db}")
+
+
+if __name__ == "__main__":
+    main()
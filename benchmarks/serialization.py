@@ -0,0 +1,86 @@
+"""CPU cost of turning stored movies into a JSON list body, per 1k rows.
+
+    python -m benchmarks.seed --rows 10k --db /tmp/bench-10k.sqlite
+    python -m benchmarks.serialization --db /tmp/bench-10k.sqlite
+
+Each path includes the SELECT, so ORM hydration is counted too:
+
+- orm+json:       entities validated by the response model, stdlib json
+                  (the list routes before app/serialization.py)
+- orm+orjson:     the same with ORJSONResponse, the new default class
+- rows+adapter:   column rows through the precompiled TypeAdapter
+                  (FAST_SERIALIZATION=false)
+- rows+orjson:    column rows straight to orjson (FAST_SERIALIZATION=true)
+
+Times are process CPU time, best of --repeat runs.
+"""
+
+import argparse
+import asyncio
+import json
+import time
+
+from benchmarks.database import use_database
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", required=True, help="a database built by benchmarks.seed")
+    parser.add_argument("--rows", type=int, default=1000, help="rows per response")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    use_database(args.db)
+
+    import orjson
+    from sqlalchemy import select
+
+    from app import serialization
+    from app.database import dispose_engines, read_session
+    from app.models.movie import Movie
+
+    adapter = serialization.MOVIE_LIST
+
+    async def orm_body(db, encode) -> bytes:
+        movies = (await db.scalars(select(Movie).limit(args.rows))).all()
+        db.expunge_all()
+        validated = adapter.validate_python(movies, from_attributes=True)
+        return encode(adapter.dump_python(validated, mode="json"))
+
+    async def rows_body(db, fast: bool) -> bytes:
+        stmt = select(*serialization.MOVIE_COLUMNS).limit(args.rows)
+        rows = (await db.execute(stmt)).all()
+        serialization.FAST_SERIALIZATION = fast
+        return serialization.encode_rows(rows, adapter)
+
+    paths = {
+        "orm+json": lambda db: orm_body(db, lambda content: json.dumps(content).encode()),
+        "orm+orjson": lambda db: orm_body(db, orjson.dumps),
+        "rows+adapter": lambda db: rows_body(db, fast=False),
+        "rows+orjson": lambda db: rows_body(db, fast=True),
+    }
+
+    async def run() -> dict[str, float]:
+        results = {}
+        async with read_session() as db:
+            for name, body in paths.items():
+                await body(db)  # warm up statement caches
+                best = float("inf")
+                for _ in range(args.repeat):
+                    started = time.process_time()
+                    await body(db)
+                    best = min(best, time.process_time() - started)
+                results[name] = best * 1000 * 1000 / args.rows
+        await dispose_engines()
+        return results
+
+    results = asyncio.run(run())
+    baseline = results["orm+json"]
+
+    print(f"{'path':<14} {'ms CPU / 1k rows':>17} {'saved':>7}")
+    for name, ms in results.items():
+        print(f"{name:<14} {ms:>17.2f} {1 - ms / baseline:>7.0%}")
+
+
+if __name__ == "__main__":
+    main()
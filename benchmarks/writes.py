@@ -0,0 +1,83 @@
+"""Writes per second through the user and movie services.
+
+    python -m benchmarks.writes --db /tmp/bench-writes.sqlite --count 2000
+
+Against a fresh database, runs --count of each write one at a time, every
+one in its own session and transaction like an API request: creates,
+updates, creates rejected as duplicates (the 400 path) and deletes.
+"""
+
+import argparse
+import asyncio
+import time
+
+from benchmarks.database import use_database
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", required=True, help="SQLite file to create (replaced if it exists)")
+    parser.add_argument("--count", type=int, default=2000)
+    args = parser.parse_args()
+
+    use_database(args.db, fresh=True)
+
+    from fastapi import HTTPException
+
+    from app.database import create_db_and_tables, dispose_engines, write_session
+    from app.migrations import run_migrations
+    from app.schemas.movie import MovieCreate, MovieUpdate
+    from app.schemas.user import UserCreate, UserUpdate
+    from app.services import movie_service, user_service
+
+    create_db_and_tables()
+    run_migrations()
+
+    def user(i: int) -> UserCreate:
+        return UserCreate(username=f"user{i}", email=f"user{i}@example.com")
+
+    def movie(i: int) -> MovieCreate:
+        return MovieCreate(tmdb_id=i, title=f"Movie {i}", overview="A benchmark movie.")
+
+    async def rejected(write) -> None:
+        try:
+            await write
+        except HTTPException:
+            return
+        raise AssertionError("expected a duplicate to be rejected")
+
+    writes = {
+        "create_user": lambda db, i: user_service.create_user(db, user(i)),
+        "update_user": lambda db, i: user_service.update_user(
+            db, i, UserUpdate(full_name=f"User {i}")
+        ),
+        "duplicate_user": lambda db, i: rejected(user_service.create_user(db, user(i))),
+        "delete_user": lambda db, i: user_service.delete_user(db, i),
+        "create_movie": lambda db, i: movie_service.create_movie(db, movie(i)),
+        "update_movie": lambda db, i: movie_service.update_movie(
+            db, i, MovieUpdate(vote_average=i % 10)
+        ),
+        "duplicate_movie": lambda db, i: rejected(movie_service.create_movie(db, movie(i))),
+        "delete_movie": lambda db, i: movie_service.delete_movie(db, i),
+    }
+
+    async def run() -> dict[str, float]:
+        results = {}
+        for name, write in writes.items():
+            started = time.perf_counter()
+            for i in range(1, args.count + 1):
+                async with write_session() as db:
+                    await write(db, i)
+            results[name] = args.count / (time.perf_counter() - started)
+        await dispose_engines()
+        return results
+
+    results = asyncio.run(run())
+
+    print(f"{'write':<16} {'writes/s':>9}")
+    for name, rate in results.items():
+        print(f"{name:<16} {rate:>9,.0f}")
+
+
+if __name__ == "__main__":
+    main()
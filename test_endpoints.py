@@ -1,12 +1,77 @@
+from contextlib import contextmanager
+from datetime import date, timedelta
+from fastapi import HTTPException
 from fastapi.testclient import TestClient
+from sqlalchemy import select
 from main import app
+from app import DB_BUSY_TIMEOUT_MS
+from app.database import engine, read_session
+from app.models.job import Job
+from app import jobs
+from app.services import image_cache, tmdb_cache, tmdb_dump, tmdb_governor, tmdb_service, tmdb_sync
+from benchmarks import fake_tmdb, load
+import asyncio
+import gzip
+import inspect
+import httpx
+import json
+import msgpack
+import os
 import random
+import tempfile
+import time
 
 client = TestClient(app)
 
 def random_suffix():
     return str(random.randint(1000, 9999))
 
+class CountingTransport(httpx.AsyncBaseTransport):
+    # The TMDB stand-in, counting requests; the first `failures` get `status`
+    def __init__(self, failures=0, status=503, headers=None, on_request=None):
+        self.inner = httpx.ASGITransport(app=fake_tmdb.app)
+        self.failures = failures
+        self.status = status
+        self.headers = headers or {}
+        self.on_request = on_request
+        self.requests = 0
+
+    async def handle_async_request(self, request):
+        self.requests += 1
+        if self.on_request:
+            self.on_request(request)
+        if self.requests <= self.failures:
+            return httpx.Response(self.status, headers=self.headers, json={})
+        return await self.inner.handle_async_request(request)
+
+@contextmanager
+def fake_tmdb_api(transport=None):
+    # TMDB calls go to benchmarks.fake_tmdb in process, not over the network
+    stub = httpx.AsyncClient(
+        base_url="http://fake/3",
+        transport=transport or httpx.ASGITransport(app=fake_tmdb.app),
+    )
+    token = tmdb_service.TMDB_ACCESS_TOKEN
+    tmdb_service.TMDB_ACCESS_TOKEN = token or "test-token"
+    tmdb_service.set_client(stub)
+    try:
+        yield stub
+    finally:
+        tmdb_service.set_client(None)
+        tmdb_service.TMDB_ACCESS_TOKEN = token
+
+@contextmanager
+def fake_image_cdn():
+    # Poster downloads go to benchmarks.fake_tmdb's image routes in process
+    stub = httpx.AsyncClient(
+        base_url="http://fake/t/p", transport=httpx.ASGITransport(app=fake_tmdb.app)
+    )
+    image_cache.set_client(stub)
+    try:
+        yield stub
+    finally:
+        image_cache.set_client(None)
+
 def test_create_user():
     suffix = random_suffix()
     response = client.post("/api/users/", json={
@@ -20,6 +85,17 @@ def test_create_user():
     assert "id" in data
     return data["id"]
 
+def test_bulk_create_users():
+    suffix = random_suffix()
+    response = client.post("/api/users/bulk", json=[
+        {"username": f"bulk{suffix}a", "email": f"bulk{suffix}a@example.com"},
+        {"username": f"bulk{suffix}a", "email": f"bulk{suffix}b@example.com"},
+        {"username": f"bulk{suffix}c", "email": "not-an-email"},
+    ])
+    assert response.status_code == 200
+    data = response.json()
+    assert [item["status"] for item in data["items"]] == ["created", "conflict", "invalid"]
+
 def test_list_users():
     # Create one user first
     test_create_user()
@@ -29,6 +105,24 @@ def test_list_users():
     assert isinstance(data, list)
     assert len(data) >= 1
 
+def test_list_users_cursor_pagination():
+    test_create_user()
+    test_create_user()
+    first = client.get("/api/users/?limit=1&sort=newest")
+    assert first.status_code == 200
+    cursor = first.headers.get("x-next-cursor")
+    assert cursor
+    second = client.get(f"/api/users/?limit=1&sort=newest&cursor={cursor}")
+    assert second.status_code == 200
+    assert second.json()[0]["id"] < first.json()[0]["id"]
+
+def test_export_users_csv():
+    test_create_user()
+    response = client.get("/api/users/export?format=csv")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    assert response.text.splitlines()[0].startswith("id,username,email")
+
 def test_get_user_by_id():
     user_id = test_create_user()
     response = client.get(f"/api/users/{user_id}")
@@ -52,6 +146,58 @@ def test_delete_user():
     response = client.delete(f"/api/users/{user_id}")
     assert response.status_code == 204
 
+def test_duplicate_writes_rejected():
+    suffix = random_suffix()
+    user = {"username": f"dupe{suffix}", "email": f"dupe{suffix}@example.com"}
+    assert client.post("/api/users/", json=user).status_code == 201
+
+    response = client.post("/api/users/", json={**user, "email": f"other{suffix}@example.com"})
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Username already exists."
+
+    response = client.post("/api/users/", json={**user, "username": f"other{suffix}"})
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Email already exists."
+
+    tmdb_id = 700000 + int(suffix)
+    first = client.post("/api/movies/", json={"title": "First", "tmdb_id": tmdb_id})
+    second = client.post("/api/movies/", json={"title": "Second"})
+    assert first.status_code == second.status_code == 201
+
+    response = client.put(f"/api/movies/{second.json()['id']}", json={"tmdb_id": tmdb_id})
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Movie with this TMDB ID already exists."
+    assert client.get(f"/api/movies/{second.json()['id']}").json()["title"] == "Second"
+
+def test_concurrent_writes_succeed():
+    suffix = random_suffix()
+    async def create_all():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+            responses = await asyncio.gather(*(
+                http.post("/api/users/", json={
+                    "username": f"conc{suffix}x{i}",
+                    "email": f"conc{suffix}x{i}@example.com",
+                })
+                for i in range(64)
+            ))
+        return [r.status_code for r in responses]
+    # Writers queue on the lock instead of failing with "database is locked"
+    assert asyncio.run(create_all()) == [201] * 64
+    with engine.connect() as conn:
+        assert conn.exec_driver_sql("PRAGMA journal_mode").scalar() == "wal"
+        assert conn.exec_driver_sql("PRAGMA busy_timeout").scalar() == DB_BUSY_TIMEOUT_MS
+
+def test_routes_are_async():
+    # Handlers run on the event loop, none in the threadpool
+    api_routes = [route for route in app.routes if route.path.startswith("/api/")]
+    assert api_routes
+    assert all(inspect.iscoroutinefunction(route.endpoint) for route in api_routes)
+    assert client.get("/api/users/999999999").status_code == 404
+    assert client.get("/api/movies/999999999").status_code == 404
+    assert client.put("/api/movies/999999999", json={"title": "Nope"}).status_code == 404
+    assert client.delete("/api/users/999999999").status_code == 404
+
 def test_create_movie():
     suffix = random_suffix()
     response = client.post("/api/movies/", json={
@@ -66,6 +212,20 @@ def test_create_movie():
     assert data["title"] == f"Test Movie {suffix}"
     return data["id"]
 
+def test_bulk_create_movies():
+    suffix = random_suffix()
+    tmdb_id = 500000 + int(suffix)
+    response = client.post("/api/movies/bulk", json=[
+        {"title": f"Bulk Movie {suffix}", "tmdb_id": tmdb_id},
+        {"title": f"Bulk Movie {suffix} again", "tmdb_id": tmdb_id},
+        {"overview": "missing title"},
+    ])
+    assert response.status_code == 200
+    data = response.json()
+    assert data["created"] == 1
+    assert data["conflicts"] == 1
+    assert data["invalid"] == 1
+
 def test_list_movies():
     # Create one movie first
     test_create_movie()
@@ -74,6 +234,86 @@ def test_list_movies():
     data = response.json()
     assert isinstance(data, list)
 
+def test_list_movies_rows_match_detail():
+    movie_id = test_create_movie()
+    response = client.get("/api/movies/?sort=newest&limit=1000")
+    assert response.status_code == 200
+    listed = next(m for m in response.json() if m["id"] == movie_id)
+    assert listed == client.get(f"/api/movies/{movie_id}").json()
+
+def test_list_movies_cursor_pagination():
+    test_create_movie()
+    test_create_movie()
+    first = client.get("/api/movies/?limit=1&sort=rating")
+    assert first.status_code == 200
+    cursor = first.headers.get("x-next-cursor")
+    assert cursor
+    second = client.get(f"/api/movies/?limit=1&sort=rating&cursor={cursor}")
+    assert second.status_code == 200
+    assert second.json()[0]["id"] != first.json()[0]["id"]
+
+def test_list_movies_invalid_cursor():
+    response = client.get("/api/movies/?cursor=not-a-cursor")
+    assert response.status_code == 400
+
+def test_list_movies_full_text_search():
+    suffix = random_suffix()
+    client.post("/api/movies/", json={
+        "title": f"Zyxwv Odyssey {suffix}",
+        "overview": "A searchable test movie",
+    })
+    response = client.get(f"/api/movies/?q=zyxwv {suffix}")
+    assert response.status_code == 200
+    data = response.json()
+    assert any(m["title"] == f"Zyxwv Odyssey {suffix}" for m in data)
+
+def test_movie_sparse_fieldsets():
+    movie_id = test_create_movie()
+    response = client.get("/api/movies/?limit=5&sort=rating&fields=id,title")
+    assert response.status_code == 200
+    assert all(set(m) == {"id", "title"} for m in response.json())
+    response = client.get(f"/api/movies/{movie_id}?fields=title,poster_path")
+    assert response.status_code == 200
+    assert set(response.json()) == {"title", "poster_path"}
+    response = client.get("/api/movies/?fields=id,nope")
+    assert response.status_code == 400
+
+def test_list_movies_compact_encodings():
+    test_create_movie()
+    response = client.get("/api/movies/?limit=50", headers={"Accept": "application/msgpack"})
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/msgpack"
+    assert msgpack.unpackb(response.content) == client.get("/api/movies/?limit=50").json()
+    response = client.get("/api/movies/?limit=50", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["vary"]
+
+def test_list_movies_by_genre():
+    suffix = random_suffix()
+    response = client.post("/api/movies/", json={
+        "title": f"Genre Movie {suffix}",
+        "genre_ids": "[99001, 99002]",
+    })
+    movie_id = response.json()["id"]
+    response = client.get("/api/movies/?genre=99001&genre=99002&genre_match=all&limit=100")
+    assert response.status_code == 200
+    assert movie_id in [m["id"] for m in response.json()]
+    response = client.get("/api/movies/?genre=99003")
+    assert movie_id not in [m["id"] for m in response.json()]
+
+def test_list_genres():
+    response = client.get("/api/movies/genres")
+    assert response.status_code == 200
+    assert isinstance(response.json(), list)
+
+def test_export_movies_ndjson():
+    test_create_movie()
+    response = client.get("/api/movies/export")
+    assert response.status_code == 200
+    lines = response.text.splitlines()
+    assert len(lines) >= 1
+    assert "title" in json.loads(lines[0])
+
 def test_get_movie_by_id():
     movie_id = test_create_movie()
     response = client.get(f"/api/movies/{movie_id}")
@@ -81,6 +321,50 @@ def test_get_movie_by_id():
     data = response.json()
     assert data["id"] == movie_id
 
+def test_get_movie_poster():
+    response = client.post("/api/movies/", json={
+        "title": f"Poster Movie {random_suffix()}",
+        "poster_path": "/poster550.jpg",
+    })
+    movie_id = response.json()["id"]
+    with fake_image_cdn():
+        response = client.get(f"/api/movies/{movie_id}/poster?size=w185")
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "image/jpeg"
+        etag = response.headers["etag"]
+        response = client.get(f"/api/movies/{movie_id}/poster?size=w185",
+                              headers={"If-None-Match": etag})
+        assert response.status_code == 304
+        response = client.get(f"/api/movies/{movie_id}/poster?size=w185",
+                              headers={"Range": "bytes=0-3"})
+        assert response.status_code == 206
+        assert response.content == b"\xff\xd8\xff\xe0"
+        response = client.get(f"/api/movies/{movie_id}/poster?size=w9999")
+        assert response.status_code == 400
+
+def test_server_timing_header():
+    response = client.get("/api/movies/?limit=5")
+    assert response.status_code == 200
+    assert response.headers["server-timing"].startswith("db;dur=")
+
+def test_get_movie_conditional_request():
+    movie_id = test_create_movie()
+    first = client.get(f"/api/movies/{movie_id}")
+    etag = first.headers["etag"]
+    response = client.get(f"/api/movies/{movie_id}", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    client.put(f"/api/movies/{movie_id}", json={"title": "Revalidated Movie"})
+    response = client.get(f"/api/movies/{movie_id}", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.json()["title"] == "Revalidated Movie"
+
+def test_cached_detail_with_padded_id_is_invalidated():
+    movie_id = test_create_movie()
+    padded = f"/api/movies/00{movie_id}"
+    assert client.get(padded).status_code == 200
+    client.put(f"/api/movies/{movie_id}", json={"title": "Padded Update"})
+    assert client.get(padded).json()["title"] == "Padded Update"
+
 def test_update_movie():
     movie_id = test_create_movie()
     response = client.put(f"/api/movies/{movie_id}", json={
@@ -96,53 +380,514 @@ def test_delete_movie():
     assert response.status_code == 204
 
 def test_import_movie_by_tmdb_id():
-    # Assuming TMDB ID 550 is Fight Club
-    response = client.post("/api/movies/import/550")
+    with fake_tmdb_api():
+        response = client.post("/api/movies/import/550")
     assert response.status_code == 201
     data = response.json()
-    assert "title" in data
+    assert data["title"] == fake_tmdb.fake_movie(550)["title"]
+
+def test_tmdb_client_is_shared():
+    with TestClient(app):
+        shared = tmdb_service.get_client()
+        assert tmdb_service.get_client() is shared
+        assert not shared.is_closed
+    assert shared.is_closed
+
+def test_import_movie_from_tmdb_stand_in():
+    tmdb_id = 2000000 + int(random_suffix())
+    with fake_tmdb_api():
+        response = client.post(f"/api/movies/import/{tmdb_id}")
+    assert response.status_code == 201
+    assert response.json()["tmdb_id"] == tmdb_id
+    assert response.json()["title"] == fake_tmdb.fake_movie(tmdb_id)["title"]
+
+def test_concurrent_imports_coalesce():
+    tmdb_id = 4000000 + int(random_suffix())
+    transport = CountingTransport()
+    async def import_all():
+        app_transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=app_transport, base_url="http://test") as http:
+            return await asyncio.gather(*(
+                http.post(f"/api/movies/import/{tmdb_id}") for _ in range(10)
+            ))
+    with fake_tmdb_api(transport):
+        responses = asyncio.run(import_all())
+    assert [r.status_code for r in responses] == [201] * 10
+    assert len({r.json()["id"] for r in responses}) == 1
+    assert transport.requests == 1
+    with engine.connect() as conn:
+        rows = conn.exec_driver_sql("SELECT COUNT(*) FROM movies WHERE tmdb_id = ?", (tmdb_id,))
+        assert rows.scalar() == 1
+
+    # Another request stores the same title while this one is fetching it
+    racing = {}
+    def store_first(_):
+        racing["id"] = client.post("/api/movies/", json={
+            "title": "Stored Elsewhere", "tmdb_id": tmdb_id + 1,
+        }).json()["id"]
+    with fake_tmdb_api(CountingTransport(on_request=store_first)):
+        response = client.post(f"/api/movies/import/{tmdb_id + 1}")
+    assert response.status_code == 201
+    assert response.json()["id"] == racing["id"]
+    assert response.json()["title"] == fake_tmdb.fake_movie(tmdb_id + 1)["title"]
 
 def test_import_popular_movies():
-    response = client.post("/api/movies/import/popular?page=1")
+    with fake_tmdb_api():
+        response = client.post("/api/movies/import/popular?page=1")
     assert response.status_code == 201
     data = response.json()
     assert isinstance(data, list)
+    assert len(data) == fake_tmdb.PAGE_SIZE
+
+def test_import_popular_movies_page_range():
+    with fake_tmdb_api():
+        response = client.post("/api/movies/import/popular?pages=1-3")
+    assert response.status_code == 201
+    data = response.json()
+    # The stand-in's popular pages 1-3 hold TMDB ids 1..60
+    assert [m["tmdb_id"] for m in data] == list(range(1, 3 * fake_tmdb.PAGE_SIZE + 1))
+
+def test_import_popular_movies_invalid_range():
+    response = client.post("/api/movies/import/popular?pages=5-1")
+    assert response.status_code == 400
+
+def test_import_popular_movies_async():
+    response = client.post("/api/movies/import/popular?pages=1-2&async=true")
+    assert response.status_code == 202
+    job = response.json()
+    assert job["kind"] == "import_popular"
+    status = client.get(response.headers["location"])
+    assert status.status_code == 200
+    assert status.json()["id"] == job["id"]
+
+def test_import_tmdb_dump():
+    base = 900000 + int(random_suffix()) * 10
+    lines = [
+        {"id": base, "original_title": "Dump Movie", "popularity": 5.0, "adult": False},
+        {"id": base + 1, "original_title": "Adult Movie", "popularity": 5.0, "adult": True},
+        {"id": base + 2, "original_title": "Obscure Movie", "popularity": 0.1, "adult": False},
+    ]
+    body = gzip.compress(
+        ("\n".join(json.dumps(line) for line in lines) + "\nnot json\n").encode()
+    )
+    response = client.post(
+        "/api/movies/import/dump?min_popularity=1",
+        content=body,
+        headers={"Content-Type": "application/gzip"},
+    )
+    assert response.status_code == 200
+    data = response.json()
+    assert data["lines"] == 4
+    assert data["matched"] == 1
+    assert data["inserted"] + data["existing"] == 1
+    assert data["invalid"] == 1
+
+def test_import_tmdb_dump_corrupt_gzip():
+    response = client.post(
+        "/api/movies/import/dump",
+        content=b"\x1f\x8bgarbage",
+        headers={"Content-Type": "application/gzip"},
+    )
+    assert response.status_code == 400
+    assert "corrupt" in response.json()["detail"]
+
+def test_import_tmdb_dump_truncated_gzip():
+    line = json.dumps({"id": 1, "original_title": "Cut Short", "popularity": 5.0})
+    body = gzip.compress((line + "\n").encode() * 100)
+    response = client.post(
+        "/api/movies/import/dump",
+        content=body[: len(body) // 2],
+        headers={"Content-Type": "application/gzip"},
+    )
+    assert response.status_code == 400
+    assert "ends before" in response.json()["detail"]
+
+def test_import_tmdb_dump_job_corrupt_file():
+    saved = tmdb_dump.TMDB_DUMP_DIR
+    with tempfile.TemporaryDirectory() as directory:
+        name = f"corrupt_{random_suffix()}.json.gz"
+        with open(os.path.join(directory, name), "wb") as f:
+            f.write(b"\x1f\x8bgarbage")
+        tmdb_dump.TMDB_DUMP_DIR = directory
+        try:
+            response = client.post(f"/api/movies/import/dump?path={name}&async=true")
+            assert response.status_code == 202
+            job = asyncio.run(jobs.run_now(response.json()["id"]))
+        finally:
+            tmdb_dump.TMDB_DUMP_DIR = saved
+    # Failed at once, not queued for a retry
+    assert job.status == "failed"
+    assert job.attempts == 1
+    assert "corrupt" in job.error
+
+def test_get_job_not_found():
+    response = client.get("/api/jobs/999999999")
+    assert response.status_code == 404
+
+def fake_search_ids(query):
+    # The ids benchmarks.fake_tmdb returns on the first page for `query`
+    first_id = 1_000_000 + random.Random(query.lower()).randint(0, 100_000) * fake_tmdb.PAGE_SIZE
+    return list(range(first_id, first_id + fake_tmdb.PAGE_SIZE))
+
+async def queued_ingest(query):
+    async with read_session() as db:
+        found = await db.scalars(select(Job).where(Job.kind == "ingest_search"))
+        return [job for job in found if job.params == {"query": query}]
 
 def test_search_movies_tmdb():
-    response = client.get("/api/movies/search/fight")
+    query = f"zqxv {random_suffix()}{random_suffix()}"
+    with fake_tmdb_api():
+        response = client.get(f"/api/movies/search/{query}")
+        assert response.status_code == 200
+        data = response.json()
+        assert data["source"] == "tmdb"
+        assert [hit["tmdb_id"] for hit in data["results"]] == fake_search_ids(query)
+        for hit in data["results"]:
+            assert hit["id"] is None
+            assert hit["created_at"] is None
+            assert hit["source"] == "tmdb"
+
+        # Queued once, after the response; ingesting it makes every hit local
+        queued = asyncio.run(queued_ingest(query))
+        assert len(queued) == 1
+        client.get(f"/api/movies/search/{query}")
+        assert len(asyncio.run(queued_ingest(query))) == 1
+        assert asyncio.run(jobs.run_now(queued[0].id)).status == "succeeded"
+        data = client.get(f"/api/movies/search/{query}").json()
+    assert data["source"] == "local"
+    assert all(hit["id"] is not None for hit in data["results"])
+    assert [hit["tmdb_id"] for hit in data["results"]] == fake_search_ids(query)
+
+def test_search_movies_hybrid_merge():
+    suffix = f"{random_suffix()}{random_suffix()}"
+    query = f"qwzrt {suffix}"
+    ids = fake_search_ids(query)
+    # A local match TMDB also returns, and a stored TMDB hit the index misses
+    matched = client.post("/api/movies/", json={
+        "title": f"Qwzrt {suffix}", "tmdb_id": ids[3],
+    }).json()
+    stored = client.post("/api/movies/", json={
+        "title": "Stored Elsewhere", "tmdb_id": ids[7],
+    }).json()
+    with fake_tmdb_api():
+        response = client.get(f"/api/movies/search/{query}")
+    assert response.status_code == 200
+    data = response.json()
+    assert data["source"] == "hybrid"
+    results = data["results"]
+    tmdb_ids = [hit["tmdb_id"] for hit in results]
+    assert len(tmdb_ids) == len(set(tmdb_ids)) == len(ids)
+    assert set(tmdb_ids) == set(ids)
+    assert results[0]["id"] == matched["id"]
+    assert results[0]["source"] == "local"
+    by_tmdb_id = {hit["tmdb_id"]: hit for hit in results}
+    assert by_tmdb_id[ids[7]]["id"] == stored["id"]
+    assert by_tmdb_id[ids[7]]["source"] == "local"
+    remote = [hit for hit in results if hit["source"] == "tmdb"]
+    assert len(remote) == len(ids) - 2
+    assert all(hit["id"] is None for hit in remote)
+
+def test_search_movies_tmdb_down_falls_back():
+    suffix = f"{random_suffix()}{random_suffix()}"
+    movie = client.post("/api/movies/", json={"title": f"Vrokt {suffix}"}).json()
+    governor, base = tmdb_governor.governor, tmdb_governor.TMDB_RETRY_BASE_SECONDS
+    # A governor of its own, so the failures don't open the shared breaker
+    tmdb_governor.governor = tmdb_governor.Governor()
+    tmdb_governor.TMDB_RETRY_BASE_SECONDS = 0.001
+    try:
+        with fake_tmdb_api(CountingTransport(failures=100, status=503)):
+            response = client.get(f"/api/movies/search/vrokt {suffix}")
+            missing = client.get(f"/api/movies/search/nothingmatches {suffix}")
+    finally:
+        tmdb_governor.governor, tmdb_governor.TMDB_RETRY_BASE_SECONDS = governor, base
     assert response.status_code == 200
     data = response.json()
-    assert "results" in data
+    assert data["source"] == "local"
+    assert [hit["id"] for hit in data["results"]] == [movie["id"]]
+    # Nothing local to fall back on: the upstream error stands
+    assert missing.status_code >= 500
+
+def test_search_movies_local_first():
+    suffix = random_suffix()
+    response = client.post("/api/movies/", json={
+        "title": f"Qwzrt Voyage {suffix}",
+    })
+    movie_id = response.json()["id"]
+    response = client.get(f"/api/movies/search/qwzrt {suffix}")
+    assert response.status_code == 200
+    data = response.json()
+    assert data["source"] in ("local", "hybrid")
+    assert data["results"][0]["id"] == movie_id
+    assert data["results"][0]["source"] == "local"
+
+def test_tmdb_cache_stats():
+    response = client.get("/api/tmdb/cache")
+    assert response.status_code == 200
+    data = response.json()
+    assert "hit_ratio" in data
+    assert data["bytes"] <= data["max_bytes"]
+
+def test_clear_tmdb_cache_disk_tier():
+    key = tmdb_cache.make_key(f"/movie/{random_suffix()}")
+    disk = tmdb_cache.TMDB_CACHE_DISK
+    tmdb_cache.TMDB_CACHE_DISK = True
+    try:
+        asyncio.run(tmdb_cache.store(key, {"id": 1}, 60))
+        assert client.delete("/api/tmdb/cache").status_code == 204
+        # Nothing left in memory or on disk to reload it from
+        assert asyncio.run(tmdb_cache.lookup(key)) is None
+    finally:
+        tmdb_cache.TMDB_CACHE_DISK = disk
+
+def governed_get(governor, transport, retry=True):
+    async def call():
+        async with httpx.AsyncClient(base_url="http://fake/3", transport=transport) as http:
+            return await governor.call(lambda: http.get("/movie/1"), retry=retry)
+    return asyncio.run(call())
+
+def test_tmdb_governor_retries_server_errors():
+    base = tmdb_governor.TMDB_RETRY_BASE_SECONDS
+    tmdb_governor.TMDB_RETRY_BASE_SECONDS = 0.001
+    try:
+        governor = tmdb_governor.Governor()
+        transport = CountingTransport(failures=100)
+        response = governed_get(governor, transport)
+        assert response.status_code == 503
+        assert transport.requests == 1 + tmdb_governor.TMDB_MAX_RETRIES
+        assert governor.counters["retries"] == tmdb_governor.TMDB_MAX_RETRIES
+        assert tmdb_service.upstream_error(response).status_code == 502
+        # Failures and slow calls halve the concurrency limit
+        assert governor.limiter.limit < governor.limiter.maximum
+
+        recovering = CountingTransport(failures=1)
+        assert governed_get(tmdb_governor.Governor(), recovering).status_code == 200
+        assert recovering.requests == 2
+    finally:
+        tmdb_governor.TMDB_RETRY_BASE_SECONDS = base
+
+def test_tmdb_governor_honours_retry_after():
+    governor = tmdb_governor.Governor()
+    transport = CountingTransport(failures=1, status=429, headers={"Retry-After": "1"})
+    started = time.monotonic()
+    assert governed_get(governor, transport).status_code == 200
+    assert time.monotonic() - started >= 1
+    assert transport.requests == 2
+    assert governor.counters["throttled"] == 1
+    assert governor.breaker.state == "closed"
+
+    # Still throttled once retries run out: 503 with the server's Retry-After
+    throttled = CountingTransport(failures=100, status=429, headers={"Retry-After": "0"})
+    with fake_tmdb_api(throttled):
+        response = client.post(f"/api/movies/import/{3000000 + int(random_suffix())}")
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "1"
+
+def test_tmdb_governor_breaker_opens():
+    governor = tmdb_governor.Governor()
+    threshold = governor.breaker.threshold
+    transport = CountingTransport(failures=threshold)
+    for _ in range(threshold):
+        assert governed_get(governor, transport, retry=False).status_code == 503
+    assert governor.get_state()["breaker_state"] == "open"
+
+    # Open: refused at once, without a request
+    started = time.monotonic()
+    try:
+        governed_get(governor, transport, retry=False)
+        assert False, "expected the open breaker to refuse the call"
+    except HTTPException as exc:
+        assert exc.status_code == 503
+        assert int(exc.headers["Retry-After"]) >= 1
+    assert time.monotonic() - started < 0.5
+    assert transport.requests == threshold
+
+    # After the cooldown one probe goes out; TMDB is back, so it closes
+    governor.breaker.cooldown = 0
+    assert governed_get(governor, transport, retry=False).status_code == 200
+    assert governor.get_state()["breaker_state"] == "closed"
+
+def test_tmdb_governor_state():
+    response = client.get("/api/tmdb/governor")
+    assert response.status_code == 200
+    data = response.json()
+    assert data["breaker_state"] in ("closed", "open", "half_open")
+    assert data["in_flight"] <= data["concurrency_limit"]
+
+def test_tmdb_sync():
+    response = client.post("/api/tmdb/sync")
+    assert response.status_code == 202
+    assert response.json()["kind"] == "tmdb_sync"
+    status = client.get("/api/tmdb/sync")
+    assert status.status_code == 200
+    assert "pending" in status.json()
+
+def test_tmdb_sync_refreshes_changed_movies():
+    settings = fake_tmdb.settings
+    saved = settings.changes_per_day, settings.changes_max_id, tmdb_sync.SYNC_BUDGET
+    # A few changes a day, from ids no other test stores
+    settings.changes_per_day, settings.changes_max_id = 3, 10**9
+    tmdb_sync.SYNC_BUDGET = 2
+    try:
+        with fake_tmdb_api() as stub:
+            today = date.today()
+            feed = {
+                item["id"]
+                for day in (today - timedelta(days=1), today)
+                for item in asyncio.run(stub.get("/movie/changes", params={
+                    "start_date": day.isoformat(), "end_date": day.isoformat(),
+                })).json()["results"]
+            }
+            ids = {}
+            for tmdb_id in sorted(feed):
+                response = client.post("/api/movies/", json={
+                    "title": "Stale", "tmdb_id": tmdb_id, "vote_average": 0.0,
+                })
+                ids[tmdb_id] = response.json()["id"]
+
+            before = client.get("/api/tmdb/sync").json()["pending"]
+            runs = []
+            for _ in range(4):
+                job = client.post("/api/tmdb/sync").json()
+                assert asyncio.run(jobs.run_now(job["id"])).status == "succeeded"
+                runs.append(client.get("/api/tmdb/sync").json())
+                # No new changes after the first run: the backlog drains
+                settings.changes_per_day = 0
+    finally:
+        settings.changes_per_day, settings.changes_max_id, tmdb_sync.SYNC_BUDGET = saved
+
+    # Two refreshes per run; what doesn't fit waits for the next one
+    first = before + len(feed) - 2
+    assert [run["pending"] for run in runs] == [max(0, first - 2 * i) for i in range(4)]
+    assert [run["last_run"]["refreshed"] for run in runs][:2] == [2, 2]
+    watermarks = [run["watermark"] for run in runs]
+    assert watermarks[0] and watermarks == sorted(watermarks)
+    for tmdb_id, movie_id in ids.items():
+        movie = client.get(f"/api/movies/{movie_id}").json()
+        expected = fake_tmdb.fake_movie(tmdb_id)
+        assert movie["title"] == expected["title"]
+        assert movie["vote_average"] == expected["vote_average"]
+
+def test_benchmark_baseline_compare():
+    assert fake_tmdb.fake_movie(42) == fake_tmdb.fake_movie(42)
+    baseline = {"routes": {"GET /api/movies/": {"requests": 100, "rps": 100.0, "p95_ms": 10.0}}}
+    steady = {"GET /api/movies/": {"requests": 100, "rps": 95.0, "p95_ms": 11.0}}
+    slower = {"GET /api/movies/": {"requests": 100, "rps": 70.0, "p95_ms": 15.0}}
+    assert load.compare(steady, baseline, 0.2) == []
+    assert len(load.compare(slower, baseline, 0.2)) == 2
+
+def test_metrics():
+    test_get_movie_by_id()
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert 'route="/api/movies/{movie_id}",status="200"' in response.text
+    assert "db_query_duration_seconds_count" in response.text
 
 if __name__ == "__main__":
     # Run tests
     try:
         test_create_user()
         print("✓ User creation works")
+        test_bulk_create_users()
+        print("✓ Bulk user creation works")
         test_list_users()
         print("✓ List users works")
+        test_list_users_cursor_pagination()
+        print("✓ User cursor pagination works")
         test_get_user_by_id()
         print("✓ Get user by ID works")
         test_update_user()
         print("✓ Update user works")
         test_delete_user()
         print("✓ Delete user works")
+        test_duplicate_writes_rejected()
+        print("✓ Duplicate users and movies are rejected")
+        test_concurrent_writes_succeed()
+        print("✓ Concurrent writes succeed")
+        test_routes_are_async()
+        print("✓ Routes are async")
         test_create_movie()
         print("✓ Create movie works")
+        test_bulk_create_movies()
+        print("✓ Bulk movie creation works")
         test_list_movies()
         print("✓ List movies works")
+        test_list_movies_rows_match_detail()
+        print("✓ Listed movies match their details")
+        test_list_movies_cursor_pagination()
+        print("✓ Movie cursor pagination works")
+        test_list_movies_full_text_search()
+        print("✓ Full-text movie search works")
+        test_search_movies_local_first()
+        print("✓ Movie search answers from the local catalogue first")
+        test_movie_sparse_fieldsets()
+        print("✓ Sparse movie fieldsets work")
+        test_list_movies_compact_encodings()
+        print("✓ MessagePack and compressed movie lists work")
+        test_list_movies_by_genre()
+        print("✓ Genre filter works")
         test_get_movie_by_id()
         print("✓ Get movie by ID works")
+        test_get_movie_poster()
+        print("✓ Movie posters are served from the image cache")
+        test_server_timing_header()
+        print("✓ Server-Timing header works")
+        test_get_movie_conditional_request()
+        print("✓ Movie ETag revalidation works")
+        test_cached_detail_with_padded_id_is_invalidated()
+        print("✓ Padded detail URLs are invalidated too")
         test_update_movie()
         print("✓ Update movie works")
         test_delete_movie()
         print("✓ Delete movie works")
         test_import_movie_by_tmdb_id()
         print("✓ Import movie by TMDB ID works")
+        test_tmdb_client_is_shared()
+        print("✓ TMDB client is shared and closed with the app")
+        test_import_movie_from_tmdb_stand_in()
+        print("✓ Import through the TMDB client works")
+        test_concurrent_imports_coalesce()
+        print("✓ Concurrent imports of one movie coalesce")
         test_import_popular_movies()
         print("✓ Import popular movies works")
+        test_import_popular_movies_page_range()
+        print("✓ Import popular movies page range works")
+        test_import_popular_movies_async()
+        print("✓ Background popular import works")
+        test_import_tmdb_dump()
+        print("✓ TMDB dump import works")
+        test_import_tmdb_dump_corrupt_gzip()
+        print("✓ TMDB dump import rejects corrupt gzip")
+        test_import_tmdb_dump_truncated_gzip()
+        print("✓ TMDB dump import rejects truncated gzip")
+        test_import_tmdb_dump_job_corrupt_file()
+        print("✓ TMDB dump import job fails at once on a corrupt file")
         test_search_movies_tmdb()
         print("✓ Search movies in TMDB works")
+        test_search_movies_hybrid_merge()
+        print("✓ Hybrid search merges and dedupes TMDB hits")
+        test_search_movies_tmdb_down_falls_back()
+        print("✓ Hybrid search falls back to local hits when TMDB is down")
+        test_tmdb_cache_stats()
+        print("✓ TMDB cache stats works")
+        test_clear_tmdb_cache_disk_tier()
+        print("✓ Clearing the TMDB cache empties the disk tier")
+        test_tmdb_governor_retries_server_errors()
+        print("✓ TMDB governor retries server errors")
+        test_tmdb_governor_honours_retry_after()
+        print("✓ TMDB governor honours Retry-After")
+        test_tmdb_governor_breaker_opens()
+        print("✓ TMDB circuit breaker opens and recovers")
+        test_tmdb_governor_state()
+        print("✓ TMDB governor state works")
+        test_tmdb_sync()
+        print("✓ TMDB change sync works")
+        test_tmdb_sync_refreshes_changed_movies()
+        print("✓ TMDB sync refreshes changed movies within its budget")
+        test_benchmark_baseline_compare()
+        print("✓ Benchmark baselines flag regressions")
+        test_metrics()
+        print("✓ Metrics endpoint works")
         print("\nAll endpoints are functional!")
     except Exception as e:
         print(f"Error: {e}")
\ No newline at end of file